@@ -0,0 +1,284 @@
+from typing import List, Dict, Set, Tuple, Optional, Counter
+import json
+import math
+import random
+import asyncio
+import signal
+import socket
+import itertools
+import collections
+import multiprocessing
+from aiohttp import web
+
+API_PREFIX = "/api/3.1"
+PROJECT = "benchmark"
+MODEL = "benchmark"
+
+# Endpoints whose calls spectacles retries, so they're the ones 429s are injected in
+RETRIED_ENDPOINTS = ("create_query", "create_query_task", "query_sql")
+
+
+class MockLooker:
+    """Stands in for the Looker API endpoints that SQL validation uses.
+
+    The project has one model with a number of explores, each with its own view of
+    dimensions. Queries run for a random time drawn from a log-normal distribution
+    and fail when they select one of the dimensions picked to be broken.
+
+    Args:
+        explores: Number of explores in the project.
+        dimensions: Number of dimensions in each explore.
+        latency: Number of seconds each API call takes before it's answered.
+        latencies: Latency for specific endpoints, keyed by endpoint name, e.g.
+            'multi_results'. Other endpoints use the default latency.
+        runtime: Median number of seconds a query runs for.
+        runtime_sigma: Spread of the query runtimes, as the log-normal's sigma.
+        error_rate: Share of dimensions whose SQL fails.
+        throttle_rate: Share of calls to retried endpoints that are answered with a
+            429. Each request is only throttled once, like a rate limit that's
+            cleared by the time spectacles retries.
+        seed: Seed for picking the broken dimensions and the query runtimes.
+
+    Attributes:
+        calls: Number of calls to each endpoint.
+        broken: Names of the dimensions whose SQL fails.
+
+    """
+
+    def __init__(
+        self,
+        explores: int = 10,
+        dimensions: int = 100,
+        latency: float = 0.01,
+        latencies: Optional[Dict[str, float]] = None,
+        runtime: float = 0.2,
+        runtime_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.explores = [f"explore_{index}" for index in range(explores)]
+        self.dimensions = {
+            explore: [f"view_{index}.dimension_{n}" for n in range(dimensions)]
+            for index, explore in enumerate(self.explores)
+        }
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.runtime = runtime
+        self.runtime_sigma = runtime_sigma
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        every_dimension = list(itertools.chain(*self.dimensions.values()))
+        self.broken: Set[str] = set(
+            self.random.sample(
+                every_dimension, round(len(every_dimension) * error_rate)
+            )
+        )
+        self.calls: Counter[str] = collections.Counter()
+        self._query_ids = itertools.count(1)
+        self._task_ids = itertools.count(1)
+        self._queries: Dict[int, Tuple[str, List[str]]] = {}
+        self._tasks: Dict[str, Tuple[int, float]] = {}
+        self._throttled: Set[Tuple[str, str]] = set()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post(f"{API_PREFIX}/login", self.login),
+                web.get(f"{API_PREFIX}/versions", self.versions),
+                web.patch(f"{API_PREFIX}/session", self.update_session),
+                web.put(
+                    f"{API_PREFIX}/projects/{{project}}/git_branch", self.git_branch
+                ),
+                web.post(
+                    f"{API_PREFIX}/projects/{{project}}/reset_to_remote",
+                    self.reset_to_remote,
+                ),
+                web.get(f"{API_PREFIX}/lookml_models", self.lookml_models),
+                web.get(
+                    f"{API_PREFIX}/lookml_models/{{model}}/explores/{{explore}}",
+                    self.explore,
+                ),
+                web.post(f"{API_PREFIX}/queries", self.create_query),
+                web.get(f"{API_PREFIX}/queries/{{query_id}}/run/sql", self.query_sql),
+                web.post(f"{API_PREFIX}/query_tasks", self.create_query_task),
+                web.get(f"{API_PREFIX}/query_tasks/multi_results", self.multi_results),
+                web.delete(
+                    f"{API_PREFIX}/running_queries/{{query_task_id}}", self.cancel
+                ),
+            ]
+        )
+        return app
+
+    async def _answer(self, endpoint: str, key: Optional[str] = None) -> bool:
+        """Waits out the endpoint's latency and tells whether to throttle the call."""
+        self.calls[endpoint] += 1
+        await asyncio.sleep(self.latencies.get(endpoint, self.latency))
+        if key is None or endpoint not in RETRIED_ENDPOINTS:
+            return False
+        if (endpoint, key) in self._throttled:
+            return False
+        if self.random.random() < self.throttle_rate:
+            self._throttled.add((endpoint, key))
+            self.calls["throttled"] += 1
+            return True
+        return False
+
+    @staticmethod
+    def _too_many_requests() -> web.Response:
+        return web.json_response({"message": "Too Many Requests"}, status=429)
+
+    async def login(self, request: web.Request) -> web.Response:
+        await self._answer("login")
+        return web.json_response({"access_token": "token", "expires_in": 3600})
+
+    async def versions(self, request: web.Request) -> web.Response:
+        await self._answer("versions")
+        return web.json_response({"looker_release_version": "7.0.0"})
+
+    async def update_session(self, request: web.Request) -> web.Response:
+        await self._answer("update_session")
+        return web.json_response(await request.json())
+
+    async def git_branch(self, request: web.Request) -> web.Response:
+        await self._answer("git_branch")
+        return web.json_response(await request.json())
+
+    async def reset_to_remote(self, request: web.Request) -> web.Response:
+        await self._answer("reset_to_remote")
+        return web.json_response({})
+
+    async def lookml_models(self, request: web.Request) -> web.Response:
+        await self._answer("lookml_models")
+        explores = [{"name": explore} for explore in self.explores]
+        return web.json_response(
+            [{"name": MODEL, "project_name": PROJECT, "explores": explores}]
+        )
+
+    async def explore(self, request: web.Request) -> web.Response:
+        await self._answer("explore")
+        explore = request.match_info["explore"]
+        if explore not in self.dimensions:
+            return web.json_response({"message": "Not found"}, status=404)
+        dimensions = [
+            {
+                "name": name,
+                "type": "string",
+                "sql": f"${{TABLE}}.{name.split('.')[1]}",
+                "lookml_link": (
+                    f"/projects/{PROJECT}/files/{name.split('.')[0]}.view.lkml"
+                    f"?line={index + 1}"
+                ),
+            }
+            for index, name in enumerate(self.dimensions[explore])
+        ]
+        return web.json_response(
+            {"name": explore, "fields": {"dimensions": dimensions}}
+        )
+
+    async def create_query(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if await self._answer("create_query", json.dumps(body, sort_keys=True)):
+            return self._too_many_requests()
+        query_id = next(self._query_ids)
+        self._queries[query_id] = (body["view"], body["fields"])
+        return web.json_response({"id": query_id})
+
+    async def query_sql(self, request: web.Request) -> web.Response:
+        query_id = int(request.match_info["query_id"])
+        if await self._answer("query_sql", str(query_id)):
+            return self._too_many_requests()
+        explore, fields = self._queries[query_id]
+        return web.Response(text=f"SELECT {', '.join(fields)} FROM {explore}")
+
+    async def create_query_task(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if await self._answer("create_query_task", str(body["query_id"])):
+            return self._too_many_requests()
+        query_task_id = f"task_{next(self._task_ids)}"
+        runtime = self.random.lognormvariate(math.log(self.runtime), self.runtime_sigma)
+        finishes = asyncio.get_event_loop().time() + runtime
+        self._tasks[query_task_id] = (body["query_id"], finishes)
+        return web.json_response({"id": query_task_id})
+
+    async def multi_results(self, request: web.Request) -> web.Response:
+        await self._answer("multi_results")
+        now = asyncio.get_event_loop().time()
+        results: Dict[str, dict] = {}
+        for query_task_id in request.query["query_task_ids"].split(","):
+            query_id, finishes = self._tasks[query_task_id]
+            explore, fields = self._queries[query_id]
+            broken = [field for field in fields if field in self.broken]
+            if now < finishes:
+                results[query_task_id] = {"status": "running"}
+            elif broken:
+                results[query_task_id] = {
+                    "status": "error",
+                    "data": {
+                        "errors": [
+                            {
+                                "message": f"Unrecognized name: {broken[0]}",
+                                "sql_error_loc": {"line": fields.index(broken[0]) + 1},
+                            }
+                        ],
+                        "sql": f"SELECT {', '.join(fields)} FROM {explore}",
+                    },
+                }
+            else:
+                results[query_task_id] = {"status": "complete", "data": []}
+        return web.json_response(results)
+
+    async def cancel(self, request: web.Request) -> web.Response:
+        await self._answer("cancel")
+        return web.json_response({})
+
+
+def _serve(ports: multiprocessing.Queue, options: dict) -> None:
+    """Serves a mock Looker API until the process is terminated."""
+    # A forked process inherits the handlers spectacles installs on its event loop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    runner = web.AppRunner(MockLooker(**options).app(), access_log=None)
+    loop.run_until_complete(runner.setup())
+    sock = socket.socket()
+    sock.bind(("localhost", 0))
+    loop.run_until_complete(web.SockSite(runner, sock).start())
+    ports.put(sock.getsockname()[1])
+    loop.run_forever()
+
+
+class MockLookerServer:
+    """Runs a mock Looker API in a separate process, so it doesn't skew measurements.
+
+    Use it as a context manager, which starts the server and stops it on the way
+    out. The keyword arguments are passed on to MockLooker.
+
+    Attributes:
+        base_url: Base URL of the server, to pass to LookerClient with the port.
+        port: Port the server listens on.
+
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.base_url = "http://localhost"
+        self.port = 0
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "MockLookerServer":
+        ports: multiprocessing.Queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(ports, self.options), daemon=True
+        )
+        self._process.start()
+        self.port = ports.get(timeout=30)
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
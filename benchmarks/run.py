@@ -0,0 +1,267 @@
+"""Benchmarks SQL validation end to end against a mock Looker API.
+
+Each case validates a generated project of a given size in one mode, in a fresh
+process so its peak memory is its own. For example, to compare against a baseline
+saved by an earlier run:
+
+    python -m benchmarks.run --sizes 1000 10000 --output results.json
+    python -m benchmarks.run --sizes 1000 10000 --baseline results.json
+
+The number of API calls, other than polls for results, only depends on the code and
+the mock's seed, so it's compared closely. Times and memory depend on the machine,
+so they get a looser tolerance. CI compares against benchmarks/baseline.json, which
+is refreshed with --output when a change is expected to move the numbers.
+
+"""
+from typing import List, Dict, Tuple
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+import multiprocessing
+from spectacles.client import LookerClient
+from spectacles.validators import SqlValidator
+from spectacles.hooks import hooks
+from spectacles.logger import GLOBAL_LOGGER as logger
+from benchmarks.mock_looker import MockLookerServer, PROJECT
+
+MODES = ("batch", "single", "hybrid")
+# Result fields shown in the table, with their headings, widths and formats
+COLUMNS = (
+    ("dimensions", "dimensions", 10, ""),
+    ("mode", "mode", 7, ""),
+    ("seconds", "seconds", 8, ".2f"),
+    ("metadata_seconds", "metadata", 8, ".2f"),
+    ("api_calls", "calls", 7, ""),
+    ("polls", "polls", 6, ""),
+    ("calls_per_second", "calls/s", 8, ".1f"),
+    ("errors", "errors", 6, ""),
+    ("peak_rss_mib", "RSS MiB", 8, ".1f"),
+)
+
+
+def run_case(
+    results: multiprocessing.Queue,
+    base_url: str,
+    port: int,
+    mode: str,
+    concurrency: int,
+) -> None:
+    """Validates the mock project in one mode and reports how it went."""
+    for handler in logger.handlers:
+        handler.setLevel(logging.WARNING)
+    calls = [0]
+    polls = [0]
+
+    @hooks.register("on_request")
+    def count_call(method, url, status):
+        # How often results are polled for depends on how long queries take
+        if "multi_results" in str(url):
+            polls[0] += 1
+        else:
+            calls[0] += 1
+
+    started = time.perf_counter()
+    client = LookerClient(base_url, "client_id", "client_secret", port=port)
+    validator = SqlValidator(client, PROJECT, concurrency=concurrency)
+    validator.build_project(["*/*"])
+    built = time.perf_counter()
+    errors = asyncio.get_event_loop().run_until_complete(validator.run(mode))
+    finished = time.perf_counter()
+    results.put(
+        {
+            "mode": mode,
+            "seconds": finished - started,
+            "metadata_seconds": built - started,
+            "api_calls": calls[0],
+            "polls": polls[0],
+            "calls_per_second": (calls[0] + polls[0]) / (finished - started),
+            "errors": len(errors),
+            # Kilobytes on Linux
+            "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def run_benchmarks(
+    sizes: List[int],
+    modes: List[str],
+    dimensions_per_explore: int = 100,
+    concurrency: int = 100,
+    **options,
+) -> List[dict]:
+    """Runs each mode at each project size, returning a result for each case.
+
+    Args:
+        sizes: Total numbers of dimensions in the projects to validate.
+        modes: Validation modes to run at each size.
+        dimensions_per_explore: Number of dimensions in each explore.
+        concurrency: Number of queries spectacles runs at once.
+        **options: Options for MockLooker, e.g. latency or error_rate.
+
+    """
+    context = multiprocessing.get_context("spawn")
+    cases = []
+    for size in sizes:
+        explores = max(1, size // dimensions_per_explore)
+        with MockLookerServer(
+            explores=explores, dimensions=dimensions_per_explore, **options
+        ) as server:
+            for mode in modes:
+                results = context.Queue()
+                process = context.Process(
+                    target=run_case,
+                    args=(results, server.base_url, server.port, mode, concurrency),
+                )
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(f"The {mode} case at size {size} failed.")
+                case = results.get()
+                case["dimensions"] = explores * dimensions_per_explore
+                cases.append(case)
+                print_case(case)
+    return cases
+
+
+def print_header() -> None:
+    print("  ".join(f"{heading:>{width}}" for _, heading, width, _ in COLUMNS))
+
+
+def print_case(case: dict) -> None:
+    print(
+        "  ".join(f"{case[name]:>{width}{spec}}" for name, _, width, spec in COLUMNS),
+        flush=True,
+    )
+
+
+def compare(
+    cases: List[dict],
+    baseline: List[dict],
+    tolerance: float,
+    calls_tolerance: float = 0.02,
+) -> List[str]:
+    """Lists the cases that regressed beyond the tolerances.
+
+    Args:
+        cases: Results of this run.
+        baseline: Results of an earlier run to compare against.
+        tolerance: Share by which time and memory may grow.
+        calls_tolerance: Share by which the number of API calls may grow, allowing
+            for the retries of calls the mock throttles.
+
+    """
+    expected: Dict[Tuple[int, str], dict] = {
+        (case["dimensions"], case["mode"]): case for case in baseline
+    }
+    regressions = []
+    for case in cases:
+        before = expected.get((case["dimensions"], case["mode"]))
+        if before is None:
+            continue
+        limits = (
+            ("api_calls", calls_tolerance, ""),
+            ("seconds", tolerance, ".2f"),
+            ("peak_rss_mib", tolerance, ".2f"),
+        )
+        for metric, allowed, spec in limits:
+            if metric in before and case[metric] > before[metric] * (1 + allowed):
+                regressions.append(
+                    f"{case['mode']} mode at {case['dimensions']} dimensions: "
+                    f"{metric} went from {before[metric]:{spec}} to "
+                    f"{case[metric]:{spec}}"
+                )
+    return regressions
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=[1000, 10000],
+        help="Total numbers of dimensions in the projects to validate.",
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--dimensions-per-explore", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Number of seconds each API call takes.",
+    )
+    parser.add_argument(
+        "--runtime",
+        type=float,
+        default=0.5,
+        help="Median number of seconds each query runs for.",
+    )
+    parser.add_argument("--runtime-sigma", type=float, default=0.5)
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.002,
+        help="Share of dimensions whose SQL fails.",
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.01,
+        help="Share of retried API calls that get a 429 response.",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--baseline",
+        help="Compare the results to a JSON file written by an earlier run and fail "
+        "if any case got slower or used more memory than the tolerance allows.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Share by which time and memory may grow compared to the baseline.",
+    )
+    parser.add_argument(
+        "--calls-tolerance",
+        type=float,
+        default=0.02,
+        help="Share by which the number of API calls may grow.",
+    )
+    return parser
+
+
+def main() -> None:
+    args = create_parser().parse_args()
+    print_header()
+    cases = run_benchmarks(
+        args.sizes,
+        args.modes,
+        args.dimensions_per_explore,
+        args.concurrency,
+        latency=args.latency,
+        runtime=args.runtime,
+        runtime_sigma=args.runtime_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(cases, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(
+                cases, json.load(file), args.tolerance, args.calls_tolerance
+            )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
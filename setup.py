@@ -13,7 +13,7 @@ setup(
     description="A command-line, continuous integration tool for Looker and LookML.",
     version=__version__,
     py_modules=["spectacles"],
-    packages=find_packages(exclude=["docs", "tests*", "scripts"]),
+    packages=find_packages(exclude=["docs", "tests*", "scripts", "benchmarks*"]),
     include_package_data=True,
     install_requires=["requests", "PyYAML", "colorama", "backoff", "aiohttp"],
     tests_require=[
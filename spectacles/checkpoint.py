@@ -0,0 +1,110 @@
+from typing import Dict, Tuple, Optional
+from pathlib import Path
+import json
+from spectacles.queries import Query
+from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.exceptions import SqlError, QueryTimeoutError, SpectaclesException
+
+# Journaled states that mean the query's result is known and doesn't need rerunning
+FINISHED_STATES = ("complete", "error", "timeout")
+
+
+class Checkpoint:
+    """Journals the progress of a SQL validation run so an interrupted run can resume.
+
+    The journal is a JSON lines file. The first line names the project and every
+    following line records a query moving to a new state, along with the IDs needed
+    to re-attach to it and any error it returned. Each line is flushed as soon as
+    it's written, so the journal survives the process being killed.
+
+    Args:
+        path: Path to the journal file.
+        project: Name of the LookML project being validated.
+        resume: When true, loads the existing journal and appends to it. Otherwise,
+            any existing journal is replaced.
+
+    Attributes:
+        entries: Latest journal entry for each LookML object, keyed by model name,
+            explore name and object name. Empty unless resuming.
+
+    """
+
+    def __init__(self, path: str, project: str, resume: bool = False):
+        self.path = Path(path)
+        self.project = project
+        self.entries: Dict[Tuple[str, str, str], dict] = {}
+        if resume and self.path.exists():
+            self.entries = self._load()
+            self.file = self.path.open("a")
+        else:
+            if resume:
+                logger.info(f"No checkpoint found at {path}, starting from scratch")
+            self.file = self.path.open("w")
+            self._write({"project": project})
+
+    def _load(self) -> Dict[Tuple[str, str, str], dict]:
+        entries = {}
+        with self.path.open("r") as file:
+            lines = file.read().splitlines()
+        for number, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                if number == len(lines) - 1:
+                    # The run was killed part way through writing its last line
+                    continue
+                raise SpectaclesException(
+                    f"Line {number + 1} of checkpoint {self.path} is not valid JSON."
+                )
+            if number == 0:
+                if entry.get("project") != self.project:
+                    raise SpectaclesException(
+                        f"Checkpoint {self.path} is for project "
+                        f"'{entry.get('project')}', not '{self.project}'."
+                    )
+                continue
+            entries[(entry["model"], entry["explore"], entry["object"])] = entry
+        return entries
+
+    def _write(self, entry: dict) -> None:
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def record(self, query: Query, error: Optional[SqlError] = None) -> None:
+        """Appends a query's current state to the journal.
+
+        Args:
+            query: Query that just changed state.
+            error: Error the query returned, if any.
+
+        """
+        self._write(
+            {
+                "model": query.model,
+                "explore": query.explore,
+                "object": query.lookml_object.name,
+                "state": query.state,
+                "query_id": query.query_id,
+                "query_task_id": query.query_task_id,
+                "error": vars(error) if error else None,
+            }
+        )
+
+    def close(self, remove: bool = False) -> None:
+        """Closes the journal, removing it if the run it covers is complete."""
+        self.file.close()
+        if remove:
+            self.path.unlink()
+
+
+def error_from_json(error: dict) -> SqlError:
+    """Recreates a SqlError, or a QueryTimeoutError, from its journaled attributes."""
+    if "timeout" in error:
+        return QueryTimeoutError(error["path"], error["timeout"], error.get("url"))
+    return SqlError(
+        path=error["path"],
+        message=error["message"],
+        sql=error.get("sql"),
+        line_number=error.get("line_number"),
+        url=error.get("url"),
+    )
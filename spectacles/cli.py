@@ -5,15 +5,28 @@ from yaml.parser import ParserError
 import argparse
 import logging
 import os
-from typing import Callable
+from typing import Callable, Dict, List, Optional, Tuple
 from spectacles import __version__
 from spectacles.runner import Runner
+from spectacles.slot_pool import SlotPool
 from spectacles.client import LookerClient
+from spectacles.results import (
+    load_results,
+    merge_results,
+    write_results,
+    compare_results,
+)
+from spectacles.writers import OUTPUT_FORMATS, open_writer
+from spectacles.tracing import tracer
+from spectacles.metrics import metrics
+from spectacles.hooks import load_hooks
+from spectacles.profiling import Profiler
 from spectacles.exceptions import SpectaclesException, ValidationError
 from spectacles.logger import GLOBAL_LOGGER as logger, FileFormatter
 import spectacles.printer as printer
 
 LOG_FILENAME = "spectacles.log"
+RESULTS_FILENAME = "results.json"
 LOG_FILEPATH = Path()
 
 
@@ -47,6 +60,11 @@ class ConfigFileAction(argparse.Action):
                 raise SpectaclesException(
                     f"'{dest}' in {values} is not a valid configuration parameter."
                 )
+        if config.get("instances"):
+            # Each instance brings its own connection details
+            for action in parser._actions:
+                if action.dest in ("base_url", "client_id", "client_secret"):
+                    action.required = False
         parser.set_defaults(**config)
 
     def parse_config(self, path) -> dict:
@@ -154,6 +172,22 @@ def handle_exceptions(function: Callable) -> Callable:
     return wrapper
 
 
+def shard_type(value: str) -> Tuple[int, int]:
+    """Parses a shard argument in 'index/count' format, e.g. '2/4'."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not a valid shard. Use the format 'index/count', e.g. '2/4'."
+        )
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            f"'{value}' is not a valid shard. "
+            "The index must be between 1 and the number of shards."
+        )
+    return index, count
+
+
 def set_file_handler(directory: str) -> None:
 
     global LOG_FILEPATH
@@ -181,39 +215,111 @@ def main():
 
     set_file_handler(args.log_dir)
 
-    if args.command == "connect":
-        run_connect(
-            args.base_url,
-            args.client_id,
-            args.client_secret,
-            args.port,
-            args.api_version,
-        )
-    elif args.command == "sql":
-        run_sql(
-            args.project,
-            args.branch,
-            args.explores,
-            args.base_url,
-            args.client_id,
-            args.client_secret,
-            args.port,
-            args.api_version,
-            args.mode,
-            args.remote_reset,
-            args.concurrency,
-        )
-    elif args.command == "assert":
-        run_assert(
-            args.project,
-            args.branch,
-            args.base_url,
-            args.client_id,
-            args.client_secret,
-            args.port,
-            args.api_version,
-            args.remote_reset,
-        )
+    profiler = Profiler(args.log_dir) if args.profile else None
+    if profiler:
+        profiler.start()
+    hook_modules = getattr(args, "hooks", None)
+    if hook_modules:
+        load_hooks(hook_modules)
+    trace_file = getattr(args, "trace_file", None)
+    if trace_file:
+        tracer.start()
+    metrics_file = getattr(args, "metrics_file", None)
+    metrics_port = getattr(args, "metrics_port", None)
+    if metrics_file or metrics_port:
+        metrics.start()
+    if metrics_port:
+        metrics.serve(metrics_port)
+    try:
+        if args.command == "connect":
+            run_connect(
+                args.base_url,
+                args.client_id,
+                args.client_secret,
+                args.port,
+                args.api_version,
+            )
+        elif args.command == "sql":
+            run_sql(
+                args.project,
+                args.branch,
+                args.explores,
+                args.base_url,
+                args.client_id,
+                args.client_secret,
+                args.port,
+                args.api_version,
+                args.mode,
+                args.remote_reset,
+                args.concurrency,
+                args.fail_fast,
+                args.time_budget,
+                args.query_timeout,
+                args.shard,
+                args.timing_file,
+                args.results_file or str(Path(args.log_dir) / RESULTS_FILENAME),
+                args.coordinator,
+                args.worker,
+                args.work_queue,
+                args.slot_pool,
+                args.slot_pool_size,
+                args.checkpoint,
+                args.resume,
+                args.rerun_failed,
+                args.incremental,
+                args.base,
+                args.cache_dir,
+                args.branches,
+                args.instances,
+                args.summary,
+                args.output_format,
+                args.output_file,
+            )
+        elif args.command == "assert":
+            run_assert(
+                args.project,
+                args.branch,
+                args.base_url,
+                args.client_id,
+                args.client_secret,
+                args.port,
+                args.api_version,
+                args.remote_reset,
+                args.fail_fast,
+                args.concurrency,
+                args.split_by,
+                args.tests,
+                args.cache_dir,
+                args.output_format,
+                args.output_file,
+            )
+        elif args.command == "all":
+            run_all(
+                args.project,
+                args.branch,
+                args.explores,
+                args.base_url,
+                args.client_id,
+                args.client_secret,
+                args.port,
+                args.api_version,
+                args.mode,
+                args.remote_reset,
+                args.concurrency,
+                args.fail_fast,
+                args.query_timeout,
+            )
+        elif args.command == "merge":
+            run_merge(args.results_files, args.output)
+    finally:
+        if trace_file:
+            tracer.write(trace_file)
+        if metrics_file:
+            metrics.write(metrics_file)
+        metrics.stop()
+        if profiler:
+            profiler.stop()
+            profiler.print_summary()
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -228,21 +334,67 @@ def create_parser() -> argparse.ArgumentParser:
     subparser_action = parser.add_subparsers(
         title="Available sub-commands", dest="command"
     )
-    base_subparser = _build_base_subparser()
+    logging_subparser = _build_logging_subparser()
+    base_subparser = _build_base_subparser(logging_subparser)
     _build_connect_subparser(subparser_action, base_subparser)
     _build_sql_subparser(subparser_action, base_subparser)
     _build_assert_subparser(subparser_action, base_subparser)
+    _build_all_subparser(subparser_action, base_subparser)
+    _build_merge_subparser(subparser_action, logging_subparser)
     return parser
 
 
-def _build_base_subparser() -> argparse.ArgumentParser:
+def _build_logging_subparser() -> argparse.ArgumentParser:
+    """Returns the subparser with logging arguments used by every subparser.
+
+    Returns:
+        argparse.ArgumentParser: Subparser with verbosity and log directory arguments.
+
+    """
+    logging_subparser = argparse.ArgumentParser(add_help=False)
+    logging_subparser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_const",
+        dest="log_level",
+        const=logging.DEBUG,
+        default=logging.INFO,
+        help="Display debug logging during spectacles execution. \
+            Useful for debugging and making bug reports.",
+    )
+    logging_subparser.add_argument(
+        "--log-dir",
+        action=EnvVarAction,
+        env_var="SPECTACLES_LOG_DIR",
+        default="logs",
+        help="The directory that Spectacles will write logs to.",
+    )
+    logging_subparser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile spectacles while it runs, to tell whether it or the network \
+            is slow. Writes a cProfile profile, the time the event loop's tasks \
+            spent in each coroutine and a tracemalloc snapshot of the heap at its \
+            largest to the log directory, and prints a summary at the end.",
+    )
+    return logging_subparser
+
+
+def _build_base_subparser(
+    logging_subparser: argparse.ArgumentParser
+) -> argparse.ArgumentParser:
     """Returns the base subparser with arguments required for every subparser.
 
+    Args:
+        logging_subparser: Subparser with the logging arguments.
+
     Returns:
         argparse.ArgumentParser: Base subparser with url and auth arguments.
 
     """
-    base_subparser = argparse.ArgumentParser(add_help=False)
+    base_subparser = argparse.ArgumentParser(
+        add_help=False, parents=[logging_subparser]
+    )
     base_subparser.add_argument(
         "--config-file",
         action=YamlConfigAction,
@@ -287,21 +439,11 @@ def _build_base_subparser() -> argparse.ArgumentParser:
         help="The version of the Looker API to use. The default is version 3.1.",
     )
     base_subparser.add_argument(
-        "-v",
-        "--verbose",
-        action="store_const",
-        dest="log_level",
-        const=logging.DEBUG,
-        default=logging.INFO,
-        help="Display debug logging during spectacles execution. \
-            Useful for debugging and making bug reports.",
-    )
-    base_subparser.add_argument(
-        "--log-dir",
-        action=EnvVarAction,
-        env_var="SPECTACLES_LOG_DIR",
-        default="logs",
-        help="The directory that Spectacles will write logs to.",
+        "--hooks",
+        nargs="+",
+        metavar="MODULE",
+        help="Python modules to import before the run, which register callbacks \
+            with spectacles.hooks, e.g. to send each query result elsewhere.",
     )
 
     return base_subparser
@@ -353,15 +495,27 @@ def _build_sql_subparser(
         action=EnvVarAction,
         env_var="LOOKER_PROJECT",
         required=True,
-        help="The LookML project you want to test.",
+        nargs="+",
+        help="The LookML project you want to test. Several projects on the same \
+            instance can be tested at once, sharing one concurrency limit. Their \
+            results are reported per project.",
     )
     subparser.add_argument(
         "--branch",
         action=EnvVarAction,
         env_var="LOOKER_GIT_BRANCH",
-        required=True,
         help="The branch of your project that spectacles will use to run queries.",
     )
+    subparser.add_argument(
+        "--branches",
+        nargs="+",
+        help="Test several branches of your project one after another, instead \
+            of a single --branch. Queries whose SQL is identical to one that \
+            already ran for an earlier branch reuse its result. Errors and \
+            results files are reported per branch.",
+    )
+    # Only settable from a config file, as a list of connection details
+    subparser.add_argument("--instances", help=argparse.SUPPRESS)
     subparser.add_argument(
         "--explores",
         nargs="+",
@@ -395,6 +549,159 @@ def _build_sql_subparser(
         help="Specify how many concurrent queries you want to have running \
             against your data warehouse. The default is 10.",
     )
+    subparser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop at the first SQL error, cancelling any queries that are still \
+            running. Explores that weren't tested are reported as untested.",
+    )
+    subparser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Specify a time limit in seconds for the whole run. When it runs out, \
+            spectacles stops dispatching queries, cancels running queries and \
+            reports the results it has. Explores that weren't tested in time are \
+            reported as untested.",
+    )
+    subparser.add_argument(
+        "--query-timeout",
+        type=float,
+        help="Specify a time limit in seconds for each query. Queries that run \
+            longer are cancelled and reported as timed out.",
+    )
+    subparser.add_argument(
+        "--trace-file",
+        help="Record how long each phase of each query takes, e.g. waiting for a \
+            query slot or running in the warehouse, along with the metadata calls, \
+            and write them to this file as Chrome trace events. Open the file in \
+            Perfetto or chrome://tracing.",
+    )
+    subparser.add_argument(
+        "--metrics-file",
+        help="Write Prometheus metrics for the run to this file when it finishes, \
+            e.g. into the directory of node_exporter's textfile collector. Covers \
+            the queries created, dispatched and finished, query runtimes by \
+            explore, query slot usage, polls and API responses and retries.",
+    )
+    subparser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics for the run on this local port while it's \
+            running.",
+    )
+    subparser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Results are printed as they arrive. Also print every explore and \
+            error again at the end, sorted by name.",
+    )
+    subparser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        help="Also write a record of each result in a machine-readable format: \
+            newline-delimited JSON, JUnit XML or a JSON array. Records are \
+            written as results arrive.",
+    )
+    subparser.add_argument(
+        "--output-file",
+        help="The file to write records to with --output-format. \
+            By default, they're written to stdout.",
+    )
+    subparser.add_argument(
+        "--shard",
+        type=shard_type,
+        help="Only test one shard of the selected explores, in 'index/count' \
+            format. For instance, '2/4' splits the explores into four shards and \
+            tests the second. Use this to split a run across parallel CI jobs.",
+    )
+    subparser.add_argument(
+        "--timing-file",
+        help="The path to a results file from a previous run. When sharding, \
+            explores are balanced by the query runtimes recorded in this file \
+            instead of by their number of dimensions.",
+    )
+    subparser.add_argument(
+        "--results-file",
+        help="The path to write a JSON file with the status and runtime of each \
+            explore and any errors found. Results files from several shards can \
+            be combined with `spectacles merge`. The default is results.json in \
+            the log directory.",
+    )
+    subparser.add_argument(
+        "--rerun-failed",
+        action="store_true",
+        help="Only test the explores that failed in the run recorded in the \
+            results file. When the errors were found by testing dimensions one \
+            at a time, only the dimensions with errors are tested again.",
+    )
+    work_group = subparser.add_mutually_exclusive_group()
+    work_group.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Build the project and write its explores to the work queue for \
+            worker processes to test, then wait for their results.",
+    )
+    work_group.add_argument(
+        "--worker",
+        action="store_true",
+        help="Claim explores from the work queue and test them until the queue \
+            is finished. Start as many workers as you like on the same machine.",
+    )
+    subparser.add_argument(
+        "--work-queue",
+        default="spectacles-work-queue.db",
+        help="The path to the SQLite file shared by the coordinator and workers. \
+            The default is spectacles-work-queue.db.",
+    )
+    subparser.add_argument(
+        "--slot-pool",
+        help="The path to a directory of query slots shared by every spectacles \
+            process that uses it. Queries then need a slot from the pool as well \
+            as one of the run's own, so runs against the same Looker instance \
+            don't overload the data warehouse together.",
+    )
+    subparser.add_argument(
+        "--slot-pool-size",
+        default=10,
+        type=int,
+        help="Specify how many queries may run at once across all processes \
+            sharing the slot pool. The first process to use a pool sets its size \
+            and later processes keep it. The default is 10.",
+    )
+    subparser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only test the selected explores that changed compared to the base \
+            branch: new explores, explores with new, changed or removed \
+            dimensions, and explores whose joins changed.",
+    )
+    subparser.add_argument(
+        "--base",
+        default="master",
+        help="The branch to compare against in incremental mode. \
+            The default is master.",
+    )
+    subparser.add_argument(
+        "--cache-dir",
+        default=".spectacles-cache",
+        help="The directory to cache the base branch's metadata in, by commit, \
+            so repeat incremental runs don't need to fetch it again. \
+            The default is .spectacles-cache.",
+    )
+    subparser.add_argument(
+        "--checkpoint",
+        help="The path to a journal of the run's progress. If the run is \
+            interrupted or stopped early, the journal is kept so the run can be \
+            resumed with --resume. It's removed once a run finishes.",
+    )
+    subparser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the run journaled in the --checkpoint file. Finished \
+            explores and dimensions aren't tested again and queries that were \
+            still running are picked up where they left off. If there's no \
+            checkpoint, the run starts from scratch.",
+    )
 
 
 def _build_assert_subparser(
@@ -428,6 +735,147 @@ def _build_assert_subparser(
             user's branch to the revision of the branch that is on the remote. \
             WARNING: This will delete any uncommited changes in the user's workspace.",
     )
+    subparser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop starting new data tests after the first failing test.",
+    )
+    subparser.add_argument(
+        "--concurrency",
+        default=10,
+        type=int,
+        help="Specify how many calls running data tests you want to have running \
+            at once. The default is 10.",
+    )
+    subparser.add_argument(
+        "--split-by",
+        choices=["project", "model", "test"],
+        default="model",
+        help="Run the data tests in one call per model, one call per test, or all \
+            in a single call for the whole project. The default is model.",
+    )
+    subparser.add_argument(
+        "--tests",
+        nargs="+",
+        default=["*/*"],
+        help="Specify the data tests to run, in the format \
+            'model_name/test_name'. Use '*' to select every model or test, \
+            e.g. 'model_name/*'. The default runs every test.",
+    )
+    subparser.add_argument(
+        "--cache-dir",
+        help="Remember passing tests in this directory, and skip tests that \
+            passed before until the test, the explore it queries or the branch's \
+            commit changes. Changes to the data in the warehouse don't count, so \
+            a test the data has since broken keeps being skipped. Only use it when \
+            the data doesn't change between runs. By default, every selected test \
+            runs.",
+    )
+    subparser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        help="Also write a record of each result in a machine-readable format: \
+            newline-delimited JSON, JUnit XML or a JSON array. Records are \
+            written as results arrive.",
+    )
+    subparser.add_argument(
+        "--output-file",
+        help="The file to write records to with --output-format. \
+            By default, they're written to stdout.",
+    )
+
+
+def _build_all_subparser(
+    subparser_action: argparse._SubParsersAction,
+    base_subparser: argparse.ArgumentParser,
+) -> None:
+    """Returns the subparser for the subcommand `all`.
+
+    Args:
+        subparser_action: Subparsers action to add the subparser to.
+        base_subparser: Subparser with the arguments shared by every subcommand.
+
+    """
+    subparser = subparser_action.add_parser(
+        "all",
+        parents=[base_subparser],
+        help="Run the SQL validator and Looker data tests at the same time.",
+    )
+
+    subparser.add_argument(
+        "--project", action=EnvVarAction, env_var="LOOKER_PROJECT", required=True
+    )
+    subparser.add_argument(
+        "--branch", action=EnvVarAction, env_var="LOOKER_GIT_BRANCH", required=True
+    )
+    subparser.add_argument(
+        "--explores",
+        nargs="+",
+        default=["*/*"],
+        help="Specify the explores the SQL validator should test. \
+            List of selector strings in 'model_name/explore_name' format.",
+    )
+    subparser.add_argument(
+        "--mode",
+        choices=["batch", "single", "hybrid"],
+        default="batch",
+        help="Specify the mode the SQL validator should run.",
+    )
+    subparser.add_argument(
+        "--remote-reset",
+        action="store_true",
+        help="When set to true, spectacles will tell Looker to reset the \
+            user's branch to the revision of the branch that is on the remote. \
+            WARNING: This will delete any uncommited changes in the user's workspace.",
+    )
+    subparser.add_argument(
+        "--concurrency",
+        default=10,
+        type=int,
+        help="Specify how many concurrent queries you want to have running \
+            against your data warehouse. The default is 10.",
+    )
+    subparser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop the SQL validator at the first SQL error, and stop starting new \
+            data tests after the first failing test.",
+    )
+    subparser.add_argument(
+        "--query-timeout",
+        type=float,
+        help="Specify a time limit in seconds for each query. Queries that run \
+            longer are cancelled and reported as timed out.",
+    )
+
+
+def _build_merge_subparser(
+    subparser_action: argparse._SubParsersAction,
+    logging_subparser: argparse.ArgumentParser,
+) -> None:
+    """Returns the subparser for the subcommand `merge`.
+
+    Args:
+        subparser_action: Description of parameter `subparser_action`.
+        logging_subparser: Subparser with the logging arguments.
+
+    Returns:
+        type: Description of returned object.
+
+    """
+    subparser = subparser_action.add_parser(
+        "merge",
+        parents=[logging_subparser],
+        help="Combine results files from sharded SQL validation runs.",
+    )
+    subparser.add_argument(
+        "results_files",
+        nargs="+",
+        help="The results files written by each shard with --results-file.",
+    )
+    subparser.add_argument(
+        "--output", help="The path to write the combined results file to."
+    )
 
 
 def run_connect(
@@ -438,7 +886,21 @@ def run_connect(
 
 
 def run_assert(
-    project, branch, base_url, client_id, client_secret, port, api_version, remote_reset
+    project,
+    branch,
+    base_url,
+    client_id,
+    client_secret,
+    port,
+    api_version,
+    remote_reset,
+    fail_fast,
+    concurrency,
+    split_by,
+    tests,
+    cache_dir,
+    output_format,
+    output_file,
 ) -> None:
     runner = Runner(
         base_url,
@@ -450,7 +912,14 @@ def run_assert(
         api_version,
         remote_reset,
     )
-    errors = runner.validate_data_tests()
+    writer = open_writer(output_format, output_file) if output_format else None
+    try:
+        errors = runner.validate_data_tests(
+            fail_fast, concurrency, split_by, tests, cache_dir, writer
+        )
+    finally:
+        if writer:
+            writer.close()
     if errors:
         for error in sorted(errors, key=lambda x: x["path"]):
             printer.print_data_test_error(error)
@@ -460,7 +929,7 @@ def run_assert(
         logger.info("")
 
 
-def run_sql(
+def run_all(
     project,
     branch,
     explores,
@@ -472,8 +941,10 @@ def run_sql(
     mode,
     remote_reset,
     concurrency,
+    fail_fast,
+    query_timeout,
 ) -> None:
-    """Runs and validates the SQL for each selected LookML dimension."""
+    """Runs the SQL validator and data tests concurrently and reports both."""
     runner = Runner(
         base_url,
         project,
@@ -484,7 +955,272 @@ def run_sql(
         api_version,
         remote_reset,
     )
-    errors = runner.validate_sql(explores, mode, concurrency)
+    sql_errors, data_test_errors = runner.validate_all(
+        explores, mode, concurrency, fail_fast, query_timeout
+    )
+    for error in sorted(sql_errors, key=lambda x: x["path"]):
+        printer.print_sql_error(error)
+    for error in sorted(data_test_errors, key=lambda x: x["path"]):
+        printer.print_data_test_error(error)
+    logger.info("")
+    if sql_errors or data_test_errors:
+        raise ValidationError
+
+
+def run_sql(
+    project,
+    branch,
+    explores,
+    base_url,
+    client_id,
+    client_secret,
+    port,
+    api_version,
+    mode,
+    remote_reset,
+    concurrency,
+    fail_fast,
+    time_budget,
+    query_timeout,
+    shard,
+    timing_file,
+    results_file,
+    coordinator,
+    worker,
+    work_queue,
+    slot_pool,
+    slot_pool_size,
+    checkpoint,
+    resume,
+    rerun_failed,
+    incremental,
+    base,
+    cache_dir,
+    branches,
+    instances,
+    summary,
+    output_format,
+    output_file,
+) -> None:
+    """Runs and validates the SQL for each selected LookML dimension."""
+    # A single project can come from an environment variable or config file
+    projects = project if isinstance(project, list) else [project]
+    if resume and not checkpoint:
+        raise SpectaclesException("--resume needs a --checkpoint file to resume.")
+    if not branch and not branches:
+        raise SpectaclesException("Specify a branch to test with --branch.")
+    if branches and len(projects) > 1:
+        raise SpectaclesException("Test several branches of one project at a time.")
+    if output_format and (instances or branches or len(projects) > 1 or worker):
+        raise SpectaclesException(
+            "--output-format only works when testing one project on one branch "
+            "and instance."
+        )
+    if instances:
+        if branches or len(projects) > 1:
+            raise SpectaclesException(
+                "Test one project and branch at a time across several instances."
+            )
+        _reject_options(
+            "across several instances",
+            shard=shard,
+            checkpoint=checkpoint,
+            rerun_failed=rerun_failed,
+            incremental=incremental,
+            summary=summary,
+            coordinator=coordinator,
+            worker=worker,
+            slot_pool=slot_pool,
+        )
+        results = Runner.validate_sql_instances(
+            instances,
+            projects[0],
+            branch,
+            explores,
+            mode,
+            concurrency,
+            fail_fast,
+            time_budget,
+            query_timeout,
+            results_file,
+            api_version,
+            remote_reset,
+        )
+        printer.print_header("Comparison across instances")
+        for row in compare_results(results):
+            printer.print_comparison(
+                f"{row['model']}.{row['explore']}", row["statuses"]
+            )
+        _report_sql_errors_by(
+            "Instance", {name: result["errors"] for name, result in results.items()}
+        )
+        return
+    if branches or len(projects) > 1:
+        _reject_options(
+            "several branches" if branches else "several projects",
+            shard=shard,
+            checkpoint=checkpoint,
+            rerun_failed=rerun_failed,
+            incremental=incremental,
+            coordinator=coordinator,
+            worker=worker,
+        )
+    if worker or coordinator:
+        # Workers and the coordinator only share a project, mode and explores
+        options = dict(
+            fail_fast=fail_fast,
+            time_budget=time_budget,
+            shard=shard,
+            checkpoint=checkpoint,
+            rerun_failed=rerun_failed,
+            incremental=incremental,
+            summary=summary,
+        )
+        if worker:
+            _reject_options("as a worker", **options)
+        else:
+            _reject_options(
+                "as the coordinator",
+                query_timeout=query_timeout,
+                slot_pool=slot_pool,
+                output_format=output_format,
+                **options,
+            )
+    runner = Runner(
+        base_url,
+        projects[0],
+        branches[0] if branches else branch,
+        client_id,
+        client_secret,
+        port,
+        api_version,
+        remote_reset,
+    )
+    pool = SlotPool(slot_pool, slot_pool_size) if slot_pool else None
+    if branches:
+        errors_by_branch = runner.validate_sql_branches(
+            branches,
+            explores,
+            mode,
+            concurrency,
+            fail_fast,
+            time_budget,
+            query_timeout,
+            results_file,
+            pool,
+            remote_reset,
+            summary,
+        )
+        _report_sql_errors_by("Branch", errors_by_branch)
+        return
+    if len(projects) > 1:
+        errors_by_project = runner.validate_sql_projects(
+            projects,
+            explores,
+            mode,
+            concurrency,
+            fail_fast,
+            time_budget,
+            query_timeout,
+            results_file,
+            pool,
+            remote_reset,
+        )
+        _report_sql_errors_by("Project", errors_by_project)
+        return
+    if worker:
+        completed = runner.work_sql(work_queue, concurrency, query_timeout, pool)
+        logger.info(
+            f"\nCompleted {completed} work {'item' if completed == 1 else 'items'}. "
+            "The coordinator reports the results."
+        )
+        return
+    elif coordinator:
+        errors = runner.coordinate_sql(explores, mode, work_queue, results_file)
+    else:
+        writer = open_writer(output_format, output_file) if output_format else None
+        try:
+            errors = runner.validate_sql(
+                explores,
+                mode,
+                concurrency,
+                fail_fast,
+                time_budget,
+                query_timeout,
+                shard,
+                timing_file,
+                results_file,
+                pool,
+                checkpoint,
+                resume,
+                rerun_failed,
+                incremental,
+                base,
+                cache_dir,
+                summary,
+                writer,
+            )
+        finally:
+            if writer:
+                writer.close()
+    if errors:
+        # Without a summary, the validator already printed errors as they arrived
+        if coordinator or summary:
+            for error in sorted(errors, key=lambda x: x["path"]):
+                printer.print_sql_error(error)
+        logger.info("")
+        raise ValidationError
+    else:
+        logger.info("")
+
+
+def _reject_options(context: str, **options) -> None:
+    """Raises if options that don't apply to a kind of run were given.
+
+    Args:
+        context: Describes the kind of run, e.g. 'across several instances'.
+        **options: Value of each option, keyed by the option's argument name.
+
+    """
+    given = [f"--{name.replace('_', '-')}" for name, value in options.items() if value]
+    if given:
+        verb = "doesn't" if len(given) == 1 else "don't"
+        raise SpectaclesException(
+            f"{', '.join(given)} {verb} work when testing {context}."
+        )
+
+
+def _report_sql_errors_by(label: str, errors_by_name: Dict[str, List[dict]]):
+    """Prints SQL errors grouped by branch or project, raising if there are any."""
+    for name, errors in errors_by_name.items():
+        printer.print_header(
+            f"{label} {name}: {len(errors)} {'error' if len(errors) == 1 else 'errors'}"
+        )
+        for error in sorted(errors, key=lambda x: x["path"]):
+            printer.print_sql_error(error)
+    logger.info("")
+    if any(errors_by_name.values()):
+        raise ValidationError
+
+
+def run_merge(results_files: List[str], output: Optional[str]) -> None:
+    """Combines results files from sharded runs into a single report."""
+    results = merge_results([load_results(path) for path in results_files])
+    explore_count = len(results["explores"])
+    printer.print_header(
+        f"Merged results for {explore_count} "
+        f"{'explore' if explore_count == 1 else 'explores'} "
+        f"from {len(results_files)} {'file' if len(results_files) == 1 else 'files'}"
+    )
+    for explore in results["explores"]:
+        printer.print_validation_result(
+            explore["status"], f"{explore['model']}.{explore['explore']}"
+        )
+    if output:
+        write_results(
+            output, results["project"], results["explores"], results["errors"]
+        )
+    errors = results["errors"]
     if errors:
         for error in sorted(errors, key=lambda x: x["path"]):
             printer.print_sql_error(error)
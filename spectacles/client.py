@@ -1,15 +1,34 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Tuple, Any, Optional
 import asyncio
 import backoff  # type: ignore
 import aiohttp
 import requests
 import spectacles.utils as utils
 from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.hooks import hooks
 from spectacles.exceptions import SpectaclesException, ApiConnectionError
 
 JsonDict = Dict[str, Any]
 
 
+def record_response(method: Optional[str], url: Any, status: int) -> None:
+    """Passes a response from the Looker API to the on_request hooks."""
+    if hooks.active("on_request"):
+        hooks.emit("on_request", method, str(url), status)
+
+
+def count_response(response: requests.Response, *args, **kwargs) -> None:
+    """Records a response from the Looker API, used as a requests response hook."""
+    record_response(response.request.method, response.url, response.status_code)
+
+
+def record_retry(details: Dict[str, Any]) -> None:
+    """Passes a retried API call to the on_retry hooks, used as a backoff handler."""
+    hooks.emit(
+        "on_retry", details["target"].__name__, details["tries"], details["wait"]
+    )
+
+
 class LookerClient:
     """Wraps some endpoints of the Looker API, issues requests and handles responses.
 
@@ -23,6 +42,8 @@ class LookerClient:
     Attributes:
         api_url: Combined URL used as a base for request building.
         session: Persistent session to avoid re-authenticating.
+        explores: Explore metadata already fetched for the checked out branch, keyed
+            by model and explore name.
 
     """
 
@@ -45,6 +66,8 @@ class LookerClient:
         self.base_url: str = base_url.rstrip("/")
         self.api_url: str = f"{self.base_url}:{port}/api/{api_version}/"
         self.session: requests.Session = requests.Session()
+        self.session.hooks["response"].append(count_response)
+        self.explores: Dict[Tuple[str, str], JsonDict] = {}
 
         self.authenticate(client_id, client_secret, api_version)
 
@@ -120,6 +143,8 @@ class LookerClient:
             branch: Name of the Git branch to check out.
 
         """
+        # Explore metadata depends on the branch
+        self.explores.clear()
         if branch == "master":
             logger.debug("Updating session to use production workspace")
             url = utils.compose_url(self.api_url, path=["session"])
@@ -249,6 +274,54 @@ class LookerClient:
 
         return response.json()
 
+    async def run_lookml_test_async(
+        self,
+        session: aiohttp.ClientSession,
+        project: str,
+        model: Optional[str] = None,
+        test: Optional[str] = None,
+    ) -> List[JsonDict]:
+        """Runs a project's LookML/data tests asynchronously.
+
+        Like run_lookml_test, but on an asynchronous session so tests for different
+        models, or individual tests, can run at the same time.
+
+        Args:
+            session: Existing asychronous HTTP session.
+            project: Name of the Looker project to use
+            model: Optional name of the LookML model to restrict testing to
+            test: Optional name of a single test to run
+
+        Returns:
+            List[JsonDict]: JSON response containing any LookML/data test errors
+
+        """
+        logger.debug(
+            "Running LookML tests for project %s (model: %s, test: %s)",
+            project,
+            model or "*",
+            test or "*",
+        )
+        url = utils.compose_url(
+            self.api_url, path=["projects", project, "lookml_tests", "run"]
+        )
+        params = {}
+        if model is not None:
+            params["model"] = model
+        if test is not None:
+            params["test"] = test
+        async with session.get(url=url, params=params) as response:
+            record_response(response.method, response.url, response.status)
+            try:
+                response.raise_for_status()
+            except aiohttp.ClientResponseError as error:
+                raise ApiConnectionError(
+                    f"Failed to run data tests for project {project}\n"
+                    f'Error raised: "{error}"'
+                )
+            result = await response.json()
+        return result
+
     def get_lookml_models(self) -> List[JsonDict]:
         """Gets all models and explores from the LookmlModel endpoint.
 
@@ -272,6 +345,36 @@ class LookerClient:
 
         return response.json()
 
+    def get_git_branch(self, project: str, branch: str) -> JsonDict:
+        """Gets the state of a Git branch, including the commit it points to.
+
+        Args:
+            project: Name of the Looker project.
+            branch: Name of the Git branch.
+
+        Returns:
+            JsonDict: JSON response describing the branch, e.g. its 'ref' and
+                'remote_ref' commit SHAs.
+
+        """
+        logger.debug(f"Getting Git branch {branch} of project {project}")
+        url = utils.compose_url(
+            self.api_url, path=["projects", project, "git_branch", branch]
+        )
+        response = self.session.get(url=url)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as error:
+            details = utils.details_from_http_error(response)
+            raise ApiConnectionError(
+                f"Unable to get Git branch {branch}.\n"
+                f"Looker API error encountered: {error}\n"
+                + "Message received from Looker's API: "
+                f'"{details}"'
+            )
+
+        return response.json()
+
     def get_lookml_dimensions(self, model: str, explore: str) -> List[str]:
         """Gets all dimensions for an explore from the LookmlModel endpoint.
 
@@ -285,6 +388,24 @@ class LookerClient:
 
         """
         logger.debug(f"Getting all dimensions from explore {explore}")
+        return self.get_lookml_explore(model, explore)["fields"]["dimensions"]
+
+    def get_lookml_explore(self, model: str, explore: str) -> JsonDict:
+        """Gets an explore's metadata, including its fields and joins.
+
+        Responses are kept until another branch is checked out, so the same explore
+        is only fetched once per branch.
+
+        Args:
+            model: Name of LookML model to query.
+            explore: Name of LookML explore to query.
+
+        Returns:
+            JsonDict: JSON response from the LookmlModelExplore endpoint.
+
+        """
+        if (model, explore) in self.explores:
+            return self.explores[(model, explore)]
         url = utils.compose_url(
             self.api_url, path=["lookml_models", model, "explores", explore]
         )
@@ -294,16 +415,20 @@ class LookerClient:
         except requests.exceptions.HTTPError as error:
             details = utils.details_from_http_error(response)
             raise ApiConnectionError(
-                f'Unable to get dimensions for explore "{explore}".\n'
+                f'Unable to get metadata for explore "{explore}".\n'
                 f"Looker API error encountered: {error}\n"
                 + "Message received from Looker's API: "
                 f'"{details}"'
             )
 
-        return response.json()["fields"]["dimensions"]
+        self.explores[(model, explore)] = response.json()
+        return self.explores[(model, explore)]
 
     @backoff.on_exception(
-        backoff.expo, (aiohttp.ClientError, asyncio.TimeoutError), max_tries=2
+        backoff.expo,
+        (aiohttp.ClientError, asyncio.TimeoutError),
+        max_tries=2,
+        on_backoff=record_retry,
     )
     async def create_query(
         self,
@@ -347,6 +472,7 @@ class LookerClient:
         }
         url = utils.compose_url(self.api_url, path=["queries"])
         async with session.post(url=url, json=body) as response:
+            record_response(response.method, response.url, response.status)
             result = await response.json()
             response.raise_for_status()
         query_id = result["id"]
@@ -360,7 +486,10 @@ class LookerClient:
         return query_id
 
     @backoff.on_exception(
-        backoff.expo, (aiohttp.ClientError, asyncio.TimeoutError), max_tries=2
+        backoff.expo,
+        (aiohttp.ClientError, asyncio.TimeoutError),
+        max_tries=2,
+        on_backoff=record_retry,
     )
     async def create_query_task(
         self, session: aiohttp.ClientSession, query_id: int
@@ -385,6 +514,7 @@ class LookerClient:
         async with session.post(
             url=url, json=body, params={"cache": "false"}
         ) as response:
+            record_response(response.method, response.url, response.status)
             result = await response.json()
             response.raise_for_status()
         query_task_id = result["id"]
@@ -413,10 +543,38 @@ class LookerClient:
         async with session.get(
             url=url, params={"query_task_ids": ",".join(query_task_ids)}
         ) as response:
+            record_response(response.method, response.url, response.status)
             result = await response.json()
             response.raise_for_status()
         return result
 
+    @backoff.on_exception(
+        backoff.expo,
+        (aiohttp.ClientError, asyncio.TimeoutError),
+        max_tries=2,
+        on_backoff=record_retry,
+    )
+    async def get_query_sql(self, session: aiohttp.ClientSession, query_id: int) -> str:
+        """Gets the SQL Looker generates for a previously created query.
+
+        Generating the SQL doesn't run anything in the data warehouse.
+
+        Args:
+            session: Existing asychronous HTTP session.
+            query_id: ID of a previously created query.
+
+        Returns:
+            str: The query's SQL.
+
+        """
+        logger.debug("Getting SQL for query %d", query_id)
+        url = utils.compose_url(self.api_url, path=["queries", query_id, "run", "sql"])
+        async with session.get(url=url) as response:
+            record_response(response.method, response.url, response.status)
+            sql = await response.text()
+            response.raise_for_status()
+        return sql
+
     async def cancel_query_task(
         self, session: aiohttp.ClientSession, query_task_id: str
     ):
@@ -429,6 +587,7 @@ class LookerClient:
         logger.debug(f"Cancelling query task: {query_task_id}")
         url = utils.compose_url(self.api_url, path=["running_queries", query_task_id])
         async with session.delete(url=url) as response:
+            record_response(response.method, response.url, response.status)
             await response.read()
 
             # No raise_for_status() here because Looker API seems to give a 404
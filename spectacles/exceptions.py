@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class SpectaclesException(Exception):
     exit_code = 100
 
@@ -15,7 +18,7 @@ class SqlError(ValidationError):
         self,
         path: str,
         message: str,
-        sql: str,
+        sql: Optional[str],
         line_number: int = None,
         url: str = None,
     ):
@@ -30,6 +33,20 @@ class SqlError(ValidationError):
         return self.message
 
 
+class QueryTimeoutError(SqlError):
+    def __init__(self, path: str, timeout: float, url: str = None):
+        super().__init__(
+            path=path,
+            message=(
+                f"Query timed out after {timeout:g} seconds and was cancelled. "
+                "This isn't a SQL error, but the query took too long to run."
+            ),
+            sql=None,
+            url=url,
+        )
+        self.timeout = timeout
+
+
 class DataTestError(ValidationError):
     def __init__(self, path: str, message: str):
         super().__init__(message)
@@ -0,0 +1,103 @@
+from typing import List, Dict, Callable, Optional
+import os
+import sys
+import importlib
+from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.exceptions import SpectaclesException
+
+# Events that callbacks can be registered for, with the arguments they're called with
+EVENTS = (
+    "on_request",  # method, url, status
+    "on_retry",  # method, tries, wait
+    "on_query_created",  # query
+    "on_slot_wait",  # query, seconds
+    "on_query_transition",  # query, previous_state
+    "on_query_result",  # result
+    "on_explore_done",  # model, explore, status
+    "on_run_done",  # validator
+)
+
+
+class Hooks:
+    """Calls back user code when things happen during a run.
+
+    Callbacks are registered for an event and called in the order they were
+    registered. The tracer and the metrics registry observe runs through the same
+    events, so each point in a run emits its event once for all of them.
+
+    An exception raised by a callback is logged and doesn't stop the run.
+
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable]] = {event: [] for event in EVENTS}
+
+    def _get(self, event: str) -> List[Callable]:
+        try:
+            return self._callbacks[event]
+        except KeyError:
+            raise SpectaclesException(
+                f"Unknown hook event '{event}', choose from " + ", ".join(EVENTS) + "."
+            )
+
+    def register(self, event: str, callback: Optional[Callable] = None):
+        """Registers a callback for an event, also usable as a decorator.
+
+        Args:
+            event: Name of the event, e.g. 'on_query_result'.
+            callback: Function to call with the event's arguments.
+
+        """
+        callbacks = self._get(event)
+        if callback is None:
+
+            def decorator(callback: Callable) -> Callable:
+                callbacks.append(callback)
+                return callback
+
+            return decorator
+        callbacks.append(callback)
+        return callback
+
+    def unregister(self, event: str, callback: Callable) -> None:
+        self._get(event).remove(callback)
+
+    def clear(self) -> None:
+        for callbacks in self._callbacks.values():
+            callbacks.clear()
+
+    def active(self, event: str) -> bool:
+        """Returns True if an event has callbacks, e.g. to skip building arguments."""
+        return bool(self._callbacks[event])
+
+    def emit(self, event: str, *args) -> None:
+        for callback in self._callbacks[event]:
+            try:
+                callback(*args)
+            except Exception as error:
+                logger.warning(
+                    f"Hook {getattr(callback, '__name__', callback)} for {event} "
+                    f"failed: {error}"
+                )
+
+
+hooks = Hooks()
+
+
+def load_hooks(modules: List[str]) -> None:
+    """Imports modules that register callbacks with hooks when they're imported.
+
+    Args:
+        modules: Names of the modules, found in the working directory or installed.
+
+    """
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as error:
+            raise SpectaclesException(
+                f"Couldn't import hooks module '{module}'. Error raised: {error}"
+            )
+        logger.debug(f"Loaded hooks from {module}")
@@ -0,0 +1,152 @@
+from typing import List, Dict, Set, Optional
+from pathlib import Path
+import hashlib
+import json
+from spectacles.client import LookerClient, JsonDict
+from spectacles.logger import GLOBAL_LOGGER as logger
+
+
+def snapshot_explore(explore_json: JsonDict) -> dict:
+    """Extracts the parts of an explore's metadata that shape its generated SQL.
+
+    Args:
+        explore_json: JSON response from the LookmlModelExplore endpoint.
+
+    Returns:
+        dict: The explore's base table, the SQL of each dimension keyed by name, and
+            its joins sorted by name.
+
+    """
+    return {
+        "sql_table_name": explore_json.get("sql_table_name"),
+        "dimensions": {
+            dimension["name"]: dimension.get("sql")
+            for dimension in explore_json["fields"]["dimensions"]
+        },
+        "joins": sorted(explore_json.get("joins") or [], key=lambda x: x["name"]),
+    }
+
+
+def compare_snapshots(base: Optional[dict], head: dict) -> List[str]:
+    """Lists the reasons an explore's SQL may have changed since the base branch.
+
+    Args:
+        base: Snapshot of the explore on the base branch, or None if it's new.
+        head: Snapshot of the explore on the branch being validated.
+
+    Returns:
+        List[str]: Human-readable reasons, empty if the explore is unchanged.
+
+    """
+    if base is None:
+        return ["new explore"]
+
+    reasons = []
+    changed = [
+        name
+        for name, sql in head["dimensions"].items()
+        if name not in base["dimensions"] or base["dimensions"][name] != sql
+    ]
+    if changed:
+        reasons.append(
+            f"{len(changed)} new or changed "
+            f"{'dimension' if len(changed) == 1 else 'dimensions'}"
+        )
+    # Other dimensions may still reference the ones that were removed
+    removed = set(base["dimensions"]) - set(head["dimensions"])
+    if removed:
+        reasons.append(
+            f"{len(removed)} removed "
+            f"{'dimension' if len(removed) == 1 else 'dimensions'}"
+        )
+    if base["joins"] != head["joins"]:
+        reasons.append("changed joins")
+    if base["sql_table_name"] != head["sql_table_name"]:
+        reasons.append("changed sql_table_name")
+    return reasons
+
+
+def snapshot_branch(
+    client: LookerClient, project: str, selection: Dict[str, Set[str]]
+) -> Dict[str, dict]:
+    """Snapshots the selected explores on the branch that's currently checked out.
+
+    Unlike building a project, selected explores that don't exist on the branch are
+    left out rather than raising an error, since they may be new on the other branch.
+
+    Args:
+        client: Looker API client, with the branch to snapshot checked out.
+        project: Name of the LookML project.
+        selection: A hierarchy of selected model names (keys) and explore names
+            (values), as returned by SqlValidator.parse_selectors.
+
+    Returns:
+        Dict[str, dict]: Snapshot of each explore, keyed by 'model_name/explore_name'.
+
+    """
+    snapshots = {}
+    for model in client.get_lookml_models():
+        if model["project_name"] != project:
+            continue
+        explore_names = selection.get(model["name"], set()) | selection.get("*", set())
+        for explore in model["explores"]:
+            if "*" in explore_names or explore["name"] in explore_names:
+                explore_json = client.get_lookml_explore(model["name"], explore["name"])
+                key = f"{model['name']}/{explore['name']}"
+                snapshots[key] = snapshot_explore(explore_json)
+    return snapshots
+
+
+def load_snapshots(path: Path, selectors: List[str]) -> Optional[Dict[str, dict]]:
+    """Loads cached snapshots, or returns None if they're missing or don't apply."""
+    try:
+        with path.open("r") as file:
+            cached = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if cached.get("selectors") != sorted(selectors):
+        logger.debug(f"Cached metadata in {path} was for other selectors, ignoring it")
+        return None
+    return cached["explores"]
+
+
+def save_snapshots(path: Path, selectors: List[str], snapshots: Dict[str, dict]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as file:
+        json.dump({"selectors": sorted(selectors), "explores": snapshots}, file)
+
+
+def fingerprint_data_test(test: JsonDict, explore_json: JsonDict, ref: str) -> str:
+    """Hashes everything a data test's outcome depends on.
+
+    Unlike an explore's snapshot, this covers all of the explore's metadata, since
+    tests can query measures and filters as well as dimensions.
+
+    Args:
+        test: JSON response describing the test, including its query and assertion.
+        explore_json: JSON response from the LookmlModelExplore endpoint for the
+            explore the test queries.
+        ref: Commit SHA of the branch the test runs on.
+
+    Returns:
+        str: Hex digest that changes whenever the test or its inputs change.
+
+    """
+    inputs = {"test": test, "explore": explore_json, "ref": ref}
+    encoded = json.dumps(inputs, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_passed_tests(path: Path) -> Dict[str, str]:
+    """Loads the fingerprint each test had when it last passed, keyed by path."""
+    try:
+        with path.open("r") as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_passed_tests(path: Path, passed: Dict[str, str]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as file:
+        json.dump(passed, file, indent=2, sort_keys=True)
@@ -58,6 +58,14 @@ class Dimension(LookMlObject):
         url = json_dict["lookml_link"]
         return cls(name, type, sql, url)
 
+    def to_json(self):
+        return {
+            "name": self.name,
+            "type": self.type,
+            "sql": self.sql,
+            "lookml_link": self.url,
+        }
+
 
 class Explore(LookMlObject):
     def __init__(self, name: str, dimensions: List[Dimension] = None):
@@ -0,0 +1,294 @@
+from typing import List, Dict, Tuple, Sequence, Optional, TypeVar, Callable
+import os
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from spectacles.queries import TRANSITIONS, SLOT_STATES
+from spectacles.hooks import hooks
+from spectacles.logger import GLOBAL_LOGGER as logger
+
+# Upper bounds in seconds of the query duration histogram's buckets
+DURATION_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+M = TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """A named metric with a value for each combination of its labels.
+
+    Args:
+        registry: Registry the metric is rendered by.
+        name: Name of the metric.
+        description: Help text for the metric.
+        labels: Names of the metric's labels.
+
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+    ):
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for key, value in sorted(list(self.values.items())):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Counts observations into buckets, along with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DURATION_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        counts = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-1] += 1  # The +Inf bucket, which is also the count
+        self.sums[key] = self.sums.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        names = self.labels + ("le",)
+        for key, counts in sorted(list(self.counts.items())):
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, counts):
+                labels = _format_labels(names, key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {self.sums[key]:g}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Collects metrics and exposes them in the Prometheus text format.
+
+    Metrics are only recorded once the registry is started. Callbacks added with on
+    record them from hook events, and are only registered while it's started.
+
+    Attributes:
+        enabled: True if metrics are being recorded.
+        metrics: Every metric in the registry, in the order they were created.
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics: List[Metric] = []
+        self._callbacks: List[Tuple[str, Callable]] = []
+        self._server: Optional[HTTPServer] = None
+
+    def counter(
+        self, name: str, description: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self._add(Counter(self, name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, description, labels))
+
+    def histogram(
+        self, name: str, description: str, labels: Sequence[str] = ()
+    ) -> Histogram:
+        return self._add(Histogram(self, name, description, labels))
+
+    def _add(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def on(self, event: str) -> Callable[[Callable], Callable]:
+        """Decorates a callback that records metrics when a hook event is emitted."""
+
+        def decorator(callback: Callable) -> Callable:
+            self._callbacks.append((event, callback))
+            return callback
+
+        return decorator
+
+    def start(self) -> None:
+        """Clears any earlier values and starts recording."""
+        self._unregister()
+        for metric in self.metrics:
+            metric.values.clear()
+            if isinstance(metric, Histogram):
+                metric.counts.clear()
+                metric.sums.clear()
+        self.enabled = True
+        for event, callback in self._callbacks:
+            hooks.register(event, callback)
+
+    def _unregister(self) -> None:
+        if self.enabled:
+            for event, callback in self._callbacks:
+                hooks.unregister(event, callback)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes the metrics for a textfile collector, replacing the file at once."""
+        target = Path(path)
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        temporary.write_text(self.render())
+        os.replace(str(temporary), str(target))
+
+    def serve(self, port: int) -> None:
+        """Serves the metrics on a local port from a background thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics server: " + format, *args)
+
+        self._server = HTTPServer(("localhost", port), Handler)
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        logger.info(f"Serving metrics on http://localhost:{port}/metrics")
+
+    def stop(self) -> None:
+        """Stops recording and shuts down the server, if metrics are being served."""
+        self._unregister()
+        self.enabled = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+metrics = Registry()
+
+QUERIES = metrics.counter(
+    "spectacles_queries_total",
+    "Number of queries that reached each lifecycle state.",
+    ["state"],
+)
+QUERY_DURATION = metrics.histogram(
+    "spectacles_query_duration_seconds",
+    "Number of seconds each query ran in the warehouse, by explore.",
+    ["model", "explore"],
+)
+QUERY_SLOTS = metrics.gauge(
+    "spectacles_query_slots", "Number of queries allowed to run at once."
+)
+QUERY_SLOTS_IN_USE = metrics.gauge(
+    "spectacles_query_slots_in_use", "Number of query slots currently held."
+)
+POLLS = metrics.counter(
+    "spectacles_polls_total", "Number of times query results were polled for."
+)
+API_RESPONSES = metrics.counter(
+    "spectacles_api_responses_total",
+    "Number of responses from the Looker API, by HTTP status.",
+    ["status"],
+)
+API_RETRIES = metrics.counter(
+    "spectacles_api_retries_total",
+    "Number of Looker API calls that were retried, by client method.",
+    ["method"],
+)
+
+
+@metrics.on("on_query_created")
+def _count_created(query) -> None:
+    QUERIES.inc(state=query.state)
+
+
+@metrics.on("on_query_transition")
+def _count_transition(query, previous: str) -> None:
+    holds_slot = query.state in SLOT_STATES
+    if holds_slot != (previous in SLOT_STATES):
+        QUERY_SLOTS_IN_USE.inc(1 if holds_slot else -1)
+    if not TRANSITIONS[query.state] and query.started is not None:
+        QUERY_DURATION.observe(
+            query.finished - query.started, model=query.model, explore=query.explore
+        )
+    QUERIES.inc(state=query.state)
+
+
+@metrics.on("on_request")
+def _count_response(method: Optional[str], url: str, status: int) -> None:
+    API_RESPONSES.inc(status=str(status))
+    if "/query_tasks/multi_results" in url:
+        POLLS.inc()
+
+
+@metrics.on("on_retry")
+def _count_retry(method: str, tries: int, wait: float) -> None:
+    API_RETRIES.inc(method=method)
@@ -1,6 +1,6 @@
 import os
 import textwrap
-from typing import List
+from typing import List, Dict
 import colorama  # type: ignore
 from spectacles.logger import GLOBAL_LOGGER as logger, COLORS
 
@@ -31,6 +31,10 @@ def green(text: str) -> str:
     return color(text, "green")
 
 
+def yellow(text: str) -> str:
+    return color(text, "yellow")
+
+
 def print_header(text: str, line_width: int = LINE_WIDTH) -> None:
     header = f" {text} ".center(line_width, "=")
     logger.info(f"\n{header}\n")
@@ -54,12 +58,24 @@ def print_sql_error(error: dict) -> None:
 
 
 def print_validation_result(type: str, source: str):
+    if type == "untested":
+        logger.info(f"- {yellow(source)} untested")
+        return
     bullet = "✓" if type == "success" else "✗"
     message = green(source) if type == "success" else red(source)
     status = "passed" if type == "success" else "failed"
     logger.info(f"{bullet} {message} {status}")
 
 
+def print_comparison(source: str, statuses: Dict[str, str]) -> None:
+    """Prints the status of one explore on several instances, flagging differences."""
+    if len(set(statuses.values())) == 1:
+        print_validation_result(next(iter(statuses.values())), source)
+        return
+    details = ", ".join(f"{name}: {status}" for name, status in statuses.items())
+    logger.info(f"≠ {yellow(source)} differs ({details})")
+
+
 def mark_line(lines: List[str], line_number: int, char: str = "*") -> List[str]:
     """For a list of strings, mark a specified line with a prepended character."""
     line_number -= 1  # Align with array indexing
@@ -0,0 +1,201 @@
+from typing import DefaultDict, Optional, Iterator, Tuple
+import sys
+import time
+import random
+import asyncio
+import cProfile
+import pstats
+import threading
+import tracemalloc
+import collections
+from pathlib import Path
+from spectacles.logger import GLOBAL_LOGGER as logger
+import spectacles.printer as printer
+
+PROFILE_FILENAME = "profile.pstats"
+TASKS_FILENAME = "profile-tasks.txt"
+MEMORY_FILENAME = "profile-memory.tracemalloc"
+
+# Modules the main thread is in while it waits on the network
+NETWORK_MODULES = ("selectors.py", "socket.py", "ssl.py")
+
+
+def _where(task: asyncio.Task) -> str:
+    """Describes the coroutine a task runs and where it's currently suspended."""
+    coro = task._coro  # type: ignore
+    leaf = coro
+    # Follow the coroutines being awaited, stopping at futures and the like
+    while getattr(getattr(leaf, "cr_await", None), "cr_frame", None) is not None:
+        leaf = leaf.cr_await
+    name = getattr(coro, "__qualname__", type(coro).__name__)
+    if leaf is not coro:
+        name += f" > {leaf.__qualname__}"
+    frame = getattr(leaf, "cr_frame", None)
+    if frame is not None:
+        name += f" ({Path(frame.f_code.co_filename).name}:{frame.f_lineno})"
+    return name
+
+
+class Profiler:
+    """Profiles a run to tell whether spectacles itself or the network is slow.
+
+    The main thread is profiled with cProfile throughout, covering both the sync
+    phases and the work done on the event loop. A background thread samples which
+    coroutines the event loop's tasks are in and whether the main thread is waiting
+    on the network, and keeps a tracemalloc snapshot of the heap at its largest.
+
+    The sampler holds the GIL while it works, so it keeps its cost bounded. Each
+    sample looks at a random subset of at most max_tasks tasks, and the interval
+    backs off when samples take a while. Heap snapshots are taken at most every
+    snapshot_interval seconds, and less often if they're slow to take.
+
+    Args:
+        directory: Directory to write the profiles to, i.e. the log directory.
+        interval: Minimum number of seconds between samples.
+        top: Number of functions, coroutines and allocation sites to summarise.
+        max_tasks: Maximum number of tasks to look at in each sample.
+        snapshot_interval: Minimum number of seconds between heap snapshots.
+
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        interval: float = 0.005,
+        top: int = 10,
+        max_tasks: int = 100,
+        snapshot_interval: float = 10,
+    ):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.top = top
+        self.max_tasks = max_tasks
+        self.snapshot_interval = snapshot_interval
+        self.profile = cProfile.Profile()
+        # Estimated task-seconds spent suspended at each point
+        self.tasks: DefaultDict[str, float] = collections.defaultdict(float)
+        self.samples = 0
+        self.network_samples = 0
+        self.elapsed = 0.0
+        self.peak = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_size = 0
+        self._started = 0.0
+        self._last_sample = 0.0
+        self._random = random.Random(0)
+        self._main = threading.get_ident()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._main = threading.get_ident()
+        self._loop = asyncio.get_event_loop()
+        self._started = self._last_sample = time.monotonic()
+        tracemalloc.start()
+        self._thread = threading.Thread(target=self._sample_forever, daemon=True)
+        self._thread.start()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        """Stops profiling and writes the profiles to the directory."""
+        self.profile.disable()
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.monotonic() - self._started
+        self._check_memory()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        self.directory.mkdir(exist_ok=True)
+        self.profile.dump_stats(str(self.directory / PROFILE_FILENAME))
+        with (self.directory / TASKS_FILENAME).open("w") as file:
+            for name, seconds in self._task_timings():
+                file.write(f"{seconds:10.3f}s  {name}\n")
+        if self.snapshot is not None:
+            self.snapshot.dump(str(self.directory / MEMORY_FILENAME))
+        logger.debug(f"Profiles written to {self.directory}")
+
+    def _sample_forever(self) -> None:
+        interval = self.interval
+        next_memory_check = time.monotonic() + self.snapshot_interval
+        while not self._stopping.wait(interval):
+            started = time.monotonic()
+            self._sample()
+            # Keep the sampler to around a tenth of the main thread's time
+            interval = max(self.interval, (time.monotonic() - started) * 10)
+            if time.monotonic() >= next_memory_check:
+                started = time.monotonic()
+                self._check_memory()
+                next_memory_check = time.monotonic() + max(
+                    self.snapshot_interval, (time.monotonic() - started) * 20
+                )
+
+    def _sample(self) -> None:
+        now = time.monotonic()
+        # Each sample stands for the time since the previous one
+        weight = now - self._last_sample
+        self._last_sample = now
+        frame = sys._current_frames().get(self._main)
+        if frame is None:
+            return
+        self.samples += 1
+        if frame.f_code.co_filename.endswith(NETWORK_MODULES):
+            self.network_samples += 1
+        try:
+            tasks = list(asyncio.all_tasks(self._loop))
+        except RuntimeError:
+            # The main thread changed the set of tasks while it was being copied
+            return
+        if len(tasks) > self.max_tasks:
+            # The sampled tasks stand in for the rest
+            weight *= len(tasks) / self.max_tasks
+            tasks = self._random.sample(tasks, self.max_tasks)
+        for task in tasks:
+            self.tasks[_where(task)] += weight
+
+    def _check_memory(self) -> None:
+        """Keeps a snapshot of the heap if it's grown since the last one."""
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._snapshot_size * 1.1:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size = current
+
+    def _task_timings(self) -> Iterator[Tuple[str, float]]:
+        """Yields the estimated task-seconds spent suspended at each point."""
+        yield from sorted(self.tasks.items(), key=lambda item: item[1], reverse=True)
+
+    def print_summary(self) -> None:
+        """Prints the top functions, coroutines and allocation sites."""
+        printer.print_header("Profile")
+        if self.samples:
+            share = self.network_samples / self.samples
+            logger.info(
+                f"Waiting on the network in {share:.0%} of {self.samples} samples "
+                f"over {self.elapsed:.1f}s\n"
+            )
+
+        logger.info(printer.bold("Functions by own time"))
+        stats = pstats.Stats(self.profile).stats  # type: ignore
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        for (filename, line, function), (_, calls, own, *_) in rows[: self.top]:
+            location = f"{Path(filename).name}:{line}" if line else filename
+            logger.info(f"{own:10.3f}s {calls:>9} calls  {function} ({location})")
+
+        logger.info("\n" + printer.bold("Coroutines by task-seconds suspended there"))
+        for name, seconds in list(self._task_timings())[: self.top]:
+            logger.info(f"{seconds:10.3f}s  {name}")
+
+        logger.info(
+            "\n"
+            + printer.bold(f"Allocation sites (peak {self.peak / 2 ** 20:.1f} MiB)")
+        )
+        if self.snapshot is not None:
+            for stat in self.snapshot.statistics("lineno")[: self.top]:
+                frame = stat.traceback[0]
+                logger.info(
+                    f"{stat.size / 2 ** 10:10.1f} KiB {stat.count:>9} blocks  "
+                    f"{Path(frame.filename).name}:{frame.lineno}"
+                )
+        logger.info(f"\nProfiles written to {self.directory}")
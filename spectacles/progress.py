@@ -0,0 +1,118 @@
+from typing import Optional, IO
+import asyncio
+import logging
+import time
+from spectacles.queries import QueryTracker
+from spectacles.logger import GLOBAL_LOGGER as logger
+
+# Query states that count towards the query throughput
+COMPLETED_STATES = ("complete", "error", "timeout", "reused")
+
+
+def console_handler() -> Optional[logging.StreamHandler]:
+    """Returns the handler that logs to the console, rather than to a file."""
+    for handler in logger.handlers:
+        if isinstance(handler, logging.StreamHandler) and not isinstance(
+            handler, logging.FileHandler
+        ):
+            return handler
+    return None
+
+
+class StatusLine(logging.Filter):
+    """Shows the progress of a SQL validation run on a line that's redrawn in place.
+
+    The line shows how many queries are running, how many are waiting for a query
+    slot and how many results are in, along with the query throughput and an
+    estimate of the time left. It sits below the log output of the console, which is
+    cleared from the line before each message is logged.
+
+    The line is only drawn when the console is a terminal, so piped or redirected
+    output isn't cluttered with it.
+
+    Args:
+        queries: Tracker of the queries whose progress to show.
+        stream: Stream to draw the line on. By default, the console's log stream.
+        interval: Number of seconds between redraws.
+
+    Attributes:
+        done: Number of explore and dimension results received so far.
+        enabled: True if the line is drawn, i.e. the stream is a terminal.
+
+    """
+
+    def __init__(
+        self, queries: QueryTracker, stream: Optional[IO] = None, interval: float = 1
+    ):
+        super().__init__()
+        self.queries = queries
+        self.handler = console_handler()
+        if stream is None and self.handler is not None:
+            stream = self.handler.stream
+        self.stream = stream
+        self.interval = interval
+        self.enabled = bool(stream and hasattr(stream, "isatty") and stream.isatty())
+        self.done = 0
+        self.started = time.monotonic()
+        self.drawn = False
+        self._ticker: Optional[asyncio.Future] = None
+
+    def format(self) -> str:
+        counts = self.queries.counts
+        running = self.queries.holding_slots()
+        queued = counts["created"]
+        finished = sum(counts[state] for state in COMPLETED_STATES)
+        elapsed = time.monotonic() - self.started
+        throughput = finished / elapsed if elapsed > 0 else 0.0
+        if throughput and (running or queued):
+            eta = time.strftime(
+                "%H:%M:%S", time.gmtime((running + queued) / throughput)
+            )
+        else:
+            eta = "--:--:--"
+        return (
+            f"{running} running, {queued} queued, {self.done} done | "
+            f"{throughput:.1f} queries/s | ETA {eta}"
+        )
+
+    def draw(self) -> None:
+        if not self.enabled or self.stream is None:
+            return
+        self.stream.write("\r\033[K" + self.format())
+        self.stream.flush()
+        self.drawn = True
+
+    def clear(self) -> None:
+        if not self.drawn or self.stream is None:
+            return
+        self.stream.write("\r\033[K")
+        self.stream.flush()
+        self.drawn = False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Clears the line before the console logs a message over it."""
+        self.clear()
+        return True
+
+    def start(self) -> None:
+        """Starts redrawing the line periodically on the running event loop."""
+        if not self.enabled:
+            return
+        self.started = time.monotonic()
+        if self.handler is not None:
+            self.handler.addFilter(self)
+        self._ticker = asyncio.ensure_future(self._tick())
+
+    def stop(self) -> None:
+        """Stops redrawing the line and removes it from the console."""
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if self.handler is not None:
+            self.handler.removeFilter(self)
+        self.clear()
+
+    async def _tick(self) -> None:
+        while True:
+            self.draw()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,219 @@
+from typing import List, Dict, Tuple, Optional, Union, Counter, DefaultDict
+import asyncio
+import collections
+from collections import defaultdict
+from spectacles.lookml import Explore, Dimension
+from spectacles.slot_pool import SharedQuerySlots
+from spectacles.hooks import hooks
+from spectacles.exceptions import SpectaclesException, SqlError
+
+# Each state maps to the states a query is allowed to move to next
+TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "created": ("dispatched", "skipped", "reused"),
+    "dispatched": ("running", "error", "cancelled", "skipped"),
+    "running": ("complete", "error", "expired", "timeout", "cancelled"),
+    "expired": ("running", "error", "cancelled"),
+    "complete": (),
+    "error": (),
+    "timeout": (),
+    "cancelled": (),
+    "skipped": (),
+    "reused": (),
+}
+
+# Queries in these states hold a query slot
+SLOT_STATES = ("dispatched", "running", "expired")
+
+
+class Query:
+    """Represents a single Looker query for a LookML explore or dimension.
+
+    Args:
+        lookml_object: The explore or dimension the query is testing.
+        model: Name of the LookML model to query.
+        explore: Name of the LookML explore to query.
+        dimensions: Names of the LookML dimensions to select.
+
+    Attributes:
+        query_id: ID of the query once it has been created in Looker.
+        query_task_id: ID of the query task currently running the query.
+        state: Current lifecycle state, one of the keys in TRANSITIONS.
+        started: Event loop time when the current query task was created.
+        finished: Event loop time when the query reached a final state.
+        sql: SQL generated for the query, when it was looked up to reuse results.
+
+    """
+
+    def __init__(
+        self,
+        lookml_object: Union[Explore, Dimension],
+        model: str,
+        explore: str,
+        dimensions: List[str],
+    ):
+        self.lookml_object = lookml_object
+        self.model = model
+        self.explore = explore
+        self.dimensions = dimensions
+        self.query_id: Optional[int] = None
+        self.query_task_id: Optional[str] = None
+        self.state = "created"
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.sql: Optional[str] = None
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(lookml_object={self.lookml_object.name}, "
+            f"state={self.state})"
+        )
+
+    def __str__(self):
+        return f"{self.model}/{self.explore}/{self.lookml_object.name}"
+
+
+class QueryResult:
+    """Result of testing a single explore or dimension, reported as soon as it's known.
+
+    Args:
+        model: Name of the LookML model.
+        explore: Name of the LookML explore.
+        lookml_object: The explore or dimension that was tested.
+        duration: Number of seconds the query ran for, if it ran during this run.
+
+    Attributes:
+        path: Name of the explore or dimension.
+        kind: Either 'explore' or 'dimension'.
+        status: Either 'success' or 'error'.
+        error: The error the explore or dimension failed with, if any.
+        url: Link to the dimension's LookML, if it has one.
+
+    """
+
+    def __init__(
+        self,
+        model: str,
+        explore: str,
+        lookml_object: Union[Explore, Dimension],
+        duration: Optional[float] = None,
+    ):
+        self.model = model
+        self.explore = explore
+        self.path = lookml_object.name
+        self.kind = "dimension" if isinstance(lookml_object, Dimension) else "explore"
+        self.error: Optional[SqlError] = lookml_object.error
+        self.status = "error" if self.error else "success"
+        self.duration = duration
+        self.url: Optional[str] = getattr(lookml_object, "url", None)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(model={self.model}, explore={self.explore}, "
+            f"path={self.path}, status={self.status})"
+        )
+
+
+class QueryTracker:
+    """Moves queries through their lifecycle and keeps track of query slots.
+
+    A query acquires a slot when it's dispatched and the slot is released as soon as
+    the query moves to a state outside of SLOT_STATES, so every path out of a running
+    query gives its slot back.
+
+    Each step in a query's lifecycle emits a hook event, which is also how the
+    tracer and the metrics registry follow queries.
+
+    Args:
+        query_slots: Semaphore limiting the number of queries running at once, or
+            SharedQuerySlots to also honour a pool shared with other processes.
+
+    Attributes:
+        counts: Number of queries currently in each state.
+
+    """
+
+    def __init__(self, query_slots: Union[asyncio.BoundedSemaphore, SharedQuerySlots]):
+        self.query_slots = query_slots
+        self.counts: Counter[str] = collections.Counter()
+        self._by_task_id: Dict[str, Query] = {}
+
+    def create(
+        self,
+        lookml_object: Union[Explore, Dimension],
+        model: str,
+        explore: str,
+        dimensions: List[str],
+    ) -> Query:
+        query = Query(lookml_object, model, explore, dimensions)
+        self.counts[query.state] += 1
+        hooks.emit("on_query_created", query)
+        return query
+
+    def get(self, query_task_id: str) -> Query:
+        return self._by_task_id[query_task_id]
+
+    def transition(self, query: Query, state: str) -> None:
+        """Moves a query to a new state, releasing its slot if it no longer needs it.
+
+        Args:
+            query: Query to move.
+            state: State to move the query to.
+
+        """
+        if state not in TRANSITIONS[query.state]:
+            raise SpectaclesException(
+                f"Query for {query.lookml_object.name} can't move from "
+                f'"{query.state}" to "{state}"'
+            )
+        if query.state in SLOT_STATES and state not in SLOT_STATES:
+            self.query_slots.release()
+        if not TRANSITIONS[state]:
+            query.finished = asyncio.get_event_loop().time()
+        self.counts[query.state] -= 1
+        self.counts[state] += 1
+        previous, query.state = query.state, state
+        hooks.emit("on_query_transition", query, previous)
+
+    async def dispatch(self, query: Query) -> None:
+        """Waits for a query slot and marks the query as dispatched."""
+        loop = asyncio.get_event_loop()
+        waiting_since = loop.time()
+        await self.query_slots.acquire()
+        hooks.emit("on_slot_wait", query, loop.time() - waiting_since)
+        self.transition(query, "dispatched")
+
+    def start(self, query: Query, query_task_id: str) -> None:
+        """Records the query task that is now running the query."""
+        if query.query_task_id is not None:
+            # Resubmitted queries are only tracked under their latest query task
+            del self._by_task_id[query.query_task_id]
+        query.query_task_id = query_task_id
+        query.started = asyncio.get_event_loop().time()
+        self._by_task_id[query_task_id] = query
+        self.transition(query, "running")
+
+    def durations(self) -> DefaultDict[Tuple[str, str], float]:
+        """Adds up how long the started queries for each explore ran for.
+
+        Returns:
+            DefaultDict[Tuple[str, str], float]: Number of seconds keyed by model and
+                explore name.
+
+        """
+        durations: DefaultDict[Tuple[str, str], float] = defaultdict(float)
+        for query in self._by_task_id.values():
+            if query.started is not None and query.finished is not None:
+                durations[(query.model, query.explore)] += (
+                    query.finished - query.started
+                )
+        return durations
+
+    def holding_slots(self) -> int:
+        """Returns the number of queries that currently hold a query slot."""
+        return sum(self.counts[state] for state in SLOT_STATES)
+
+    def holding(self) -> List[Query]:
+        """Returns the started queries that currently hold a query slot."""
+        return [
+            query for query in self._by_task_id.values() if query.state in SLOT_STATES
+        ]
@@ -0,0 +1,191 @@
+from typing import List, Dict, Tuple, Optional
+from pathlib import Path
+import json
+from spectacles.exceptions import SpectaclesException
+
+
+def write_results(
+    path: str,
+    project: str,
+    explores: List[dict],
+    errors: List[dict],
+    shard: Optional[str] = None,
+) -> None:
+    """Writes the results of a SQL validation run to a JSON file.
+
+    Args:
+        path: Path to the results file to write.
+        project: Name of the LookML project that was validated.
+        explores: Status and query runtime for each explore that was selected.
+        errors: Dictionary representations of each SqlError.
+        shard: Shard of the project that was validated, in 'index/count' format.
+
+    """
+    results = {
+        "project": project,
+        "shard": shard,
+        "explores": explores,
+        "errors": errors,
+    }
+    with Path(path).open("w") as file:
+        json.dump(results, file, indent=2)
+
+
+def results_path(path: str, name: str) -> str:
+    """Derives the results file for one of several runs, e.g. one per branch.
+
+    Args:
+        path: Path to the results file for the whole invocation.
+        name: Name of the run, e.g. a branch or project name.
+
+    Returns:
+        str: The path with the run's name appended to the file name.
+
+    """
+    file_path = Path(path)
+    name = name.replace("/", "-")
+    return str(file_path.with_name(f"{file_path.stem}-{name}{file_path.suffix}"))
+
+
+def load_results(path: str) -> dict:
+    """Loads a results file written by a previous run.
+
+    Args:
+        path: Path to the results file to load.
+
+    Returns:
+        dict: The project, shard, explores and errors recorded in the file.
+
+    """
+    try:
+        with Path(path).open("r") as file:
+            results = json.load(file)
+    except FileNotFoundError:
+        raise SpectaclesException(f"Results file {path} does not exist.")
+    except ValueError as error:
+        raise SpectaclesException(
+            f"Results file {path} is not valid JSON. Error raised: {error}"
+        )
+    if not isinstance(results, dict) or "explores" not in results:
+        raise SpectaclesException(f"{path} is not a spectacles results file.")
+    return results
+
+
+def load_timings(path: str) -> Dict[str, float]:
+    """Loads the query runtime of each explore from a results file.
+
+    Args:
+        path: Path to the results file to load.
+
+    Returns:
+        Dict[str, float]: Runtime in seconds keyed by 'model_name/explore_name'.
+
+    """
+    results = load_results(path)
+    return {
+        f"{explore['model']}/{explore['explore']}": explore["duration"]
+        for explore in results["explores"]
+        if explore.get("duration")
+    }
+
+
+def load_failures(path: str) -> Dict[str, List[str]]:
+    """Loads the explores and dimensions that failed in a previous run.
+
+    Args:
+        path: Path to the results file to load.
+
+    Returns:
+        Dict[str, List[str]]: Names of the errored dimensions, keyed by
+            'model_name/explore_name' for each explore with an error. The list is
+            empty when the explore was only tested as a whole.
+
+    """
+    results = load_results(path)
+    return {
+        f"{explore['model']}/{explore['explore']}": explore.get(
+            "errored_dimensions", []
+        )
+        for explore in results["explores"]
+        if explore["status"] == "error"
+    }
+
+
+def compare_results(results: Dict[str, dict]) -> List[dict]:
+    """Lines up the status of each explore across several runs, e.g. instances.
+
+    Args:
+        results: Results of each run, keyed by the run's name.
+
+    Returns:
+        List[dict]: One dictionary per explore, sorted by model and explore name,
+            with the explore's status in each run. Explores a run didn't have are
+            'missing'.
+
+    """
+    statuses: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for result in results.values():
+        for explore in result["explores"]:
+            statuses[(explore["model"], explore["explore"])] = {}
+    for name, result in results.items():
+        for key in statuses:
+            statuses[key][name] = "missing"
+        for explore in result["explores"]:
+            statuses[(explore["model"], explore["explore"])][name] = explore["status"]
+    return [
+        {"model": model, "explore": explore, "statuses": statuses[(model, explore)]}
+        for model, explore in sorted(statuses)
+    ]
+
+
+def merge_results(results: List[dict]) -> dict:
+    """Combines the results of several shards into the results of a single run.
+
+    Args:
+        results: Results loaded from each shard's results file.
+
+    Returns:
+        dict: Results covering every shard.
+
+    """
+    projects = set(result["project"] for result in results)
+    if len(projects) > 1:
+        raise SpectaclesException(
+            "Can't merge results from different projects: "
+            + ", ".join(sorted(projects))
+        )
+
+    shards = [result["shard"] for result in results if result.get("shard")]
+    if shards:
+        counts = set(int(shard.split("/")[1]) for shard in shards)
+        if len(counts) > 1 or len(shards) != len(results):
+            raise SpectaclesException(
+                "Can't merge results from runs with different numbers of shards."
+            )
+        count = counts.pop()
+        indexes = sorted(int(shard.split("/")[0]) for shard in shards)
+        if indexes != list(range(1, count + 1)):
+            missing = sorted(set(range(1, count + 1)) - set(indexes))
+            raise SpectaclesException(
+                f"Expected results for {count} shards, but got shards "
+                + ", ".join(str(index) for index in indexes)
+                + (
+                    f". Missing shards: {', '.join(str(i) for i in missing)}"
+                    if missing
+                    else ", with duplicates"
+                )
+                + "."
+            )
+
+    explores: List[dict] = []
+    errors: List[dict] = []
+    for result in results:
+        explores.extend(result["explores"])
+        errors.extend(result["errors"])
+
+    return {
+        "project": projects.pop() if projects else None,
+        "shard": None,
+        "explores": sorted(explores, key=lambda x: (x["model"], x["explore"])),
+        "errors": errors,
+    }
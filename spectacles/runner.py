@@ -1,7 +1,28 @@
-from typing import List
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+import asyncio
+import os
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
 from spectacles.client import LookerClient
 from spectacles.validators import SqlValidator, DataTestValidator
-from spectacles.utils import log_duration
+from spectacles.results import write_results, results_path, load_timings, load_failures
+from spectacles.work_queue import WorkQueue
+from spectacles.slot_pool import SlotPool
+from spectacles.checkpoint import Checkpoint
+from spectacles.incremental import (
+    snapshot_branch,
+    load_snapshots,
+    save_snapshots,
+    load_passed_tests,
+    save_passed_tests,
+)
+from spectacles.writers import ResultWriter
+from spectacles.utils import log_duration, run_until_interrupted
+from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.exceptions import SpectaclesException
+import spectacles.printer as printer
 
 
 class Runner:
@@ -33,6 +54,7 @@ class Runner:
         remote_reset: bool = False,
     ):
         self.project = project
+        self.branch = branch
         self.client = LookerClient(
             base_url, client_id, client_secret, port, api_version
         )
@@ -40,15 +62,497 @@ class Runner:
 
     @log_duration
     def validate_sql(
-        self, selectors: List[str], mode: str = "batch", concurrency: int = 10
+        self,
+        selectors: List[str],
+        mode: str = "batch",
+        concurrency: int = 10,
+        fail_fast: bool = False,
+        time_budget: Optional[float] = None,
+        query_timeout: Optional[float] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        timing_file: Optional[str] = None,
+        results_file: Optional[str] = None,
+        slot_pool: Optional[SlotPool] = None,
+        checkpoint_file: Optional[str] = None,
+        resume: bool = False,
+        rerun_failed: bool = False,
+        incremental: bool = False,
+        base: str = "master",
+        cache_dir: Optional[str] = None,
+        summary: bool = False,
+        writer: Optional[ResultWriter] = None,
     ) -> List[dict]:
-        sql_validator = SqlValidator(self.client, self.project, concurrency)
+        start_time = timeit.default_timer()
+        if rerun_failed:
+            if not results_file:
+                raise SpectaclesException(
+                    "Rerunning failed explores needs the results of a previous run."
+                )
+            failures = load_failures(results_file)
+            if not failures:
+                logger.info("No explores failed in the last run, nothing to rerun.")
+                return []
+            selectors = list(failures)
+        checkpoint = (
+            Checkpoint(checkpoint_file, self.project, resume)
+            if checkpoint_file
+            else None
+        )
+        sql_validator = SqlValidator(
+            self.client, self.project, concurrency, query_timeout, slot_pool, checkpoint
+        )
+        if incremental:
+            base_snapshots = self.get_base_snapshots(selectors, base, cache_dir)
         sql_validator.build_project(selectors)
-        errors = sql_validator.validate(mode)
-        return [vars(error) for error in errors]
+        if incremental:
+            sql_validator.select_changed(base_snapshots)
+        if rerun_failed:
+            sql_validator.select_dimensions(failures)
+        if shard:
+            timings = load_timings(timing_file) if timing_file else None
+            sql_validator.select_shard(*shard, timings=timings)
+        sql_validator.resume()
+        if time_budget is not None:
+            # The budget covers the whole run, including building the project
+            time_budget -= timeit.default_timer() - start_time
+        errors = [
+            vars(error)
+            for error in sql_validator.validate(
+                mode, fail_fast, time_budget, summary, writer
+            )
+        ]
+        if checkpoint:
+            # Keep the checkpoint if the run stopped early, so it can be resumed
+            checkpoint.close(remove=not sql_validator.halted)
+        if results_file:
+            write_results(
+                results_file,
+                self.project,
+                sql_validator.get_explore_results(),
+                errors,
+                shard=f"{shard[0]}/{shard[1]}" if shard else None,
+            )
+        return errors
+
+    def get_base_snapshots(
+        self, selectors: List[str], base: str, cache_dir: Optional[str] = None
+    ) -> Dict[str, dict]:
+        """Snapshots the selected explores on a base branch to compare against.
+
+        When a cache directory is given, snapshots are cached by the commit the base
+        branch points to, so the base branch is only checked out when it moves.
+
+        """
+        selection = SqlValidator.parse_selectors(selectors)
+        cache_path = None
+        if cache_dir:
+            git_branch = self.client.get_git_branch(self.project, base)
+            ref = git_branch.get("remote_ref") or git_branch.get("ref")
+            if ref:
+                cache_path = Path(cache_dir) / f"{self.project}-{ref}.json"
+                snapshots = load_snapshots(cache_path, selectors)
+                if snapshots is not None:
+                    logger.info(f"Using cached metadata for {base} at {ref[:7]}")
+                    return snapshots
+
+        logger.info(f"Fetching metadata for base branch {base} to compare against")
+        self.client.update_session(self.project, base)
+        try:
+            snapshots = snapshot_branch(self.client, self.project, selection)
+        finally:
+            self.client.update_session(self.project, self.branch)
+        if cache_path:
+            save_snapshots(cache_path, selectors, snapshots)
+        return snapshots
 
     @log_duration
-    def validate_data_tests(self):
-        data_test_validator = DataTestValidator(self.client, self.project)
-        errors = data_test_validator.validate()
+    def validate_sql_branches(
+        self,
+        branches: List[str],
+        selectors: List[str],
+        mode: str = "batch",
+        concurrency: int = 10,
+        fail_fast: bool = False,
+        time_budget: Optional[float] = None,
+        query_timeout: Optional[float] = None,
+        results_file: Optional[str] = None,
+        slot_pool: Optional[SlotPool] = None,
+        remote_reset: bool = False,
+        summary: bool = False,
+    ) -> Dict[str, List[dict]]:
+        """Validates several branches one after another in a single session.
+
+        The branches share the API session, the HTTP connection pool and the slot
+        pool. Queries whose SQL is identical to one that already ran for an earlier
+        branch take on its result instead of running again.
+
+        Fail fast applies to each branch separately, while the time budget covers
+        all of them, so branches tested once it's spent are reported as untested.
+
+        Returns:
+            Dict[str, List[dict]]: Errors found on each branch.
+
+        """
+        start_time = timeit.default_timer()
+        loop = asyncio.get_event_loop()
+        session = loop.run_until_complete(self._open_session())
+        sql_results: Dict[str, Optional[dict]] = {}
+        errors: Dict[str, List[dict]] = {}
+        try:
+            for branch in branches:
+                if branch != self.branch:
+                    self.client.update_session(self.project, branch, remote_reset)
+                    self.branch = branch
+                sql_validator = SqlValidator(
+                    self.client,
+                    self.project,
+                    concurrency,
+                    query_timeout,
+                    slot_pool,
+                    session=session,
+                    sql_results=sql_results,
+                )
+                sql_validator.build_project(selectors)
+                remaining = None
+                if time_budget is not None:
+                    elapsed = timeit.default_timer() - start_time
+                    remaining = max(time_budget - elapsed, 0)
+                errors[branch] = [
+                    vars(error)
+                    for error in sql_validator.validate(
+                        mode, fail_fast, remaining, summary
+                    )
+                ]
+                reused = sql_validator.queries.counts["reused"]
+                if reused:
+                    logger.info(
+                        f"\nReused {reused} {'result' if reused == 1 else 'results'} "
+                        "of identical SQL from earlier branches."
+                    )
+                if results_file:
+                    write_results(
+                        results_path(results_file, branch),
+                        self.project,
+                        sql_validator.get_explore_results(),
+                        errors[branch],
+                    )
+        finally:
+            loop.run_until_complete(session.close())
+        return errors
+
+    @log_duration
+    def validate_sql_projects(
+        self,
+        projects: List[str],
+        selectors: List[str],
+        mode: str = "batch",
+        concurrency: int = 10,
+        fail_fast: bool = False,
+        time_budget: Optional[float] = None,
+        query_timeout: Optional[float] = None,
+        results_file: Optional[str] = None,
+        slot_pool: Optional[SlotPool] = None,
+        remote_reset: bool = False,
+    ) -> Dict[str, List[dict]]:
+        """Validates several projects on the same instance at the same time.
+
+        The projects' hierarchies are built one after another, since they share this
+        runner's client, then all of their explores are queried on one event loop,
+        drawing on a single concurrency budget.
+
+        Returns:
+            Dict[str, List[dict]]: Errors found in each project.
+
+        """
+        start_time = timeit.default_timer()
+        for project in projects:
+            if project != self.project:
+                self.client.update_session(project, self.branch, remote_reset)
+
+        query_slots = asyncio.BoundedSemaphore(concurrency)
+        loop = asyncio.get_event_loop()
+        session = loop.run_until_complete(self._open_session())
+        validators = [
+            SqlValidator(
+                self.client,
+                project,
+                concurrency,
+                query_timeout,
+                slot_pool,
+                session=session,
+                query_slots=query_slots,
+            )
+            for project in projects
+        ]
+        try:
+            for validator in validators:
+                validator.build_project(selectors)
+
+            explore_count = sum(
+                len(m.explores) for v in validators for m in v.project.models
+            )
+            printer.print_header(
+                f"Testing {explore_count} "
+                f"{'explore' if explore_count == 1 else 'explores'} in "
+                f"{len(projects)} projects [{mode} mode]"
+            )
+            deadline = None
+            if time_budget is not None:
+                time_budget -= timeit.default_timer() - start_time
+                deadline = loop.time() + time_budget
+            results = run_until_interrupted(
+                asyncio.gather(*(v.run(mode, fail_fast, deadline) for v in validators))
+            )
+        finally:
+            loop.run_until_complete(session.close())
+
+        errors: Dict[str, List[dict]] = {}
+        for validator, project_errors in zip(validators, results):
+            project = validator.project.name
+            printer.print_header(f"Project {project}")
+            validator.print_results()
+            errors[project] = [vars(error) for error in project_errors]
+            if results_file:
+                write_results(
+                    results_path(results_file, project),
+                    project,
+                    validator.get_explore_results(),
+                    errors[project],
+                )
+        return errors
+
+    @staticmethod
+    def validate_sql_instances(
+        instances: List[dict],
+        project: str,
+        branch: str,
+        selectors: List[str],
+        mode: str = "batch",
+        concurrency: int = 10,
+        fail_fast: bool = False,
+        time_budget: Optional[float] = None,
+        query_timeout: Optional[float] = None,
+        results_file: Optional[str] = None,
+        api_version: float = 3.1,
+        remote_reset: bool = False,
+    ) -> Dict[str, dict]:
+        """Validates the same project and branch on several Looker instances at once.
+
+        Each instance gets its own client and its own concurrency limit, which can
+        be set per instance with a 'concurrency' key. Connecting, building and
+        querying all overlap across instances. Fail fast and the time budget apply
+        to each instance separately.
+
+        Args:
+            instances: Connection details for each instance, with a 'base_url',
+                'client_id' and 'client_secret', and optionally a 'name', 'port' and
+                'concurrency'.
+
+        Returns:
+            Dict[str, dict]: Explore statuses and errors found on each instance, keyed
+                by instance name.
+
+        """
+        for index, instance in enumerate(instances):
+            missing = {"base_url", "client_id", "client_secret"} - set(instance)
+            if missing:
+                raise SpectaclesException(
+                    f"Instance {index + 1} in the config file is missing "
+                    + ", ".join(sorted(missing))
+                )
+        names = [
+            instance.get("name") or instance["base_url"].split("//")[-1]
+            for instance in instances
+        ]
+
+        start_time = timeit.default_timer()
+
+        def connect(instance: dict) -> Runner:
+            return Runner(
+                instance["base_url"],
+                project,
+                branch,
+                instance["client_id"],
+                instance["client_secret"],
+                instance.get("port", 19999),
+                api_version,
+                remote_reset,
+            )
+
+        with ThreadPoolExecutor(max_workers=len(instances)) as executor:
+            # Connecting and building are I/O bound, so threads let them overlap.
+            # The validators are created here, since asyncio objects need the main
+            # thread's event loop.
+            runners = list(executor.map(connect, instances))
+            validators = [
+                SqlValidator(
+                    runner.client,
+                    project,
+                    instance.get("concurrency", concurrency),
+                    query_timeout,
+                )
+                for runner, instance in zip(runners, instances)
+            ]
+            for future in [
+                executor.submit(validator.build_project, selectors)
+                for validator in validators
+            ]:
+                future.result()
+
+        printer.print_header(
+            f"Testing {project} on {len(instances)} instances [{mode} mode]"
+        )
+        loop = asyncio.get_event_loop()
+        deadline = None
+        if time_budget is not None:
+            time_budget -= timeit.default_timer() - start_time
+            deadline = loop.time() + time_budget
+        errors = run_until_interrupted(
+            asyncio.gather(
+                *(validator.run(mode, fail_fast, deadline) for validator in validators)
+            )
+        )
+        results = {}
+        for name, validator, instance_errors in zip(names, validators, errors):
+            results[name] = {
+                "explores": validator.get_explore_results(),
+                "errors": [vars(error) for error in instance_errors],
+            }
+            if results_file:
+                write_results(
+                    results_path(results_file, name),
+                    project,
+                    results[name]["explores"],
+                    results[name]["errors"],
+                )
+        return results
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(
+            headers=self.client.session.headers, timeout=SqlValidator.timeout
+        )
+
+    @log_duration
+    def coordinate_sql(
+        self,
+        selectors: List[str],
+        mode: str,
+        work_queue_file: str,
+        results_file: Optional[str] = None,
+    ) -> List[dict]:
+        sql_validator = SqlValidator(self.client, self.project)
+        sql_validator.build_project(selectors)
+        work_queue = WorkQueue(work_queue_file)
+        try:
+            explores, errors = sql_validator.coordinate(work_queue, self.branch, mode)
+        finally:
+            work_queue.close()
+        if results_file:
+            write_results(results_file, self.project, explores, errors)
+        return errors
+
+    @log_duration
+    def work_sql(
+        self,
+        work_queue_file: str,
+        concurrency: int = 10,
+        query_timeout: Optional[float] = None,
+        slot_pool: Optional[SlotPool] = None,
+    ) -> int:
+        sql_validator = SqlValidator(
+            self.client, self.project, concurrency, query_timeout, slot_pool
+        )
+        work_queue = WorkQueue(work_queue_file)
+        try:
+            return sql_validator.work(
+                work_queue, worker=f"{os.getpid()}", branch=self.branch
+            )
+        finally:
+            work_queue.close()
+
+    @log_duration
+    def validate_all(
+        self,
+        selectors: List[str],
+        mode: str = "batch",
+        concurrency: int = 10,
+        fail_fast: bool = False,
+        query_timeout: Optional[float] = None,
+    ) -> Tuple[List[dict], List[dict]]:
+        """Runs the SQL validator and the data tests at the same time.
+
+        Both share this runner's client, so the instance is only authenticated and
+        the branch only checked out once, and both run on the same event loop.
+
+        Returns:
+            Tuple[List[dict], List[dict]]: SQL errors and data test errors.
+
+        """
+        sql_validator = SqlValidator(
+            self.client, self.project, concurrency, query_timeout
+        )
+        sql_validator.build_project(selectors)
+        data_test_validator = DataTestValidator(self.client, self.project, concurrency)
+        logger.info("Running the SQL validator and data tests at the same time")
+
+        data_test_errors, sql_errors = run_until_interrupted(
+            asyncio.gather(
+                data_test_validator.run(fail_fast), sql_validator.run(mode, fail_fast)
+            )
+        )
+
+        explore_count = sum(len(m.explores) for m in sql_validator.project.models)
+        printer.print_header(
+            f"Tested {explore_count} "
+            f"{'explore' if explore_count == 1 else 'explores'} [{mode} mode]"
+        )
+        sql_validator.print_results()
+        return (
+            [vars(error) for error in sql_errors],
+            [vars(error) for error in data_test_errors],
+        )
+
+    @log_duration
+    def validate_data_tests(
+        self,
+        fail_fast: bool = False,
+        concurrency: int = 10,
+        split_by: str = "model",
+        selectors: Optional[List[str]] = None,
+        cache_dir: Optional[str] = None,
+        writer: Optional[ResultWriter] = None,
+    ):
+        """Runs the selected data tests, skipping unchanged ones that passed before.
+
+        When a cache directory is given, the fingerprint of each test that passes is
+        cached, and tests whose fingerprint still matches are skipped next time. The
+        fingerprint doesn't cover the warehouse data the tests assert on, so the
+        cache is only used when asked for.
+
+        """
+        data_test_validator = DataTestValidator(
+            self.client, self.project, concurrency, split_by
+        )
+        if selectors:
+            data_test_validator.select(selectors)
+
+        cache_path = None
+        passed: Dict[str, str] = {}
+        if cache_dir:
+            git_branch = self.client.get_git_branch(self.project, self.branch)
+            ref = git_branch.get("ref")
+            if ref:
+                cache_path = Path(cache_dir) / f"{self.project}-data-tests.json"
+                passed = load_passed_tests(cache_path)
+                data_test_validator.skip_unchanged(passed, ref)
+
+        errors = data_test_validator.validate(fail_fast, writer)
+
+        if cache_path:
+            for path in data_test_validator.passed:
+                if path in data_test_validator.fingerprints:
+                    passed[path] = data_test_validator.fingerprints[path]
+            for path in data_test_validator.failed:
+                passed.pop(path, None)
+            save_passed_tests(cache_path, passed)
         return [vars(error) for error in errors]
@@ -0,0 +1,113 @@
+from typing import List, IO
+import asyncio
+from pathlib import Path
+from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.exceptions import SpectaclesException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+
+class SlotPool:
+    """Query slots shared by every spectacles process that uses the same directory.
+
+    Each slot is a lock file in the directory and a process holds a slot while it
+    holds an exclusive lock on the file. The operating system releases the locks of
+    a process when it exits, so a crashed run can't leak slots.
+
+    The size of the pool is recorded in the directory by the first process to use
+    it, and later processes honour the recorded size so the cap holds no matter how
+    each run is configured. To resize the pool, delete the directory while no runs
+    are using it.
+
+    Args:
+        directory: Directory holding the lock files, created if it doesn't exist.
+        size: Maximum number of queries running at once across all processes.
+        poll_interval: Number of seconds to wait before retrying when all slots are
+            taken.
+
+    """
+
+    def __init__(self, directory: str, size: int, poll_interval: float = 0.25):
+        if fcntl is None:  # pragma: no cover
+            raise SpectaclesException(
+                "Shared query slots rely on file locks, which aren't available "
+                "on this platform."
+            )
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = self._record_size(size)
+        self.poll_interval = poll_interval
+        self.held: List[IO] = []
+
+    def _record_size(self, size: int) -> int:
+        with (self.directory / "pool.lock").open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = self.directory / "size"
+            if path.exists():
+                recorded = int(path.read_text())
+                if recorded != size:
+                    logger.warning(
+                        f"The shared query slot pool in {self.directory} has "
+                        f"{recorded} slots, using {recorded} instead of {size}."
+                    )
+                return recorded
+            path.write_text(str(size))
+        return size
+
+    def try_acquire(self) -> bool:
+        """Locks a free slot without waiting, returning whether one was free."""
+        for index in range(self.size):
+            file = (self.directory / f"slot-{index}.lock").open("a")
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                continue
+            self.held.append(file)
+            return True
+        return False
+
+    async def acquire(self) -> None:
+        """Waits until a slot is free and locks it."""
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self) -> None:
+        """Unlocks one of the slots held by this process."""
+        if not self.held:
+            raise ValueError("SlotPool released too many times")
+        file = self.held.pop()
+        fcntl.flock(file, fcntl.LOCK_UN)
+        file.close()
+
+
+class SharedQuerySlots:
+    """Limits running queries both within this process and across a SlotPool.
+
+    Queries first take a slot from the process' own semaphore, so a run never
+    exceeds its own concurrency, then wait for a slot in the shared pool.
+
+    Args:
+        local_slots: Semaphore limiting the number of queries in this process.
+        pool: Slot pool shared with other spectacles processes.
+
+    """
+
+    def __init__(self, local_slots: asyncio.BoundedSemaphore, pool: SlotPool):
+        self.local_slots = local_slots
+        self.pool = pool
+
+    async def acquire(self) -> None:
+        await self.local_slots.acquire()
+        try:
+            await self.pool.acquire()
+        except BaseException:
+            self.local_slots.release()
+            raise
+
+    def release(self) -> None:
+        self.pool.release()
+        self.local_slots.release()
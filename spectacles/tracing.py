@@ -0,0 +1,162 @@
+from typing import List, Dict, Tuple, Set, Hashable, Iterator, ContextManager
+import os
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from spectacles.hooks import hooks
+
+try:
+    from contextlib import nullcontext
+except ImportError:  # pragma: no cover
+    from contextlib import suppress as nullcontext  # type: ignore
+
+
+class Tracer:
+    """Records spans for each phase of a run, written as Chrome trace events.
+
+    Spans are grouped into lanes, which show up as threads when the trace is opened
+    in Perfetto or chrome://tracing. Each query gets its own lane, so its phases
+    line up one after another, while API calls that aren't tied to a single query,
+    like fetching metadata or polling for results, get lanes of their own.
+
+    While it's started, the tracer follows each query's slot wait and execution
+    through hooks. API calls are recorded with span where they're made.
+
+    Attributes:
+        enabled: True once the tracer has been started.
+        events: Trace events recorded so far.
+
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.pid = os.getpid()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.events: List[dict] = []
+        self.origin = time.perf_counter()
+        self._lanes: Dict[Hashable, int] = {}
+        self._open: Set[Tuple[int, str]] = set()
+        self._marked: Set[Tuple[int, str]] = set()
+
+    def start(self) -> None:
+        """Clears any earlier events and starts recording."""
+        self.stop()
+        self._reset()
+        self.enabled = True
+        hooks.register("on_slot_wait", self._trace_slot_wait)
+        hooks.register("on_query_transition", self._trace_transition)
+
+    def stop(self) -> None:
+        if self.enabled:
+            hooks.unregister("on_slot_wait", self._trace_slot_wait)
+            hooks.unregister("on_query_transition", self._trace_transition)
+        self.enabled = False
+
+    def _trace_slot_wait(self, query, seconds: float) -> None:
+        event = self._event("wait_for_slot", "X", query)
+        event["dur"] = round(seconds * 1e6, 1)
+        event["ts"] = round(event["ts"] - event["dur"], 1)
+
+    def _trace_transition(self, query, previous: str) -> None:
+        if previous == "running":
+            self.end("execute", query, state=query.state)
+        if query.state == "running":
+            self.begin("execute", query, query_task_id=query.query_task_id)
+
+    def _now(self) -> float:
+        return round((time.perf_counter() - self.origin) * 1e6, 1)
+
+    def _tid(self, lane: Hashable) -> int:
+        """Maps a lane to a thread ID, naming the thread the first time it's used."""
+        tid = self._lanes.get(lane)
+        if tid is None:
+            tid = len(self._lanes) + 1
+            self._lanes[lane] = tid
+            self.events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": str(lane)},
+                }
+            )
+        return tid
+
+    def _event(self, name: str, phase: str, lane: Hashable, **args) -> dict:
+        event = {
+            "name": name,
+            "ph": phase,
+            "ts": self._now(),
+            "pid": self.pid,
+            "tid": self._tid(lane),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+        return event
+
+    def span(self, name: str, lane: Hashable = "main", **args) -> ContextManager:
+        """Records a span for the duration of a with block.
+
+        Args:
+            name: Name of the phase, e.g. the API call being made.
+            lane: Lane to show the span in, e.g. a query or 'metadata'.
+            **args: Details to attach to the span.
+
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, lane, **args)
+
+    @contextmanager
+    def _span(self, name: str, lane: Hashable, **args) -> Iterator[None]:
+        event = self._event(name, "X", lane, **args)
+        try:
+            yield
+        finally:
+            event["dur"] = round(self._now() - event["ts"], 1)
+
+    def begin(self, name: str, lane: Hashable, **args) -> None:
+        """Opens a span that's closed later by end, e.g. from another method."""
+        if not self.enabled:
+            return
+        self._event(name, "B", lane, **args)
+        self._open.add((self._tid(lane), name))
+
+    def end(self, name: str, lane: Hashable, **args) -> None:
+        """Closes a span opened by begin, doing nothing if it isn't open."""
+        if not self.enabled:
+            return
+        key = (self._tid(lane), name)
+        if key in self._open:
+            self._open.remove(key)
+            self._event(name, "E", lane, **args)
+
+    def mark(self, name: str, lane: Hashable, once: bool = False, **args) -> None:
+        """Records an instant event, optionally only the first time it happens."""
+        if not self.enabled:
+            return
+        key = (self._tid(lane), name)
+        if once and key in self._marked:
+            return
+        self._marked.add(key)
+        event = self._event(name, "i", lane, **args)
+        event["s"] = "t"  # Scoped to the lane
+
+    def write(self, path: str) -> None:
+        """Writes the trace, closing any spans that are still open, e.g. on a crash."""
+        now = self._now()
+        for tid, name in sorted(self._open):
+            self.events.append(
+                {"name": name, "ph": "E", "ts": now, "pid": self.pid, "tid": tid}
+            )
+        self._open.clear()
+        with Path(path).open("w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+tracer = Tracer()
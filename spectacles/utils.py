@@ -1,9 +1,15 @@
-from typing import List, Callable
+from typing import Any, Awaitable, List, Dict, Callable
 from spectacles.logger import GLOBAL_LOGGER as logger
+from spectacles.exceptions import SpectaclesException
+import asyncio
 import functools
 import requests
+import signal
 import timeit
 
+# Signals that interrupt a run, after asking Looker to cancel its running queries
+SHUTDOWN_SIGNALS = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT)
+
 
 def compose_url(base_url: str, path: List) -> str:
     if not isinstance(path, list):
@@ -25,6 +31,65 @@ def details_from_http_error(response: requests.Response) -> str:
     return details
 
 
+def partition(weights: Dict[str, float], count: int) -> List[List[str]]:
+    """Splits keys into a number of groups with roughly equal total weight.
+
+    Assigns the heaviest keys first, each to the group with the lowest total so far.
+    Ties are broken by key and group order so the result is deterministic.
+
+    Args:
+        weights: Mapping of keys to their weight, e.g. an expected runtime.
+        count: Number of groups to split the keys into.
+
+    Returns:
+        List[List[str]]: Sorted keys for each group.
+
+    """
+    groups: List[List[str]] = [[] for _ in range(count)]
+    totals = [0.0] * count
+    for key in sorted(weights, key=lambda key: (-weights[key], key)):
+        lightest = min(range(count), key=lambda i: (totals[i], i))
+        groups[lightest].append(key)
+        totals[lightest] += weights[key]
+    return [sorted(group) for group in groups]
+
+
+async def shutdown(signal, loop):
+    logger.info("\n\n" + "Please wait, asking Looker to cancel any running queries")
+    logger.debug("Cleaning up async tasks.")
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.wait(tasks, return_when=asyncio.ALL_COMPLETED)
+    # Nothing executes beyond this point because of CancelledErrors
+
+
+def run_until_interrupted(awaitable: Awaitable) -> Any:
+    """Runs an awaitable on the event loop, cancelling every task if interrupted.
+
+    Validators cancel their running queries when their tasks are cancelled, so this
+    is how every path that runs them should wait on them, alone or side by side.
+
+    Returns:
+        Any: The awaitable's result.
+
+    """
+    loop = asyncio.get_event_loop()
+    for s in SHUTDOWN_SIGNALS:
+        loop.add_signal_handler(s, lambda s=s: asyncio.create_task(shutdown(s, loop)))
+    try:
+        return loop.run_until_complete(awaitable)
+    except asyncio.CancelledError:
+        # Validators run side by side are interrupted together, see their logs
+        raise SpectaclesException(
+            "Spectacles was manually interrupted. Spectacles attempted to cancel "
+            "any running queries."
+        )
+    finally:
+        for s in SHUTDOWN_SIGNALS:
+            loop.remove_signal_handler(s)
+
+
 def human_readable(elapsed: int):
     minutes, seconds = divmod(elapsed, 60)
     num_mins = f"{minutes:.0f} minute{'s' if minutes > 1 else ''}"
@@ -35,7 +100,12 @@ def human_readable(elapsed: int):
 
 
 def get_detail(fn_name: str):
-    detail_map = {"validate_sql": "SQL ", "validate_data_tests": "test "}
+    detail_map = {
+        "validate_sql": "SQL ",
+        "coordinate_sql": "SQL ",
+        "work_sql": "SQL ",
+        "validate_data_tests": "test ",
+    }
     return detail_map.get(fn_name, "")
 
 
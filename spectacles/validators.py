@@ -1,14 +1,61 @@
-from typing import List, Sequence, DefaultDict
+from typing import (
+    List,
+    Sequence,
+    DefaultDict,
+    Dict,
+    Set,
+    Tuple,
+    Optional,
+    Union,
+    AsyncIterator,
+)
 import asyncio
+import re
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
 import aiohttp
-from spectacles.client import LookerClient
+from spectacles.client import LookerClient, JsonDict
 from spectacles.lookml import Project, Model, Explore, Dimension
+from spectacles.queries import Query, QueryTracker, QueryResult
+from spectacles.slot_pool import SlotPool, SharedQuerySlots
+from spectacles.checkpoint import Checkpoint, FINISHED_STATES, error_from_json
+from spectacles.incremental import (
+    snapshot_explore,
+    compare_snapshots,
+    fingerprint_data_test,
+)
+from spectacles.work_queue import WorkQueue
+from spectacles.progress import StatusLine
+from spectacles.tracing import tracer
+from spectacles.metrics import QUERY_SLOTS
+from spectacles.hooks import hooks
+from spectacles.writers import ResultWriter, sql_record, data_test_record
 from spectacles.logger import GLOBAL_LOGGER as logger
-from spectacles.exceptions import SqlError, DataTestError, SpectaclesException
+from spectacles.exceptions import (
+    SqlError,
+    DataTestError,
+    QueryTimeoutError,
+    SpectaclesException,
+)
 import spectacles.printer as printer
-import signal
+import spectacles.utils as utils
+
+# Error messages that point to a missing table or schema rather than a broken column.
+# When a dimension fails with one of these, every other dimension in the same view will
+# fail in the same way, so there's no need to keep querying them.
+ROOT_CAUSE_PATTERNS = {
+    "missing_relation": re.compile(
+        r"\b(relation|table|object|view)\b.*\b(does not exist|doesn't exist|not found)"
+        r"|invalid object name",
+        re.IGNORECASE,
+    ),
+    "missing_schema": re.compile(
+        r"\b(schema|dataset|database)\b.*\b(does not exist|doesn't exist|not found)"
+        r"|unknown database",
+        re.IGNORECASE,
+    ),
+}
 
 
 class Validator(ABC):  # pragma: no cover
@@ -32,37 +79,253 @@ class Validator(ABC):  # pragma: no cover
 class DataTestValidator(Validator):
     """Runs LookML/data tests for a given project.
 
+    Looker runs the tests of a single API call one after another, so the tests are
+    split into several calls, one per model or one per test, which run at the same
+    time.
+
     Args:
         client: Looker API client.
         project: Name of the LookML project to validate.
+        concurrency: Maximum number of API calls running tests at the same time.
+        split_by: Runs the tests in one call per 'model' or per 'test', or all of
+            them in a single call for the whole 'project'. When only some of a
+            model's tests are selected, they're run one call per test.
+
+    Attributes:
+        tests: Tests that will run, once fetched. Selecting tests or skipping
+            unchanged ones narrows them down.
+        fingerprints: Fingerprint of each test's inputs, keyed by
+            'model_name/test_name'. Only set once unchanged tests are skipped.
+        passed: Paths of the tests that passed in the last run.
+        failed: Paths of the tests that failed in the last run.
 
     """
 
-    def __init__(self, client: LookerClient, project: str):
+    timeout = aiohttp.ClientTimeout(total=None)
+
+    def __init__(
+        self,
+        client: LookerClient,
+        project: str,
+        concurrency: int = 10,
+        split_by: str = "model",
+    ):
         super().__init__(client)
         self.project = project
+        self.concurrency = concurrency
+        if split_by not in ("project", "model", "test"):
+            raise SpectaclesException(
+                f"Data tests can't be split by '{split_by}', "
+                "choose from 'project', 'model' or 'test'."
+            )
+        self.split_by = split_by
+        self.halted = False
+        self.all_tests: Optional[List[JsonDict]] = None
+        self.tests: Optional[List[JsonDict]] = None
+        self.fingerprints: Dict[str, str] = {}
+        self.passed: Set[str] = set()
+        self.failed: Set[str] = set()
+
+    def get_tests(self) -> List[JsonDict]:
+        """Fetches the project's tests, unless they were already fetched."""
+        if self.tests is None:
+            self.all_tests = self.client.all_lookml_tests(self.project)
+            self.tests = list(self.all_tests)
+        return self.tests
+
+    def select(self, selectors: List[str]) -> None:
+        """Narrows the tests down to those matching selectors.
+
+        Args:
+            selectors: List of selector strings in 'model_name/test_name' format.
+                The '*' wildcard selects all models or tests. For instance,
+                'model_name/*' would select all tests in the 'model_name' model.
+
+        """
+        selection: DefaultDict = defaultdict(set)
+        for selector in selectors:
+            try:
+                model, name = selector.split("/")
+            except ValueError:
+                raise SpectaclesException(
+                    f"Data test selector '{selector}' is not valid.\n"
+                    "Instead, use the format 'model_name/test_name'. "
+                    f"Use 'model_name/*' to select all tests in a model."
+                )
+            else:
+                selection[model].add(name)
+
+        selected = []
+        for test in self.get_tests():
+            names = selection.get(test["model_name"], set()) | selection.get("*", set())
+            if "*" in names or test["name"] in names:
+                selected.append(test)
+        self.tests = selected
+
+    def skip_unchanged(self, passed: Dict[str, str], ref: str) -> None:
+        """Leaves out tests that passed before and whose inputs haven't changed.
+
+        A test's inputs are its own definition, the metadata of the explore it
+        queries and the commit of the branch it runs on.
+
+        Args:
+            passed: Fingerprint each test had when it last passed, keyed by
+                'model_name/test_name'.
+            ref: Commit SHA of the branch the tests run on.
+
+        """
+        remaining = []
+        for test in self.get_tests():
+            path = f"{test['model_name']}/{test['name']}"
+            explore_json = self.client.get_lookml_explore(
+                test["model_name"], test["explore_name"]
+            )
+            self.fingerprints[path] = fingerprint_data_test(test, explore_json, ref)
+            if passed.get(path) != self.fingerprints[path]:
+                remaining.append(test)
+        skipped = len(self.tests or []) - len(remaining)
+        if skipped:
+            logger.info(
+                f"Skipping {skipped} {'test' if skipped == 1 else 'tests'} that "
+                "passed before and whose inputs haven't changed"
+            )
+        self.tests = remaining
+
+    def _test_url(self, path: str) -> Optional[str]:
+        """Links to the LookML of the test with a path, if Looker says where it is."""
+        for test in self.all_tests or []:
+            if f"{test['model_name']}/{test['name']}" == path and test.get("file"):
+                url = (
+                    f"{self.client.base_url}/projects/{self.project}/files/"
+                    f"{test['file']}"
+                )
+                return f"{url}?line={test['line']}" if test.get("line") else url
+        return None
+
+    def _split(self) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Splits the tests into the model and test name of each API call."""
+        tests = self.get_tests()
+        all_tests = self.all_tests or []
+        if self.split_by == "project" and len(tests) == len(all_tests):
+            return [(None, None)]
+        units: List[Tuple[Optional[str], Optional[str]]] = []
+        for model in sorted(set(test["model_name"] for test in tests)):
+            names = sorted(t["name"] for t in tests if t["model_name"] == model)
+            model_size = sum(1 for t in all_tests if t["model_name"] == model)
+            if self.split_by != "test" and len(names) == model_size:
+                units.append((model, None))
+            else:
+                units.extend((model, name) for name in names)
+        return units
+
+    def validate(
+        self, fail_fast: bool = False, writer: Optional[ResultWriter] = None
+    ) -> List[DataTestError]:
+        """Runs the project's data tests and returns any errors.
+
+        Args:
+            fail_fast: When true, stops starting new calls after the first failing
+                test. Calls that are already running are allowed to finish.
+            writer: Writer that a record of each test's result is written to as
+                soon as the call that ran it returns.
+
+        Returns:
+            List[DataTestError]: DataTestErrors for each failing test.
 
-    def validate(self) -> List[DataTestError]:
-        tests = self.client.all_lookml_tests(self.project)
-        test_count = len(tests)
+        """
+        loop = asyncio.get_event_loop()
+        return loop.run_until_complete(self.run(fail_fast, writer=writer))
+
+    async def run(
+        self,
+        fail_fast: bool = False,
+        session: Optional[aiohttp.ClientSession] = None,
+        writer: Optional[ResultWriter] = None,
+    ) -> List[DataTestError]:
+        """Runs the project's data tests on the event loop and returns any errors.
+
+        Args:
+            fail_fast: When true, stops starting new calls after the first failing
+                test.
+            session: HTTP session to run the tests with. By default, opens its own.
+            writer: Writer that a record of each test's result is written to.
+
+        Returns:
+            List[DataTestError]: DataTestErrors for each failing test, in the order
+                the calls were split.
+
+        """
+        # Fetching the tests blocks, so keep it off the loop other validators share
+        loop = asyncio.get_event_loop()
+        test_count = len(await loop.run_in_executor(None, self.get_tests))
         printer.print_header(
             f"Running {test_count} {'test' if test_count == 1 else 'tests'}"
         )
-        errors = []
-        test_results = self.client.run_lookml_test(self.project)
+
+        units = self._split() if test_count else []
+        self.halted = False
+        self.passed = set()
+        self.failed = set()
+        slots = asyncio.BoundedSemaphore(self.concurrency)
+        own_session = session is None
+        if session is None:
+            session = aiohttp.ClientSession(
+                headers=self.client.session.headers, timeout=self.timeout
+            )
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._run_unit(session, slots, model, test, fail_fast, writer)
+                    for model, test in units
+                )
+            )
+        finally:
+            if own_session:
+                await session.close()
+
+        if self.halted:
+            logger.info(
+                "\nStopped starting new data tests after the first failing test "
+                "because fail-fast is enabled."
+            )
+        return [error for unit_errors in results for error in unit_errors]
+
+    async def _run_unit(
+        self,
+        session: aiohttp.ClientSession,
+        slots: asyncio.BoundedSemaphore,
+        model: Optional[str],
+        test: Optional[str],
+        fail_fast: bool,
+        writer: Optional[ResultWriter] = None,
+    ) -> List[DataTestError]:
+        """Runs one model's tests, one test, or every test, once a slot is free."""
+        loop = asyncio.get_event_loop()
+        async with slots:
+            if self.halted:
+                return []
+            started = loop.time()
+            test_results = await self.client.run_lookml_test_async(
+                session, self.project, model, test
+            )
+            duration = loop.time() - started
+
+        errors: List[DataTestError] = []
         for result in test_results:
             message = f"{result['model_name']}.{result['test_name']}"
+            path = f"{result['model_name']}/{result['test_name']}"
+            if writer:
+                writer.write(data_test_record(result, duration, self._test_url(path)))
             if result["success"]:
+                self.passed.add(path)
                 printer.print_validation_result("success", message)
             else:
+                self.failed.add(path)
                 for error in result["errors"]:
                     printer.print_validation_result("error", message)
-                    errors.append(
-                        DataTestError(
-                            path=f"{result['model_name']}/{result['test_name']}",
-                            message=error["message"],
-                        )
-                    )
+                    errors.append(DataTestError(path=path, message=error["message"]))
+        if fail_fast and errors:
+            self.halted = True
         return errors
 
 
@@ -72,22 +335,81 @@ class SqlValidator(Validator):
     Args:
         client: Looker API client.
         project: Name of the LookML project to validate.
+        concurrency: Maximum number of queries running at the same time.
+        query_timeout: Number of seconds a query may run, counted from when its query
+            task is created, before it's cancelled and reported as timed out.
+        slot_pool: Query slots shared with other spectacles processes. Queries then
+            need both one of this validator's own slots and a slot from the pool.
+        checkpoint: Journal that each query's progress is recorded in, so an
+            interrupted run can be resumed.
+        session: HTTP session to run queries with, shared with other validators.
+            By default, each validation run opens its own.
+        sql_results: Outcome of queries already run, keyed by their SQL, shared
+            with other validators. When given, queries whose SQL has already run
+            take on the earlier result instead of running again. Successes map to
+            None and errors to their details.
+        query_slots: Semaphore shared with other validators, so they draw on one
+            concurrency budget. By default, each validator has its own with
+            `concurrency` slots.
 
     Attributes:
         project: LookML project object representation.
-        query_tasks: Mapping of query task IDs to LookML objects
+        queries: Tracks each query's lifecycle state and the query slot it holds.
+        root_causes: Mapping of view names to the view-level SqlError (e.g. a missing
+            table) that caused the view's dimensions to fail. Only errors that name
+            the relation the view selects from count as view-level.
+        skipped_dimensions: Mapping of view names to the dimensions that weren't
+            queried because their view already failed with a view-level error.
+        halted: True once the validator has stopped dispatching new queries, e.g.
+            after the first error in fail-fast mode.
+        resumed: Model, explore and object names of the explores and dimensions
+            whose results were carried over from the checkpoint of an interrupted
+            run, so they aren't queried again.
 
     """
 
     timeout = aiohttp.ClientTimeout(total=300)
 
-    def __init__(self, client: LookerClient, project: str, concurrency: int = 10):
+    def __init__(
+        self,
+        client: LookerClient,
+        project: str,
+        concurrency: int = 10,
+        query_timeout: Optional[float] = None,
+        slot_pool: Optional[SlotPool] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        sql_results: Optional[Dict[str, Optional[dict]]] = None,
+        query_slots: Optional[asyncio.BoundedSemaphore] = None,
+    ):
         super().__init__(client)
 
         self.project = Project(project, models=[])
-        self.query_tasks: dict = {}
-        self.query_slots = asyncio.BoundedSemaphore(concurrency)
+        self.concurrency = concurrency
+        self.query_timeout = query_timeout
+        self.slot_pool = slot_pool
+        self.query_slots = query_slots or asyncio.BoundedSemaphore(concurrency)
+        QUERY_SLOTS.set(concurrency)
+        self.queries = QueryTracker(
+            SharedQuerySlots(self.query_slots, slot_pool)
+            if slot_pool
+            else self.query_slots
+        )
         self.running_query_tasks: asyncio.Queue = asyncio.Queue()
+        self.root_causes: Dict[str, SqlError] = {}
+        self.skipped_dimensions: DefaultDict[str, List[Dimension]] = defaultdict(list)
+        self.halted = False
+        self.checkpoint = checkpoint
+        self.resumed: Set[Tuple[str, str, str]] = set()
+        self._restored: List[
+            Tuple[str, str, Union[Explore, Dimension], Optional[SqlError]]
+        ] = []
+        self._reattaching: List[Tuple[Query, str]] = []
+        self._orphaned_task_ids: List[str] = []
+        self.session = session
+        self.sql_results = sql_results
+        self._reused_errors: List[SqlError] = []
+        self._results: Optional[asyncio.Queue] = None
 
     @staticmethod
     def parse_selectors(selectors: List[str]) -> DefaultDict[str, set]:
@@ -145,9 +467,9 @@ class SqlValidator(Validator):
             f"Building LookML project hierarchy for project {self.project.name}"
         )
 
-        all_models = [
-            Model.from_json(model) for model in self.client.get_lookml_models()
-        ]
+        with tracer.span("get_lookml_models", "metadata"):
+            models_json = self.client.get_lookml_models()
+        all_models = [Model.from_json(model) for model in models_json]
         project_models = [
             model for model in all_models if model.project == self.project.name
         ]
@@ -177,9 +499,15 @@ class SqlValidator(Validator):
             )
 
             for explore in selected_explores:
-                dimensions_json = self.client.get_lookml_dimensions(
-                    model.name, explore.name
-                )
+                with tracer.span(
+                    "get_lookml_dimensions",
+                    "metadata",
+                    model=model.name,
+                    explore=explore.name,
+                ):
+                    dimensions_json = self.client.get_lookml_dimensions(
+                        model.name, explore.name
+                    )
                 for dimension_json in dimensions_json:
                     dimension = Dimension.from_json(dimension_json)
                     dimension.url = self.client.base_url + dimension.url
@@ -190,13 +518,33 @@ class SqlValidator(Validator):
 
         self.project.models = selected_models
 
-    def validate(self, mode: str = "batch") -> List[SqlError]:
-        """Queries selected explores and returns any errors.
+    def validate(
+        self,
+        mode: str = "batch",
+        fail_fast: bool = False,
+        time_budget: Optional[float] = None,
+        summary: bool = False,
+        writer: Optional[ResultWriter] = None,
+    ) -> List[SqlError]:
+        """Queries selected explores, printing results as they arrive, and returns errors.
+
+        Each explore is reported as soon as all of its results are in, and each
+        error as soon as it's found. On a terminal, a status line below the output
+        shows the run's progress.
 
         Args:
             batch: When true, runs one query per explore (using all dimensions). When
                 false, runs one query per dimension. Batch mode increases query speed
                 but can only return the first error encountered for each dimension.
+            fail_fast: When true, stops dispatching queries after the first error and
+                cancels any queries that are still running.
+            time_budget: Number of seconds after which no new queries are dispatched
+                and running queries are cancelled. Explores that weren't fully tested
+                in time are reported as untested.
+            summary: When true, also prints the status of every explore, sorted by
+                name, at the end.
+            writer: Writer that a record of each explore and dimension result is
+                written to as soon as it arrives.
 
         Returns:
             List[SqlError]: SqlErrors encountered while querying the explore.
@@ -210,51 +558,816 @@ class SqlValidator(Validator):
         )
 
         loop = asyncio.get_event_loop()
+        deadline = None if time_budget is None else loop.time() + time_budget
+        errors = utils.run_until_interrupted(
+            self._report(mode, fail_fast, deadline, writer)
+        )
+        if summary:
+            printer.print_header("Summary")
+        self.print_results(untested_only=not summary)
+        return errors
 
-        signals = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT)
-        for s in signals:
-            loop.add_signal_handler(
-                s, lambda s=s: asyncio.create_task(self.shutdown(s, loop))
-            )
+    async def run(
+        self,
+        mode: str = "batch",
+        fail_fast: bool = False,
+        deadline: Optional[float] = None,
+    ) -> List[SqlError]:
+        """Queries selected explores on the running event loop and returns any errors.
+
+        Unlike validate, this doesn't print anything or install signal handlers, so
+        several validators can run side by side on the same event loop. Run them
+        with utils.run_until_interrupted, so their queries are cancelled if the run
+        is interrupted.
+
+        Args:
+            mode: One of 'batch', 'single' or 'hybrid', see validate.
+            fail_fast: When true, stops dispatching queries after the first error and
+                cancels any queries that are still running.
+            deadline: Event loop time after which no new queries are dispatched and
+                running queries are cancelled.
+
+        Returns:
+            List[SqlError]: SqlErrors encountered while querying the explore.
+
+        """
+        results = [
+            result async for result in self.iter_results(mode, fail_fast, deadline)
+        ]
+        return self._collect_errors(results)
+
+    @staticmethod
+    def _collect_errors(results: List[QueryResult]) -> List[SqlError]:
+        """Picks the errors to report out of every result of a run."""
+        # In hybrid mode, an explore's dimension results supersede its own result
+        tested_dimensions = set(
+            (result.model, result.explore)
+            for result in results
+            if result.kind == "dimension"
+        )
+        errors: List[SqlError] = []
+        seen: Set[int] = set()
+        for result in results:
+            if result.error is None or id(result.error) in seen:
+                # Dimensions skipped because of a view-level error share it
+                continue
+            if (
+                result.kind == "explore"
+                and (result.model, result.explore) in tested_dimensions
+            ):
+                continue
+            seen.add(id(result.error))
+            errors.append(result.error)
+        return errors
+
+    async def iter_results(
+        self,
+        mode: str = "batch",
+        fail_fast: bool = False,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[QueryResult]:
+        """Queries selected explores and yields each result as soon as it's known.
 
-        errors = list(loop.run_until_complete(self._query(mode)))
-        if mode == "hybrid" and self.project.errored:
-            errors = list(loop.run_until_complete(self._query(mode)))
+        Results carried over from a checkpoint or reused from identical SQL are
+        yielded too. In hybrid mode, explores that fail in batch are yielded with
+        their error before the results of their dimensions. Queries that are
+        cancelled or skipped, e.g. once the run is halted, yield nothing.
 
+        Args:
+            mode: One of 'batch', 'single' or 'hybrid', see validate.
+            fail_fast: When true, stops dispatching queries after the first error and
+                cancels any queries that are still running.
+            deadline: Event loop time after which no new queries are dispatched and
+                running queries are cancelled.
+
+        Yields:
+            QueryResult: The result of each explore or dimension.
+
+        """
+        # Explores are only followed to completion when a hook needs to know
+        watch_explores = hooks.active("on_explore_done")
+        explores = self._explore_index() if watch_explores else {}
+        remaining = {key: len(explore.dimensions) for key, explore in explores.items()}
+        reported: Set[Tuple[str, str]] = set()
+
+        results: asyncio.Queue = asyncio.Queue()
+        self._results = results
+        run = asyncio.ensure_future(self._run(mode, fail_fast, deadline))
+        try:
+            while not run.done() or not results.empty():
+                if not results.empty():
+                    result = results.get_nowait()
+                else:
+                    get = asyncio.ensure_future(results.get())
+                    await asyncio.wait([get, run], return_when=asyncio.FIRST_COMPLETED)
+                    if not get.done():
+                        get.cancel()
+                        continue
+                    result = get.result()
+                if watch_explores and self._finishes_explore(result, mode, remaining):
+                    key = (result.model, result.explore)
+                    if result.kind == "explore":
+                        status = result.status
+                    else:
+                        status = self.get_explore_status(explores[key])
+                    hooks.emit("on_explore_done", result.model, result.explore, status)
+                    reported.add(key)
+                yield result
+            run.result()
+            for key in sorted(set(explores) - reported):
+                status = self.get_explore_status(explores[key])
+                if status != "untested":
+                    hooks.emit("on_explore_done", *key, status)
+            hooks.emit("on_run_done", self)
+        except asyncio.CancelledError:
+            # Let the interrupted run cancel its queries and explain what happened
+            await run
+            raise
+        finally:
+            self._results = None
+            if not run.done():
+                # The caller stopped iterating early, so stop the run too
+                run.cancel()
+                try:
+                    await run
+                except (asyncio.CancelledError, SpectaclesException):
+                    pass
+
+    async def _report(
+        self,
+        mode: str,
+        fail_fast: bool,
+        deadline: Optional[float],
+        writer: Optional[ResultWriter] = None,
+    ) -> List[SqlError]:
+        """Runs the validation, printing each explore and error as it comes in.
+
+        A view-level error is held back until the run ends, when it notes how many
+        of the view's dimensions were skipped because of it. The records of the
+        dimensions sharing it are written then too, so they carry the same message.
+
+        """
+        explores = self._explore_index()
+        remaining = {key: len(explore.dimensions) for key, explore in explores.items()}
+        printed: Set[int] = set()
+        reported: Set[Tuple[str, str]] = set()
+        results: List[QueryResult] = []
+        held: List[QueryResult] = []
+        status_line = StatusLine(self.queries)
+        status_line.start()
+        try:
+            async for result in self.iter_results(mode, fail_fast, deadline):
+                results.append(result)
+                status_line.done += 1
+                held_back = self._shares_root_cause(result)
+                if held_back:
+                    held.append(result)
+                elif writer:
+                    writer.write(sql_record(result))
+                key = (result.model, result.explore)
+                done = self._finishes_explore(result, mode, remaining)
+                if result.kind == "explore":
+                    if not done:
+                        # Wait for the explore's dimensions to pin down the errors
+                        continue
+                    source = f"{result.model}.{result.explore}"
+                    printer.print_validation_result(result.status, source)
+                    reported.add(key)
+                if result.error and id(result.error) not in printed and not held_back:
+                    printed.add(id(result.error))
+                    printer.print_sql_error(vars(result.error))
+                if result.kind == "dimension" and done:
+                    status = self.get_explore_status(explores[key])
+                    source = f"{result.model}.{result.explore}"
+                    printer.print_validation_result(status, source)
+                    reported.add(key)
+        finally:
+            status_line.stop()
+            if writer:
+                for result in held:
+                    writer.write(sql_record(result))
+
+        # Explores that were held back, e.g. in hybrid mode when the run stopped
+        # before their dimensions were queried. Untested explores come later.
+        for key in sorted(set(explores) - reported):
+            status = self.get_explore_status(explores[key])
+            if status != "untested":
+                printer.print_validation_result(status, ".".join(key))
+        errors = self._collect_errors(results)
+        for error in sorted(errors, key=lambda x: x.path):
+            if id(error) not in printed:
+                printer.print_sql_error(vars(error))
+        return errors
+
+    def _shares_root_cause(self, result: QueryResult) -> bool:
+        """Tells whether a dimension's error is its view's view-level error."""
+        if result.kind != "dimension" or result.error is None:
+            return False
+        return self.root_causes.get(result.path.split(".")[0]) is result.error
+
+    def _explore_index(self) -> Dict[Tuple[str, str], Explore]:
+        return {
+            (model.name, explore.name): explore
+            for model in self.project.models
+            for explore in model.explores
+        }
+
+    @staticmethod
+    def _finishes_explore(
+        result: QueryResult, mode: str, remaining: Dict[Tuple[str, str], int]
+    ) -> bool:
+        """Tells whether a result is the last one its explore's status waits for.
+
+        Args:
+            result: Result of an explore or dimension.
+            mode: One of 'batch', 'single' or 'hybrid', see validate.
+            remaining: Number of dimension results each explore still waits for,
+                keyed by model and explore name. Counted down by this method.
+
+        """
+        if result.kind == "explore":
+            # In hybrid mode, an explore that fails waits for its dimensions
+            return mode != "hybrid" or result.error is None
+        key = (result.model, result.explore)
+        remaining[key] -= 1
+        return remaining[key] == 0
+
+    async def _run(self, mode: str, fail_fast: bool, deadline: Optional[float]) -> None:
+        """Runs each pass over the project, publishing results as they come in."""
+        await self._query(mode, fail_fast, deadline)
+        self._apply_restored_results()
+        if mode == "hybrid" and self.project.errored and not self.halted:
+            await self._query(mode, fail_fast, deadline)
+
+    def print_results(self, untested_only: bool = False) -> None:
+        """Prints the status of each explore after validation.
+
+        Args:
+            untested_only: When true, only prints the explores that weren't tested,
+                e.g. because their results were already printed as they arrived.
+
+        """
+        untested_count = 0
         for model in sorted(self.project.models, key=lambda x: x.name):
             for explore in sorted(model.explores, key=lambda x: x.name):
-                message = f"{model.name}.{explore.name}"
-                if explore.errored:
-                    printer.print_validation_result("error", message)
+                status = self.get_explore_status(explore)
+                if status == "untested":
+                    untested_count += 1
+                elif untested_only:
+                    continue
+                printer.print_validation_result(status, f"{model.name}.{explore.name}")
+
+        if untested_count:
+            logger.info(
+                f"\n{untested_count} "
+                f"{'explore was' if untested_count == 1 else 'explores were'} "
+                "not tested because the run was stopped early."
+            )
+
+    def get_explore_status(self, explore: Explore) -> str:
+        """Returns 'success', 'error' or 'untested' for an explore after validation."""
+        if explore.errored:
+            return "error"
+        elif self.halted and not all(
+            dimension.queried for dimension in explore.dimensions
+        ):
+            return "untested"
+        else:
+            return "success"
+
+    def get_explore_results(self) -> List[dict]:
+        """Summarizes the status and query runtime of each explore after validation.
+
+        Returns:
+            List[dict]: One dictionary per explore with its model, name, status, the
+                total number of seconds its queries ran for and the names of any
+                dimensions with errors.
+
+        """
+        durations = self.queries.durations()
+        return [
+            {
+                "model": model.name,
+                "explore": explore.name,
+                "status": self.get_explore_status(explore),
+                "duration": round(durations[(model.name, explore.name)], 3),
+                "errored_dimensions": [
+                    dimension.name for dimension in explore.get_errored_dimensions()
+                ],
+            }
+            for model in self.project.models
+            for explore in model.explores
+        ]
+
+    def select_shard(
+        self, index: int, count: int, timings: Optional[Dict[str, float]] = None
+    ) -> None:
+        """Narrows the project down to the explores assigned to one shard.
+
+        Explores are assigned deterministically, so the same selection and shard
+        count always produce the same shards. Shards are balanced by the explores'
+        historical query runtimes when they're available, falling back to their
+        number of dimensions.
+
+        Args:
+            index: Which shard to keep, starting from 1.
+            count: Total number of shards.
+            timings: Mapping of 'model_name/explore_name' to query runtimes in seconds
+                from a previous run.
+
+        """
+        if not 1 <= index <= count:
+            raise SpectaclesException(
+                f"Shard {index}/{count} is not valid. "
+                "The shard index must be between 1 and the number of shards."
+            )
+        explores = {
+            f"{model.name}/{explore.name}": explore
+            for model in self.project.models
+            for explore in model.explores
+        }
+        timings = timings or {}
+        known = [timings[key] for key in explores if key in timings]
+        weights: Dict[str, float] = {}
+        for key, explore in explores.items():
+            if known:
+                # Assume explores without history take an average amount of time
+                weights[key] = timings.get(key, sum(known) / len(known))
+            else:
+                weights[key] = len(explore.dimensions)
+
+        selected = set(utils.partition(weights, count)[index - 1])
+        for model in self.project.models:
+            model.explores = [
+                explore
+                for explore in model.explores
+                if f"{model.name}/{explore.name}" in selected
+            ]
+        self.project.models = [model for model in self.project.models if model.explores]
+        logger.info(
+            f"Shard {index}/{count} is testing {len(selected)} of "
+            f"{len(explores)} explores, balanced by "
+            f"{'query runtime' if known else 'dimension count'}"
+        )
+
+    def select_changed(self, base_snapshots: Dict[str, dict]) -> None:
+        """Narrows the project down to the explores that changed since a base branch.
+
+        An explore changed if it's new, has new, changed or removed dimensions, or if
+        its joins or base table changed.
+
+        Args:
+            base_snapshots: Snapshot of each explore on the base branch, keyed by
+                'model_name/explore_name'.
+
+        """
+        explore_count = self._count_explores()
+        for model in self.project.models:
+            changed = []
+            for explore in model.explores:
+                head = snapshot_explore(
+                    self.client.get_lookml_explore(model.name, explore.name)
+                )
+                key = f"{model.name}/{explore.name}"
+                reasons = compare_snapshots(base_snapshots.get(key), head)
+                if reasons:
+                    logger.debug(f"Explore {key} changed: {', '.join(reasons)}")
+                    changed.append(explore)
+            model.explores = changed
+        self.project.models = [model for model in self.project.models if model.explores]
+        logger.info(
+            f"{self._count_explores()} of {explore_count} explores changed since "
+            "the base branch"
+        )
+
+    def select_dimensions(self, dimensions: Dict[str, List[str]]) -> None:
+        """Narrows explores down to some of their dimensions, e.g. the ones that failed.
+
+        Args:
+            dimensions: Names of the dimensions to keep, keyed by
+                'model_name/explore_name'. Explores that aren't in the mapping, or
+                that are mapped to an empty list, keep all of their dimensions.
+
+        """
+        for model in self.project.models:
+            for explore in model.explores:
+                names = dimensions.get(f"{model.name}/{explore.name}")
+                if not names:
+                    continue
+                selected = [d for d in explore.dimensions if d.name in names]
+                if selected:
+                    explore.dimensions = selected
                 else:
-                    printer.print_validation_result("success", message)
+                    logger.warning(
+                        f"None of the dimensions selected in {model.name}/"
+                        f"{explore.name} exist anymore, testing all of them."
+                    )
 
-        return errors
+    def resume(self) -> None:
+        """Carries over progress from the checkpoint of an interrupted run.
+
+        Explores and dimensions that finished in the interrupted run take on their
+        journaled results instead of being queried again. Queries that were still
+        running are re-attached to if their explore is still selected, otherwise
+        they're cancelled.
+
+        """
+        if not self.checkpoint or not self.checkpoint.entries:
+            return
+        entries = dict(self.checkpoint.entries)
+        folded: List[Tuple[str, str, Dimension, Tuple[str, str, str]]] = []
+        for model in self.project.models:
+            for explore in model.explores:
+                lookml_objects: List[Union[Explore, Dimension]] = [explore]
+                lookml_objects.extend(explore.dimensions)
+                for lookml_object in lookml_objects:
+                    key = (model.name, explore.name, lookml_object.name)
+                    entry = entries.pop(key, None)
+                    if entry is None:
+                        continue
+                    elif entry["state"] in FINISHED_STATES or (
+                        entry["state"] == "skipped" and entry["error"]
+                    ):
+                        error = (
+                            error_from_json(entry["error"]) if entry["error"] else None
+                        )
+                        if (
+                            isinstance(lookml_object, Dimension)
+                            and error
+                            and error.path != lookml_object.name
+                        ):
+                            # Folded into its view's root cause, which may come later
+                            folded.append(
+                                (model.name, explore.name, lookml_object, key)
+                            )
+                            continue
+                        self._restored.append(
+                            (model.name, explore.name, lookml_object, error)
+                        )
+                        if isinstance(lookml_object, Dimension) and error:
+                            view = lookml_object.name.split(".")[0]
+                            if self._is_root_cause(view, error.message, error.sql):
+                                self.root_causes.setdefault(view, error)
+                    elif entry["state"] == "running":
+                        if isinstance(lookml_object, Explore):
+                            dimensions = [d.name for d in explore.dimensions]
+                        else:
+                            dimensions = [lookml_object.name]
+                        query = self.queries.create(
+                            lookml_object, model.name, explore.name, dimensions
+                        )
+                        query.query_id = entry["query_id"]
+                        self._reattaching.append((query, entry["query_task_id"]))
+                    else:
+                        # Cancelled or skipped, so it needs to run again
+                        continue
+                    self.resumed.add(key)
+
+        for model_name, explore_name, dimension, key in folded:
+            view = dimension.name.split(".")[0]
+            if view in self.root_causes:
+                error = self.root_causes[view]
+                self._restored.append((model_name, explore_name, dimension, error))
+                self.skipped_dimensions[view].append(dimension)
+                self.resumed.add(key)
+
+        self._orphaned_task_ids = [
+            entry["query_task_id"]
+            for entry in entries.values()
+            if entry["state"] == "running"
+        ]
+        logger.info(
+            f"Resuming from checkpoint: {len(self._restored)} finished, "
+            f"{len(self._reattaching)} still running, "
+            f"{len(self._orphaned_task_ids)} no longer selected"
+        )
 
-    async def shutdown(self, signal, loop):
-        logger.info("\n\n" + "Please wait, asking Looker to cancel any running queries")
-        logger.debug("Cleaning up async tasks.")
-        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
-        for task in tasks:
-            task.cancel()
-        await asyncio.wait(tasks, return_when=asyncio.ALL_COMPLETED)
-        # Nothing executes beyond this point because of CancelledErrors
+    def get_work_items(self, mode: str) -> List[dict]:
+        """Splits the built project into work items for other processes to test.
+
+        Args:
+            mode: In single mode, there's one work item per dimension. Otherwise,
+                there's one work item per explore.
 
-    async def _query(self, mode: str = "batch") -> List[SqlError]:
+        Returns:
+            List[dict]: Work items with a model name, explore name and dimensions.
+
+        """
+        items = []
+        for model in self.project.models:
+            for explore in model.explores:
+                dimensions = [dimension.to_json() for dimension in explore.dimensions]
+                groups = [[d] for d in dimensions] if mode == "single" else [dimensions]
+                for group in groups:
+                    items.append(
+                        {
+                            "model": model.name,
+                            "explore": explore.name,
+                            "dimensions": group,
+                        }
+                    )
+        return items
+
+    def load_work_items(self, items: List[dict]) -> None:
+        """Replaces the project hierarchy with the contents of some work items."""
+        models: Dict[str, Model] = {}
+        explores: Dict[Tuple[str, str], Explore] = {}
+        for item in items:
+            model = models.setdefault(
+                item["model"], Model(item["model"], self.project.name, explores=[])
+            )
+            key = (item["model"], item["explore"])
+            if key not in explores:
+                explores[key] = Explore(item["explore"])
+                model.explores.append(explores[key])
+            for dimension_json in item["dimensions"]:
+                explores[key].add_dimension(Dimension.from_json(dimension_json))
+        self.project.models = list(models.values())
+
+    def get_work_result(self, item: dict) -> dict:
+        """Summarizes the outcome of a work item after validation.
+
+        Args:
+            item: A work item previously loaded with load_work_items.
+
+        Returns:
+            dict: The item's status, query runtime in seconds and errors.
+
+        """
+        model = next(m for m in self.project.models if m.name == item["model"])
+        explore = next(e for e in model.explores if e.name == item["explore"])
+        names = set(dimension["name"] for dimension in item["dimensions"])
+        dimensions = [d for d in explore.dimensions if d.name in names]
+
+        errors: List[SqlError] = [explore.error] if explore.error else []
+        errored_dimensions = []
+        for dimension in dimensions:
+            if dimension.error:
+                errored_dimensions.append(dimension.name)
+            # Errors shared by a whole view are only reported once
+            if dimension.error and all(dimension.error is not e for e in errors):
+                errors.append(dimension.error)
+
+        if errors:
+            status = "error"
+        elif self.halted and not all(dimension.queried for dimension in dimensions):
+            status = "untested"
+        else:
+            status = "success"
+
+        # Explores split into several items share their runtime between them
+        duration = self.queries.durations()[(model.name, explore.name)]
+        duration *= len(dimensions) / len(explore.dimensions) if dimensions else 0
+        return {
+            "status": status,
+            "duration": round(duration, 3),
+            "errors": [vars(error) for error in errors],
+            "errored_dimensions": errored_dimensions,
+        }
+
+    def coordinate(
+        self,
+        work_queue: WorkQueue,
+        branch: str,
+        mode: str,
+        poll_interval: float = 5,
+        stall_timeout: float = 600,
+    ) -> Tuple[List[dict], List[dict]]:
+        """Fills a work queue with the built project and waits for workers to test it.
+
+        Args:
+            work_queue: Queue shared with worker processes.
+            branch: Git branch the project was built from.
+            mode: Mode the workers should run the SQL validator in.
+            poll_interval: Number of seconds to wait between progress checks.
+            stall_timeout: Number of seconds after which to give up if no item has
+                been claimed, renewed or finished, e.g. because no workers are
+                running.
+
+        Returns:
+            Tuple[List[dict], List[dict]]: Status and query runtime for each explore,
+                and dictionary representations of each error found.
+
+        """
+        items = self.get_work_items(mode)
+        work_queue.fill(self.project.name, branch, mode, items)
+        printer.print_header(
+            f"Waiting for workers to test {len(items)} "
+            f"{'work item' if len(items) == 1 else 'work items'} [{mode} mode]"
+        )
+
+        counts = None
+        latest_lease = None
+        last_progress = time.monotonic()
+        while not work_queue.is_finished():
+            progress = (work_queue.counts(), work_queue.latest_lease())
+            if progress[0] != counts:
+                logger.info(
+                    f"{progress[0]['done']} of {len(items)} work items done, "
+                    f"{progress[0]['leased']} in progress"
+                )
+            # Workers renewing their leases count as progress too
+            if progress != (counts, latest_lease):
+                counts, latest_lease = progress
+                last_progress = time.monotonic()
+            elif time.monotonic() - last_progress > stall_timeout:
+                raise SpectaclesException(
+                    f"No work items were claimed or finished in the last "
+                    f"{stall_timeout:.0f} seconds. Make sure workers are running "
+                    f"with --worker and the same --work-queue."
+                )
+            time.sleep(poll_interval)
+
+        explores: Dict[Tuple[str, str], dict] = {}
+        errors: List[dict] = []
+        for item, result in work_queue.results():
+            key = (item["model"], item["explore"])
+            explore = explores.setdefault(
+                key,
+                {
+                    "model": item["model"],
+                    "explore": item["explore"],
+                    "status": "success",
+                    "duration": 0.0,
+                    "errored_dimensions": [],
+                },
+            )
+            if result is None:
+                # Abandoned after its leases expired too many times
+                result = {"status": "untested", "duration": 0.0, "errors": []}
+            explore["errored_dimensions"].extend(result.get("errored_dimensions", []))
+            if result["status"] == "error" or explore["status"] == "success":
+                explore["status"] = result["status"]
+            explore["duration"] = round(explore["duration"] + result["duration"], 3)
+            errors.extend(result["errors"])
+
+        for key in sorted(explores):
+            explore = explores[key]
+            printer.print_validation_result(
+                explore["status"], f"{explore['model']}.{explore['explore']}"
+            )
+        return list(explores.values()), errors
+
+    def work(
+        self,
+        work_queue: WorkQueue,
+        worker: str,
+        branch: str,
+        poll_interval: float = 1,
+        heartbeat_interval: float = 60,
+    ) -> int:
+        """Claims and tests work items until every item in the queue is finished.
+
+        Up to the concurrency's worth of items are tested at once, and a new item is
+        claimed as soon as one finishes, so a slow item doesn't hold up the others.
+        Leases on the items being tested are renewed while they're in progress.
+
+        Args:
+            work_queue: Queue shared with the coordinator and other workers.
+            worker: Unique name for this worker.
+            branch: Git branch this worker's session is on, which has to be the one
+                the coordinator built the work items from.
+            poll_interval: Number of seconds to wait when there's nothing to claim.
+            heartbeat_interval: Number of seconds between lease renewals.
+
+        Returns:
+            int: Number of work items this worker completed.
+
+        """
+        meta = work_queue.get_meta()
+        while meta is None:
+            logger.info("Waiting for the coordinator to fill the work queue")
+            time.sleep(poll_interval)
+            meta = work_queue.get_meta()
+        if meta["project"] != self.project.name:
+            raise SpectaclesException(
+                f"The work queue is for project '{meta['project']}', "
+                f"but this worker was started for project '{self.project.name}'."
+            )
+        if meta.get("branch") != branch:
+            raise SpectaclesException(
+                f"The work queue is for branch '{meta.get('branch')}', "
+                f"but this worker was started on branch '{branch}'."
+            )
+
+        printer.print_header(f"Testing work items from the queue [{meta['mode']} mode]")
+        return utils.run_until_interrupted(
+            self._work(
+                work_queue, worker, meta["mode"], poll_interval, heartbeat_interval
+            )
+        )
+
+    async def _work(
+        self,
+        work_queue: WorkQueue,
+        worker: str,
+        mode: str,
+        poll_interval: float,
+        heartbeat_interval: float,
+    ) -> int:
+        """Tests claimed items side by side, claiming another as each one finishes.
+
+        Each item gets its own validator, which shares this validator's query slots
+        and a session with the others, like projects tested side by side.
+
+        """
         session = aiohttp.ClientSession(
             headers=self.client.session.headers, timeout=self.timeout
         )
+        in_flight: Dict[asyncio.Future, Tuple[int, dict, SqlValidator]] = {}
+        completed = 0
+        last_heartbeat = time.monotonic()
+        try:
+            while True:
+                free = self.concurrency - len(in_flight)
+                claimed = work_queue.claim(worker, free) if free > 0 else []
+                for item_id, item in claimed:
+                    validator = SqlValidator(
+                        self.client,
+                        self.project.name,
+                        self.concurrency,
+                        self.query_timeout,
+                        self.slot_pool,
+                        session=session,
+                        query_slots=self.query_slots,
+                    )
+                    validator.load_work_items([item])
+                    run = asyncio.ensure_future(validator.run(mode))
+                    in_flight[run] = (item_id, item, validator)
+                if not in_flight:
+                    if work_queue.is_finished():
+                        break
+                    await asyncio.sleep(poll_interval)
+                    continue
 
-        query_tasks = []
+                done, _ = await asyncio.wait(
+                    in_flight,
+                    timeout=poll_interval,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for run in done:
+                    item_id, item, validator = in_flight.pop(run)
+                    run.result()
+                    result = validator.get_work_result(item)
+                    printer.print_validation_result(
+                        result["status"], f"{item['model']}.{item['explore']}"
+                    )
+                    if work_queue.complete(item_id, worker, result):
+                        completed += 1
+                    else:
+                        logger.warning(
+                            f"Lease on {item['model']}/{item['explore']} expired "
+                            "before its result was recorded. Another worker will "
+                            "retry it."
+                        )
+                if in_flight and time.monotonic() - last_heartbeat > heartbeat_interval:
+                    item_ids = [item_id for item_id, _, _ in in_flight.values()]
+                    work_queue.extend_lease(worker, item_ids)
+                    last_heartbeat = time.monotonic()
+        except BaseException as error:
+            for run in in_flight:
+                run.cancel()
+            outcomes = await asyncio.gather(*in_flight, return_exceptions=True)
+            if isinstance(error, asyncio.CancelledError):
+                # Explain the interruption the way the cancelled runs do
+                for outcome in outcomes:
+                    if isinstance(outcome, SpectaclesException):
+                        raise outcome
+            raise
+        finally:
+            await session.close()
+        return completed
+
+    async def _query(
+        self,
+        mode: str = "batch",
+        fail_fast: bool = False,
+        deadline: Optional[float] = None,
+    ) -> List[SqlError]:
+        session = self.session or aiohttp.ClientSession(
+            headers=self.client.session.headers, timeout=self.timeout
+        )
+        self._reused_errors = []
+
+        query_tasks = [
+            asyncio.create_task(self._reattach_query(session, query, query_task_id))
+            for query, query_task_id in self._reattaching
+        ]
+        self._reattaching = []
+        await self._cancel_orphaned_queries(session)
         for model in self.project.models:
             for explore in model.explores:
                 if mode == "batch" or (mode == "hybrid" and not explore.queried):
+                    if (model.name, explore.name, explore.name) in self.resumed:
+                        continue
                     task = asyncio.create_task(
                         self._query_explore(session, model, explore)
                     )
                     query_tasks.append(task)
                 elif mode == "single" or (mode == "hybrid" and explore.errored):
                     for dimension in explore.dimensions:
+                        if (model.name, explore.name, dimension.name) in self.resumed:
+                            continue
                         task = asyncio.create_task(
                             self._query_dimension(session, model, explore, dimension)
                         )
@@ -262,23 +1375,12 @@ class SqlValidator(Validator):
 
         queries = asyncio.gather(*query_tasks)
         query_results = asyncio.create_task(
-            self._check_for_results(session, query_tasks)
+            self._check_for_results(session, query_tasks, fail_fast, deadline)
         )
         try:
             results = await asyncio.gather(queries, query_results)
         except asyncio.CancelledError:
-            query_task_ids = []
-            while not self.running_query_tasks.empty():
-                query_task_ids.append(await self.running_query_tasks.get())
-            cancel_query_tasks = []
-            for query_task_id in query_task_ids:
-                task = asyncio.create_task(
-                    self.client.cancel_query_task(session, query_task_id)
-                )
-                cancel_query_tasks.append(task)
-
-            await asyncio.gather(*cancel_query_tasks)
-
+            query_task_ids = await self._cancel_running_queries(session)
             message = "Spectacles was manually interrupted. "
             if query_task_ids:
                 message += (
@@ -291,9 +1393,236 @@ class SqlValidator(Validator):
             raise SpectaclesException(message)
         else:
             errors = results[1]  # Ignore the results from creating the queries
-            return errors
+            self._annotate_root_causes()
+            self._check_for_leaked_slots()
+            return self._reused_errors + errors
         finally:
-            await session.close()
+            if session is not self.session:
+                await session.close()
+
+    async def _cancel_running_queries(
+        self, session: aiohttp.ClientSession
+    ) -> List[str]:
+        """Empties the queue of running query tasks and asks Looker to cancel them.
+
+        Returns:
+            List[str]: IDs of the query tasks that were cancelled.
+
+        """
+        query_task_ids = []
+        while not self.running_query_tasks.empty():
+            query_task_ids.append(await self.running_query_tasks.get())
+        cancel_query_tasks = []
+        for query_task_id in query_task_ids:
+            task = asyncio.create_task(
+                self._cancel_query_task(
+                    session, query_task_id, self.queries.get(query_task_id)
+                )
+            )
+            cancel_query_tasks.append(task)
+
+        await asyncio.gather(*cancel_query_tasks)
+        for query_task_id in query_task_ids:
+            query = self.queries.get(query_task_id)
+            self.queries.transition(query, "cancelled")
+            self._record(query)
+        return query_task_ids
+
+    async def _reattach_query(
+        self, session: aiohttp.ClientSession, query: Query, query_task_id: str
+    ) -> Optional[str]:
+        """Picks up a query task left running by an interrupted run."""
+        await self.queries.dispatch(query)
+        if self.halted:
+            await self._cancel_query_task(session, query_task_id, query)
+            self.queries.transition(query, "cancelled")
+            return None
+        self.queries.start(query, query_task_id)
+        await self.running_query_tasks.put(query_task_id)
+        return query_task_id
+
+    async def _cancel_query_task(
+        self,
+        session: aiohttp.ClientSession,
+        query_task_id: str,
+        lane: Union[Query, str] = "cancel",
+    ) -> None:
+        """Asks Looker to cancel a query task, tracing it in the query's lane."""
+        with tracer.span("cancel_query_task", lane, query_task_id=query_task_id):
+            await self.client.cancel_query_task(session, query_task_id)
+
+    async def _cancel_orphaned_queries(self, session: aiohttp.ClientSession) -> None:
+        """Cancels query tasks left running for explores that are no longer selected."""
+        await asyncio.gather(
+            *(
+                self._cancel_query_task(session, query_task_id)
+                for query_task_id in self._orphaned_task_ids
+            )
+        )
+        self._orphaned_task_ids = []
+
+    def _apply_restored_results(self) -> List[SqlError]:
+        """Marks the results carried over from the checkpoint on the project.
+
+        This happens after the first pass over the project, so that in hybrid mode
+        restored explores aren't mistaken for ones that were just queried in batch.
+
+        Returns:
+            List[SqlError]: The errors that were carried over.
+
+        """
+        errors: List[SqlError] = []
+        for model, explore, lookml_object, error in self._restored:
+            lookml_object.queried = True
+            lookml_object.error = error
+            # Dimensions folded into a root cause share its error
+            if error and not any(error is other for other in errors):
+                errors.append(error)
+            self._publish(model, explore, lookml_object)
+        self._restored = []
+        return errors
+
+    def _record(self, query: Query, error: Optional[SqlError] = None) -> None:
+        if self.checkpoint:
+            self.checkpoint.record(query, error)
+
+    def _publish(
+        self,
+        model: str,
+        explore: str,
+        lookml_object: Union[Explore, Dimension],
+        query: Optional[Query] = None,
+    ) -> None:
+        """Hands an explore or dimension's result to iter_results and to any hooks."""
+        if self._results is None and not hooks.active("on_query_result"):
+            return
+        duration = None
+        if query and query.started is not None and query.finished is not None:
+            duration = query.finished - query.started
+        result = QueryResult(model, explore, lookml_object, duration)
+        hooks.emit("on_query_result", result)
+        if self._results is not None:
+            self._results.put_nowait(result)
+
+    async def _halt(self, session: aiohttp.ClientSession, reason: str) -> None:
+        """Stops dispatching new queries and cancels the ones still running.
+
+        Queries waiting for a slot are woken up as the cancelled queries release
+        their slots, and return without being run.
+
+        Args:
+            reason: Explanation for stopping, shown to the user.
+
+        """
+        self.halted = True
+        query_task_ids = await self._cancel_running_queries(session)
+        logger.info(
+            f"\n{reason} Cancelled {len(query_task_ids)} running "
+            f"{'query' if len(query_task_ids) == 1 else 'queries'}."
+        )
+
+    def _check_for_leaked_slots(self) -> None:
+        """Warns about and releases query slots still held after all results are in.
+
+        Every query should have reached a final state by the end of a run. Queries
+        that didn't would otherwise keep their slots and slowly starve later runs.
+
+        """
+        logger.debug("Query states: %s", dict(self.queries.counts))
+        leaked = self.queries.holding_slots()
+        if leaked:
+            logger.warning(
+                f"{leaked} {'query' if leaked == 1 else 'queries'} still held a "
+                "query slot at the end of the run, releasing them."
+            )
+            for query in self.queries.holding():
+                self.queries.transition(query, "cancelled")
+                self._record(query)
+
+    @staticmethod
+    def _classify_root_cause(message: str) -> Optional[str]:
+        """Identifies errors that will affect every dimension in a view.
+
+        Args:
+            message: Error message extracted from the query result.
+
+        Returns:
+            Optional[str]: The kind of root cause, e.g. 'missing_relation', or None if
+                the error is specific to the queried dimension.
+
+        """
+        if not message or re.search(r"\bcolumn\b", message, re.IGNORECASE):
+            return None
+        for root_cause, pattern in ROOT_CAUSE_PATTERNS.items():
+            if pattern.search(message):
+                return root_cause
+        return None
+
+    @classmethod
+    def _is_root_cause(cls, view: str, message: str, sql: Optional[str]) -> bool:
+        """Tells whether a dimension's error will affect every dimension in its view.
+
+        The error has to be a view-level kind and name the relation the view selects
+        from in the query's SQL. A missing table that only one dimension refers to,
+        e.g. in a subquery, doesn't count, so the view's other dimensions are still
+        queried.
+
+        Args:
+            view: Name of the dimension's view.
+            message: Error message extracted from the query result.
+            sql: SQL of the query that failed.
+
+        """
+        root_cause = cls._classify_root_cause(message)
+        if root_cause is None or not sql:
+            return False
+        # Looker aliases each view's relation with the view's name
+        match = re.search(
+            r"\b(?:FROM|JOIN)\s+([^\s()]+)\s+(?:AS\s+)?[`\"\[]?"
+            + re.escape(view)
+            + r"[`\"\]]?(?![\w.])",
+            sql,
+            re.IGNORECASE,
+        )
+        if match is None:
+            return False
+        parts = [part.strip('`"[]').lower() for part in match.group(1).split(".")]
+        mentioned = set(re.findall(r"[\w$-]+", message.lower()))
+        if root_cause == "missing_schema":
+            return any(part in mentioned for part in parts[:-1])
+        return parts[-1] in mentioned
+
+    def _skip_dimension(self, query: Query, dimension: Dimension, view: str) -> None:
+        """Marks a dimension as failed with its view's root cause without querying.
+
+        The dimension is journaled with the root cause, so a resumed run doesn't
+        query it again, and published like any other result.
+
+        """
+        logger.debug(
+            "Skipping %s, view %s already failed with a view-level error",
+            dimension.name,
+            view,
+        )
+        dimension.queried = True
+        dimension.error = self.root_causes[view]
+        self.skipped_dimensions[view].append(dimension)
+        self._record(query, dimension.error)
+        self._publish(query.model, query.explore, dimension, query)
+
+    def _annotate_root_causes(self) -> None:
+        """Notes on each view-level error how many dimensions it stands in for."""
+        for view, dimensions in self.skipped_dimensions.items():
+            if not dimensions:
+                continue
+            error = self.root_causes[view]
+            count = len(dimensions)
+            error.message += (
+                f" ({count} other {'dimension' if count == 1 else 'dimensions'} "
+                f"in view '{view}' {'was' if count == 1 else 'were'} "
+                "skipped because of this error.)"
+            )
+            dimensions.clear()
 
     @staticmethod
     def _extract_error_details(query_result: dict) -> dict:
@@ -327,18 +1656,83 @@ class SqlValidator(Validator):
         return {"message": message, "sql": sql, "line_number": line_number}
 
     async def _run_query(
-        self,
-        session: aiohttp.ClientSession,
-        model: str,
-        explore: str,
-        dimensions: List[str],
-    ) -> str:
-        query_id = await self.client.create_query(session, model, explore, dimensions)
-        await self.query_slots.acquire()  # Wait for available slots before launching
-        query_task_id = await self.client.create_query_task(session, query_id)
+        self, session: aiohttp.ClientSession, query: Query, view: Optional[str] = None
+    ) -> Optional[str]:
+        if self.halted or view in self.root_causes:
+            self.queries.transition(query, "skipped")
+            return None
+        with tracer.span("create_query", query):
+            query.query_id = await self.client.create_query(
+                session, query.model, query.explore, query.dimensions
+            )
+        if self.sql_results is not None and await self._reuse_result(session, query):
+            return None
+        await self.queries.dispatch(query)  # Wait for available slots before launching
+        if self.halted or view in self.root_causes:
+            # The run stopped or the view failed while this query was waiting
+            self.queries.transition(query, "skipped")
+            return None
+        query_task_id = await self._create_query_task(session, query)
         await self.running_query_tasks.put(query_task_id)
         return query_task_id
 
+    async def _reuse_result(self, session: aiohttp.ClientSession, query: Query) -> bool:
+        """Gives a query the result of an earlier query with identical SQL.
+
+        Returns:
+            bool: True if the query's SQL has already run and its result was reused.
+
+        """
+        query.sql = await self.client.get_query_sql(session, query.query_id)
+        if self.sql_results is None or query.sql not in self.sql_results:
+            return False
+        logger.debug("Reusing the result of identical SQL for %s", query)
+        self.queries.transition(query, "reused")
+        lookml_object = query.lookml_object
+        lookml_object.queried = True
+        details = self.sql_results[query.sql]
+        if details:
+            sql_error = SqlError(
+                path=lookml_object.name,
+                url=getattr(lookml_object, "url", None),
+                **details,
+            )
+            lookml_object.error = sql_error
+            self._reused_errors.append(sql_error)
+        self._publish(query.model, query.explore, lookml_object)
+        return True
+
+    def _remember_result(self, query: Query, details: Optional[dict] = None) -> None:
+        if self.sql_results is not None and query.sql is not None:
+            self.sql_results[query.sql] = details
+
+    async def _create_query_task(
+        self, session: aiohttp.ClientSession, query: Query
+    ) -> str:
+        """Starts a query task for a dispatched or expired query.
+
+        If the query task can't be created, the query moves to a final state so its
+        slot is released before the exception propagates.
+
+        Returns:
+            str: ID for the query task running the query.
+
+        """
+        try:
+            with tracer.span("create_query_task", query):
+                query_task_id = await self.client.create_query_task(
+                    session, query.query_id
+                )
+        except asyncio.CancelledError:
+            self.queries.transition(query, "cancelled")
+            raise
+        except Exception:
+            self.queries.transition(query, "error")
+            raise
+        self.queries.start(query, query_task_id)
+        self._record(query)
+        return query_task_id
+
     async def _get_query_results(
         self, session: aiohttp.ClientSession
     ) -> List[SqlError]:
@@ -350,27 +1744,49 @@ class SqlValidator(Validator):
                 query_task_ids.append(await self.running_query_tasks.get())
 
             logger.debug("Getting results for %d query tasks", len(query_task_ids))
-            results = await self.client.get_query_task_multi_results(
-                session, query_task_ids
-            )
+            with tracer.span("multi_results", "polling", count=len(query_task_ids)):
+                results = await self.client.get_query_task_multi_results(
+                    session, query_task_ids
+                )
             pending_task_ids = []
-            errors = []
+            errors: List[SqlError] = []
 
             for query_task_id, query_result in results.items():
                 query_status = query_result["status"]
                 logger.debug("Query task %s status is %s", query_task_id, query_status)
-                if query_status in ("running", "added", "expired"):
+                query = self.queries.get(query_task_id)
+                tracer.mark("first_seen", query, once=True, status=query_status)
+                if query_status in ("running", "added"):
+                    query_task_ids.remove(query_task_id)
+                    if self._is_timed_out(query):
+                        errors.append(
+                            await self._cancel_timed_out_query(session, query_task_id)
+                        )
+                        continue
                     pending_task_ids.append(query_task_id)
                     # Put the running query tasks back in the queue
                     await self.running_query_tasks.put(query_task_id)
+                    continue
+                elif query_status == "expired":
                     query_task_ids.remove(query_task_id)
+                    # The query task expired before we got its results, so run the
+                    # query again under a new query task, keeping the same slot
+                    self.queries.transition(query, "expired")
+                    logger.debug("Query task %s expired, resubmitting", query_task_id)
+                    query_task_id = await self._create_query_task(session, query)
+                    pending_task_ids.append(query_task_id)
+                    await self.running_query_tasks.put(query_task_id)
                     continue
                 elif query_status in ("complete", "error"):
                     query_task_ids.remove(query_task_id)
                     # We can release a query slot for each completed query
-                    self.query_slots.release()
-                    lookml_object = self.query_tasks[query_task_id]
+                    self.queries.transition(query, query_status)
+                    lookml_object = query.lookml_object
                     lookml_object.queried = True
+                    if query_status == "complete":
+                        self._record(query)
+                        self._remember_result(query)
+                        self._publish(query.model, query.explore, lookml_object, query)
 
                     if query_status == "error":
                         try:
@@ -381,6 +1797,13 @@ class SqlValidator(Validator):
                                 "unable to extract error details. "
                                 f"The query result was: {query_result}"
                             ) from error
+                        view = None
+                        if isinstance(lookml_object, Dimension):
+                            view = lookml_object.name.split(".")[0]
+                            if view in self.root_causes:
+                                # Already running when its view failed, fold it in
+                                self._skip_dimension(query, lookml_object, view)
+                                continue
                         sql_error = SqlError(
                             path=lookml_object.name,
                             url=getattr(lookml_object, "url", None),
@@ -388,6 +1811,13 @@ class SqlValidator(Validator):
                         )
                         lookml_object.error = sql_error
                         errors.append(sql_error)
+                        self._record(query, sql_error)
+                        self._remember_result(query, details)
+                        if view and self._is_root_cause(
+                            view, details["message"], details["sql"]
+                        ):
+                            self.root_causes[view] = sql_error
+                        self._publish(query.model, query.explore, lookml_object, query)
                 else:
                     raise SpectaclesException(
                         f'Unexpected query result status "{query_status}" '
@@ -405,24 +1835,69 @@ class SqlValidator(Validator):
 
         return errors
 
+    def _is_timed_out(self, query: Query) -> bool:
+        if self.query_timeout is None or query.started is None:
+            return False
+        elapsed = asyncio.get_event_loop().time() - query.started
+        return elapsed > self.query_timeout
+
+    async def _cancel_timed_out_query(
+        self, session: aiohttp.ClientSession, query_task_id: str
+    ) -> QueryTimeoutError:
+        """Cancels a query that ran past the timeout and records the timeout.
+
+        Args:
+            query_task_id: ID for the query task to cancel.
+
+        Returns:
+            QueryTimeoutError: Timeout error for the LookML object that was queried.
+
+        """
+        logger.debug("Query task %s timed out, cancelling it", query_task_id)
+        query = self.queries.get(query_task_id)
+        await self._cancel_query_task(session, query_task_id, query)
+        self.queries.transition(query, "timeout")
+        lookml_object = query.lookml_object
+        lookml_object.queried = True
+        error = QueryTimeoutError(
+            path=lookml_object.name,
+            timeout=self.query_timeout or 0,
+            url=getattr(lookml_object, "url", None),
+        )
+        lookml_object.error = error
+        self._record(query, error)
+        self._publish(query.model, query.explore, lookml_object, query)
+        return error
+
     async def _check_for_results(
-        self, session: aiohttp.ClientSession, query_tasks: List[asyncio.Task]
+        self,
+        session: aiohttp.ClientSession,
+        query_tasks: List[asyncio.Task],
+        fail_fast: bool = False,
+        deadline: Optional[float] = None,
     ):
+        loop = asyncio.get_event_loop()
         results = []
         while (
             any(not task.done() for task in query_tasks)
             or not self.running_query_tasks.empty()
         ):
+            if deadline is not None and loop.time() >= deadline and not self.halted:
+                await self._halt(session, "The time budget for this run ran out.")
             if not self.running_query_tasks.empty():
                 result = await self._get_query_results(session)
                 results.extend(result)
+                if fail_fast and results and not self.halted:
+                    await self._halt(
+                        session, "Stopping at the first error because fail-fast is on."
+                    )
             await asyncio.sleep(0.5)
 
         return results
 
     async def _query_explore(
         self, session: aiohttp.ClientSession, model: Model, explore: Explore
-    ) -> str:
+    ) -> Optional[str]:
         """Creates and executes a query with a single explore.
 
         Args:
@@ -430,15 +1905,12 @@ class SqlValidator(Validator):
             explore: Object representation of LookML explore.
 
         Returns:
-            str: Query task ID for the running query.
+            Optional[str]: Query task ID for the running query, or None if skipped.
 
         """
         dimensions = [dimension.name for dimension in explore.dimensions]
-        query_task_id = await self._run_query(
-            session, model.name, explore.name, dimensions
-        )
-        self.query_tasks[query_task_id] = explore
-        return query_task_id
+        query = self.queries.create(explore, model.name, explore.name, dimensions)
+        return await self._run_query(session, query)
 
     async def _query_dimension(
         self,
@@ -446,22 +1918,28 @@ class SqlValidator(Validator):
         model: Model,
         explore: Explore,
         dimension: Dimension,
-    ) -> str:
+    ) -> Optional[str]:
         """Creates and executes a query with a single dimension.
 
+        If the dimension's view has already failed with a view-level error, like a
+        missing table, the query is skipped and the dimension takes on that error.
+
         Args:
             model: Object representation of LookML model.
             explore: Object representation of LookML explore.
             dimension: Object representation of LookML dimension.
 
         Returns:
-            str: Query task ID for the running query.
+            Optional[str]: Query task ID for the running query, or None if skipped.
 
         """
-        query_task_id = await self._run_query(
-            session, model.name, explore.name, [dimension.name]
+        view = dimension.name.split(".")[0]
+        query = self.queries.create(
+            dimension, model.name, explore.name, [dimension.name]
         )
-        self.query_tasks[query_task_id] = dimension
+        query_task_id = await self._run_query(session, query, view)
+        if query.state == "skipped" and view in self.root_causes:
+            self._skip_dimension(query, dimension, view)
         return query_task_id
 
     def _count_explores(self) -> int:
@@ -0,0 +1,190 @@
+from typing import List, Dict, Tuple, Optional
+import json
+import sqlite3
+import time
+from spectacles.exceptions import SpectaclesException
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT
+);
+"""
+
+
+class WorkQueue:
+    """Shares SQL validation work items between processes through a SQLite file.
+
+    A coordinator fills the queue and any number of workers on the same machine
+    claim items from it. Claimed items are leased to a worker for a limited time,
+    which the worker extends while it's still testing them. If the worker doesn't
+    report a result or extend the lease before it expires, e.g. because it crashed,
+    the item can be claimed again, up to a maximum number of attempts.
+
+    Args:
+        path: Path to the SQLite file backing the queue.
+        lease: Number of seconds a worker has to finish an item it claimed.
+        max_attempts: Number of times an item may be claimed before it's abandoned.
+
+    """
+
+    def __init__(self, path: str, lease: float = 1800, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Autocommit mode, so transactions are only opened explicitly below
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def fill(self, project: str, branch: str, mode: str, items: List[dict]) -> None:
+        """Replaces the queue's contents with new work items.
+
+        Args:
+            project: Name of the LookML project the items belong to.
+            branch: Git branch the items were built from, which workers must test.
+            mode: Mode the SQL validator should run the items in.
+            items: JSON-serializable work items.
+
+        """
+        with self._transaction():
+            self.connection.execute("DELETE FROM items")
+            self.connection.execute("DELETE FROM meta")
+            self.connection.executemany(
+                "INSERT INTO items (payload) VALUES (?)",
+                [(json.dumps(item),) for item in items],
+            )
+            self.connection.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [("project", project), ("branch", branch), ("mode", mode)],
+            )
+
+    def get_meta(self) -> Optional[Dict[str, str]]:
+        """Returns the project, branch and mode, or None if the queue isn't filled."""
+        rows = self.connection.execute("SELECT key, value FROM meta").fetchall()
+        return dict(rows) if rows else None
+
+    def claim(self, worker: str, limit: int) -> List[Tuple[int, dict]]:
+        """Leases up to a number of pending or expired work items to a worker.
+
+        Args:
+            worker: Unique name of the worker claiming the items.
+            limit: Maximum number of items to claim.
+
+        Returns:
+            List[Tuple[int, dict]]: ID and payload of each claimed item.
+
+        """
+        now = time.time()
+        with self._transaction():
+            rows = self.connection.execute(
+                "SELECT id, payload FROM items "
+                "WHERE (status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?)) "
+                "AND attempts < ? ORDER BY id LIMIT ?",
+                (now, self.max_attempts, limit),
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE items SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.lease, item_id) for item_id, _ in rows],
+            )
+        return [(item_id, json.loads(payload)) for item_id, payload in rows]
+
+    def extend_lease(self, worker: str, item_ids: List[int]) -> int:
+        """Renews a worker's leases on items it's still testing.
+
+        Args:
+            worker: Unique name of the worker holding the leases.
+            item_ids: IDs of the items whose leases to renew.
+
+        Returns:
+            int: Number of leases renewed. Leases that already expired and were
+                claimed by another worker aren't renewed.
+
+        """
+        with self._transaction():
+            cursor = self.connection.executemany(
+                "UPDATE items SET lease_expires = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                [(time.time() + self.lease, item_id, worker) for item_id in item_ids],
+            )
+        return cursor.rowcount
+
+    def latest_lease(self) -> Optional[float]:
+        """Returns when the most recently claimed or renewed lease expires."""
+        return self.connection.execute(
+            "SELECT MAX(lease_expires) FROM items WHERE status = 'leased'"
+        ).fetchone()[0]
+
+    def complete(self, item_id: int, worker: str, result: dict) -> bool:
+        """Records the result of a work item if the worker still holds its lease.
+
+        Returns:
+            bool: False if the lease expired and the item was claimed by another
+                worker in the meantime.
+
+        """
+        with self._transaction():
+            cursor = self.connection.execute(
+                "UPDATE items SET status = 'done', result = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (json.dumps(result), item_id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        """Counts items that are pending, leased, done or abandoned."""
+        counts = {"pending": 0, "leased": 0, "done": 0, "abandoned": 0}
+        rows = self.connection.execute(
+            "SELECT CASE "
+            "WHEN status = 'leased' AND lease_expires < ? AND attempts >= ? "
+            "THEN 'abandoned' ELSE status END, COUNT(*) FROM items GROUP BY 1",
+            (time.time(), self.max_attempts),
+        ).fetchall()
+        counts.update(dict(rows))
+        return counts
+
+    def is_finished(self) -> bool:
+        """Checks whether every item is either done or abandoned."""
+        counts = self.counts()
+        return self.get_meta() is not None and not (
+            counts["pending"] or counts["leased"]
+        )
+
+    def results(self) -> List[Tuple[dict, Optional[dict]]]:
+        """Returns each item's payload with its result, or None if it has none."""
+        rows = self.connection.execute(
+            "SELECT payload, result FROM items ORDER BY id"
+        ).fetchall()
+        return [
+            (json.loads(payload), json.loads(result) if result else None)
+            for payload, result in rows
+        ]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _transaction(self):
+        return _Transaction(self.connection)
+
+
+class _Transaction:
+    """Runs a block in an immediate transaction, which locks out other writers."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        try:
+            self.connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as error:
+            raise SpectaclesException(f"Unable to lock the work queue: {error}")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -0,0 +1,172 @@
+from typing import Dict, Optional, Type, IO
+import sys
+import json
+from abc import ABC, abstractmethod
+from xml.sax.saxutils import escape, quoteattr
+from spectacles.queries import QueryResult
+from spectacles.client import JsonDict
+from spectacles.exceptions import SpectaclesException
+
+OUTPUT_FORMATS = ("ndjson", "junit", "json")
+
+
+def sql_record(result: QueryResult) -> dict:
+    """Describes the result of testing an explore or dimension as a record."""
+    error = result.error
+    return {
+        "type": "sql",
+        "model": result.model,
+        "explore": result.explore,
+        "path": result.path,
+        "kind": result.kind,
+        "status": result.status,
+        "duration": None if result.duration is None else round(result.duration, 3),
+        "message": error.message if error else None,
+        "line_number": error.line_number if error else None,
+        "url": result.url,
+    }
+
+
+def data_test_record(
+    result: JsonDict, duration: Optional[float] = None, url: Optional[str] = None
+) -> dict:
+    """Describes the result of a data test, as returned by Looker, as a record.
+
+    Args:
+        result: JSON for one test in the response from running data tests.
+        duration: Number of seconds the API call that ran the test took.
+        url: Link to the test's LookML.
+
+    """
+    errors = result.get("errors") or []
+    first_error = errors[0] if errors else {}
+    return {
+        "type": "data_test",
+        "model": result["model_name"],
+        "explore": None,
+        "path": f"{result['model_name']}/{result['test_name']}",
+        "kind": "test",
+        "status": "success" if result["success"] else "error",
+        "duration": None if duration is None else round(duration, 3),
+        "message": " ".join(error["message"] for error in errors) or None,
+        "line_number": first_error.get("line_number"),
+        "url": url,
+    }
+
+
+class ResultWriter(ABC):
+    """Writes result records to a file as they arrive.
+
+    Each record is flushed as soon as it's written, so memory use stays flat on
+    large runs and the results so far survive the run crashing.
+
+    Args:
+        file: Open text file to write the records to.
+
+    """
+
+    def __init__(self, file: IO):
+        self.file = file
+        self.count = 0
+
+    def write(self, record: dict) -> None:
+        self._write(record)
+        self.count += 1
+        self.file.flush()
+
+    @abstractmethod
+    def _write(self, record: dict) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        if self.file is not sys.stdout:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class NdjsonWriter(ResultWriter):
+    """Writes one JSON object per line."""
+
+    def _write(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+
+
+class JsonWriter(ResultWriter):
+    """Writes a single JSON array, which is only closed once the run finishes."""
+
+    def __init__(self, file: IO):
+        super().__init__(file)
+        self.file.write("[")
+
+    def _write(self, record: dict) -> None:
+        self.file.write(("," if self.count else "") + "\n  " + json.dumps(record))
+
+    def close(self) -> None:
+        self.file.write("\n]\n")
+        super().close()
+
+
+class JUnitWriter(ResultWriter):
+    """Writes a JUnit XML report, with a test case for each record.
+
+    The test suite's element is only closed once the run finishes, so the report
+    of a run that crashed needs its closing tags added before it can be parsed.
+
+    """
+
+    def __init__(self, file: IO):
+        super().__init__(file)
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.file.write('<testsuites>\n<testsuite name="spectacles">\n')
+
+    def _write(self, record: dict) -> None:
+        classname = ".".join(filter(None, [record["model"], record["explore"]]))
+        attributes = (
+            f"classname={quoteattr(classname)} name={quoteattr(record['path'])}"
+        )
+        if record["duration"] is not None:
+            attributes += f' time="{record["duration"]}"'
+        if record["status"] == "success":
+            self.file.write(f"  <testcase {attributes}/>\n")
+            return
+        details = [record["message"] or ""]
+        if record["line_number"] is not None:
+            details.append(f"Line: {record['line_number']}")
+        if record["url"]:
+            details.append(f"LookML: {record['url']}")
+        text = escape("\n".join(details))
+        self.file.write(
+            f"  <testcase {attributes}>\n"
+            f"    <failure message={quoteattr(record['message'] or '')}>"
+            f"{text}</failure>\n"
+            "  </testcase>\n"
+        )
+
+    def close(self) -> None:
+        self.file.write("</testsuite>\n</testsuites>\n")
+        super().close()
+
+
+def open_writer(output_format: str, path: Optional[str] = None) -> ResultWriter:
+    """Opens a writer for an output format, writing to a file or to stdout.
+
+    Args:
+        output_format: One of 'ndjson', 'junit' or 'json'.
+        path: Path to the file to write. By default, writes to stdout, which
+            spectacles' log messages don't go to.
+
+    """
+    writers: Dict[str, Type[ResultWriter]] = {
+        "ndjson": NdjsonWriter,
+        "junit": JUnitWriter,
+        "json": JsonWriter,
+    }
+    if output_format not in writers:
+        raise SpectaclesException(
+            f"Unknown output format '{output_format}', choose from "
+            + ", ".join(OUTPUT_FORMATS)
+            + "."
+        )
+    file = open(path, "w") if path else sys.stdout
+    return writers[output_format](file)
@@ -0,0 +1,58 @@
+import json
+import pytest
+from spectacles.lookml import Dimension
+from spectacles.queries import Query
+from spectacles.checkpoint import Checkpoint, error_from_json
+from spectacles.exceptions import SqlError, QueryTimeoutError, SpectaclesException
+
+
+@pytest.fixture
+def query():
+    dimension = Dimension("test_view.dimension_one", "number", "1", None)
+    query = Query(dimension, "test_model", "test_explore", [dimension.name])
+    query.query_id = 1
+    query.query_task_id = "query_task_a"
+    query.state = "error"
+    return query
+
+
+def test_resume_loads_latest_entry_per_object(tmp_path, query):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = Checkpoint(path, "test_project")
+    query.state = "running"
+    checkpoint.record(query)
+    query.state = "error"
+    checkpoint.record(query, SqlError("test_view.dimension_one", "Oops", "SELECT"))
+    checkpoint.close()
+    with open(path, "a") as file:
+        file.write('{"model": "test_mo')  # Killed while writing
+
+    entries = Checkpoint(path, "test_project", resume=True).entries
+    entry = entries[("test_model", "test_explore", "test_view.dimension_one")]
+    assert entry["state"] == "error"
+    assert entry["error"]["message"] == "Oops"
+
+
+def test_resume_without_checkpoint_starts_from_scratch(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    assert Checkpoint(str(path), "test_project", resume=True).entries == {}
+    assert json.loads(path.read_text()) == {"project": "test_project"}
+
+
+def test_resume_checkpoint_for_other_project_raises(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    Checkpoint(path, "other_project").close()
+    with pytest.raises(SpectaclesException):
+        Checkpoint(path, "test_project", resume=True)
+
+
+def test_close_can_remove_checkpoint(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    Checkpoint(str(path), "test_project").close(remove=True)
+    assert not path.exists()
+
+
+def test_error_from_json_restores_timeouts():
+    error = error_from_json(vars(QueryTimeoutError("test_explore", timeout=30)))
+    assert isinstance(error, QueryTimeoutError)
+    assert error.timeout == 30
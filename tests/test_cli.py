@@ -181,3 +181,93 @@ def test_bad_config_file_parameter(mock_parse_config, clean_env, parser):
 def test_parse_remote_reset_with_assert(env, parser):
     args = parser.parse_args(["assert", "--remote-reset"])
     assert args.remote_reset
+
+
+def test_parse_fail_fast_with_sql(env, parser):
+    args = parser.parse_args(["sql", "--fail-fast"])
+    assert args.fail_fast
+    args = parser.parse_args(["sql"])
+    assert not args.fail_fast
+
+
+def test_parse_time_budget_with_sql(env, parser):
+    args = parser.parse_args(["sql", "--time-budget", "1200"])
+    assert args.time_budget == 1200
+
+
+def test_parse_shard_with_sql(env, parser):
+    args = parser.parse_args(["sql", "--shard", "2/4"])
+    assert args.shard == (2, 4)
+
+
+@pytest.mark.parametrize("shard", ["2", "0/4", "5/4", "a/b"])
+def test_parse_invalid_shard_with_sql(env, parser, shard):
+    with pytest.raises(SystemExit):
+        parser.parse_args(["sql", "--shard", shard])
+
+
+def test_parse_merge_without_credentials(clean_env, parser):
+    args = parser.parse_args(["merge", "one.json", "two.json"])
+    assert args.results_files == ["one.json", "two.json"]
+
+
+def test_parse_several_projects_with_sql(env, parser):
+    args = parser.parse_args(["sql", "--project", "project_one", "project_two"])
+    assert args.project == ["project_one", "project_two"]
+
+
+@patch("spectacles.cli.YamlConfigAction.parse_config")
+def test_config_file_instances_replace_connection_details(
+    mock_parse_config, clean_env, parser
+):
+    instances = [
+        {
+            "base_url": "https://staging.looker.com",
+            "client_id": "a",
+            "client_secret": "b",
+        }
+    ]
+    mock_parse_config.return_value = {
+        "project": "test_project",
+        "branch": "test_branch",
+        "instances": instances,
+    }
+    args = parser.parse_args(["sql", "--config-file", "config.yml"])
+    assert args.instances == instances
+    assert args.base_url is None
+
+
+def test_parse_assert_runs_every_test_unless_a_cache_is_given(env, parser):
+    assert parser.parse_args(["assert"]).cache_dir is None
+    args = parser.parse_args(["assert", "--cache-dir", ".spectacles-cache"])
+    assert args.cache_dir == ".spectacles-cache"
+
+
+def test_parse_all_with_sql_and_data_test_options(env, parser):
+    args = parser.parse_args(["all", "--mode", "hybrid", "--fail-fast"])
+    assert args.command == "all"
+    assert args.mode == "hybrid"
+    assert args.fail_fast
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--branches", "one", "two", "--shard", "1/2"],
+        ["--branches", "one", "two", "--incremental"],
+        ["--branches", "one", "two", "--checkpoint", "run.json"],
+        ["--project", "one", "two", "--rerun-failed"],
+        ["--project", "one", "two", "--worker"],
+        ["--worker", "--fail-fast"],
+        ["--worker", "--checkpoint", "run.json"],
+        ["--coordinator", "--time-budget", "60"],
+        ["--coordinator", "--query-timeout", "60"],
+    ],
+)
+@patch("spectacles.cli.Runner")
+def test_sql_rejects_options_that_dont_apply(mock_runner, options, env, tmp_path):
+    argv = ["spectacles", "sql", "--log-dir", str(tmp_path), *options]
+    with patch("sys.argv", new=argv), pytest.raises(SystemExit) as error:
+        main()
+    assert error.value.code == 100
+    mock_runner.assert_not_called()
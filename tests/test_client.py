@@ -113,3 +113,21 @@ async def test_create_query(mock_post, client):
             "filter_expression": "1=2",
         },
     )
+
+
+@pytest.mark.asyncio
+@asynctest.patch("aiohttp.ClientSession.get")
+async def test_run_lookml_test_async_passes_model_and_test(mock_get, client):
+    results = [{"model_name": "model", "test_name": "test", "success": True}]
+    mock_response = mock_get.return_value.__aenter__.return_value
+    mock_response.raise_for_status = Mock()
+    mock_response.json = asynctest.CoroutineMock(return_value=results)
+    async with aiohttp.ClientSession() as session:
+        response = await client.run_lookml_test_async(
+            session, "project", model="model", test="test"
+        )
+    assert response == results
+    mock_get.assert_called_once_with(
+        url="https://test.looker.com:19999/api/3.1/projects/project/lookml_tests/run",
+        params={"model": "model", "test": "test"},
+    )
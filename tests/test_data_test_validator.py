@@ -0,0 +1,138 @@
+from unittest.mock import Mock
+import threading
+import asynctest
+import pytest
+from spectacles.client import LookerClient
+from spectacles.exceptions import SpectaclesException
+from spectacles.validators import DataTestValidator
+
+
+def make_result(model, test, success):
+    return {
+        "model_name": model,
+        "test_name": test,
+        "success": success,
+        "errors": [] if success else [{"message": f"{test} failed."}],
+    }
+
+
+RESULTS = {
+    ("model_a", None): [make_result("model_a", "test_one", False)],
+    ("model_a", "test_one"): [make_result("model_a", "test_one", False)],
+    ("model_b", None): [
+        make_result("model_b", "test_two", False),
+        make_result("model_b", "test_three", True),
+    ],
+    ("model_b", "test_two"): [make_result("model_b", "test_two", False)],
+    ("model_b", "test_three"): [make_result("model_b", "test_three", True)],
+    (None, None): [
+        make_result("model_a", "test_one", False),
+        make_result("model_b", "test_two", False),
+        make_result("model_b", "test_three", True),
+    ],
+}
+
+
+@pytest.fixture
+def client():
+    client = Mock(spec=LookerClient)
+    client.session = Mock(headers={})
+    client.all_lookml_tests.return_value = [
+        {"model_name": "model_b", "name": "test_two", "explore_name": "explore"},
+        {"model_name": "model_b", "name": "test_three", "explore_name": "explore"},
+        {"model_name": "model_a", "name": "test_one", "explore_name": "explore"},
+    ]
+    client.get_lookml_explore.return_value = {
+        "sql_table_name": "table",
+        "fields": {"dimensions": [{"name": "explore.id", "sql": "${TABLE}.id"}]},
+    }
+    client.run_lookml_test_async = asynctest.CoroutineMock(
+        side_effect=lambda session, project, model=None, test=None: RESULTS[
+            (model, test)
+        ]
+    )
+    return client
+
+
+def called_units(client):
+    return [call[0][2:] for call in client.run_lookml_test_async.call_args_list]
+
+
+def test_validate_runs_one_call_per_model(client):
+    validator = DataTestValidator(client, "test_project")
+    errors = validator.validate()
+    assert sorted(called_units(client)) == [("model_a", None), ("model_b", None)]
+    assert [error.path for error in errors] == ["model_a/test_one", "model_b/test_two"]
+
+
+def test_validate_runs_one_call_per_test(client):
+    validator = DataTestValidator(client, "test_project", split_by="test")
+    errors = validator.validate()
+    assert sorted(called_units(client)) == [
+        ("model_a", "test_one"),
+        ("model_b", "test_three"),
+        ("model_b", "test_two"),
+    ]
+    assert [error.path for error in errors] == ["model_a/test_one", "model_b/test_two"]
+
+
+def test_validate_runs_all_tests_in_one_call_split_by_project(client):
+    validator = DataTestValidator(client, "test_project", split_by="project")
+    errors = validator.validate()
+    assert called_units(client) == [(None, None)]
+    assert [error.path for error in errors] == ["model_a/test_one", "model_b/test_two"]
+
+
+def test_validate_fail_fast_stops_starting_calls_after_first_failure(client):
+    validator = DataTestValidator(client, "test_project", concurrency=1)
+    errors = validator.validate(fail_fast=True)
+    assert called_units(client) == [("model_a", None)]
+    assert [error.path for error in errors] == ["model_a/test_one"]
+    assert validator.halted
+
+
+def test_validate_fetches_tests_off_the_event_loop(client):
+    threads = []
+
+    def all_lookml_tests(project):
+        threads.append(threading.get_ident())
+        return []
+
+    client.all_lookml_tests.side_effect = all_lookml_tests
+    DataTestValidator(client, "test_project").validate()
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_unknown_split_should_raise():
+    with pytest.raises(SpectaclesException):
+        DataTestValidator(Mock(spec=LookerClient), "test_project", split_by="view")
+
+
+def test_select_runs_partly_selected_models_one_call_per_test(client):
+    validator = DataTestValidator(client, "test_project")
+    validator.select(["model_a/*", "model_b/test_two"])
+    errors = validator.validate()
+    assert sorted(called_units(client)) == [("model_a", None), ("model_b", "test_two")]
+    assert [error.path for error in errors] == ["model_a/test_one", "model_b/test_two"]
+
+
+def test_invalid_selector_should_raise(client):
+    validator = DataTestValidator(client, "test_project")
+    with pytest.raises(SpectaclesException):
+        validator.select(["model_a"])
+
+
+def test_skip_unchanged_skips_tests_that_passed_with_same_inputs(client):
+    validator = DataTestValidator(client, "test_project")
+    validator.skip_unchanged({}, "abc123")
+    validator.validate()
+    assert validator.passed == {"model_b/test_three"}
+
+    rerun = DataTestValidator(client, "test_project")
+    passed = {"model_b/test_three": validator.fingerprints["model_b/test_three"]}
+    rerun.skip_unchanged(passed, "abc123")
+    assert sorted(test["name"] for test in rerun.tests) == ["test_one", "test_two"]
+
+    moved = DataTestValidator(client, "test_project")
+    moved.skip_unchanged(passed, "def456")
+    assert len(moved.tests) == 3
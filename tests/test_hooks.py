@@ -0,0 +1,144 @@
+import sys
+import asyncio
+from unittest.mock import Mock
+import pytest
+from spectacles.hooks import Hooks, hooks as global_hooks, load_hooks
+from spectacles.lookml import Project, Model, Explore, Dimension
+from spectacles.client import LookerClient
+from spectacles.queries import QueryTracker
+from spectacles.validators import SqlValidator
+from spectacles.exceptions import SpectaclesException, SqlError
+
+
+@pytest.fixture
+def registry():
+    return Hooks()
+
+
+@pytest.fixture
+def validator(monkeypatch):
+    monkeypatch.setattr(LookerClient, "authenticate", Mock())
+    client = LookerClient("https://test.looker.com", "client_id", "client_secret")
+    validator = SqlValidator(client=client, project="test_project")
+    dimensions = [
+        Dimension("test_view.dimension_one", "number", "${TABLE}.one", None),
+        Dimension("test_view.dimension_two", "number", "${TABLE}.two", None),
+    ]
+    explore = Explore("test_explore", dimensions)
+    validator.project = Project(
+        "test_project", [Model("test_model", "test_project", [explore])]
+    )
+    return validator
+
+
+def test_register_calls_back_in_order(registry):
+    calls = []
+    registry.register("on_explore_done", lambda *args: calls.append(("first", args)))
+
+    @registry.register("on_explore_done")
+    def second(*args):
+        calls.append(("second", args))
+
+    assert registry.active("on_explore_done")
+    assert not registry.active("on_run_done")
+    registry.emit("on_explore_done", "model", "explore", "success")
+    registry.emit("on_run_done", None)
+    assert calls == [
+        ("first", ("model", "explore", "success")),
+        ("second", ("model", "explore", "success")),
+    ]
+
+    registry.unregister("on_explore_done", second)
+    registry.clear()
+    assert not registry.active("on_explore_done")
+
+
+def test_register_unknown_event_raises(registry):
+    with pytest.raises(SpectaclesException):
+        registry.register("on_everything", print)
+
+
+def test_failing_callback_doesnt_stop_the_others(registry):
+    calls = []
+
+    @registry.register("on_run_done")
+    def broken(validator):
+        raise ValueError("Oops")
+
+    registry.register("on_run_done", calls.append)
+    registry.emit("on_run_done", "validator")
+    assert calls == ["validator"]
+
+
+def test_load_hooks_imports_modules_from_the_working_directory(tmp_path, monkeypatch):
+    module = (
+        "from spectacles.hooks import hooks\nhooks.register('on_run_done', print)\n"
+    )
+    (tmp_path / "my_hooks.py").write_text(module)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    try:
+        load_hooks(["my_hooks"])
+        assert global_hooks.active("on_run_done")
+    finally:
+        global_hooks.clear()
+        sys.modules.pop("my_hooks", None)
+    with pytest.raises(SpectaclesException):
+        load_hooks(["no_such_hooks"])
+
+
+@pytest.mark.asyncio
+async def test_query_tracker_emits_each_step_of_a_query():
+    events = []
+    global_hooks.register("on_query_created", lambda q: events.append(q.state))
+    global_hooks.register("on_slot_wait", lambda q, seconds: events.append("wait"))
+    global_hooks.register(
+        "on_query_transition", lambda q, previous: events.append((previous, q.state))
+    )
+    try:
+        tracker = QueryTracker(asyncio.BoundedSemaphore(1))
+        query = tracker.create(Explore("explore", []), "model", "explore", [])
+        await tracker.dispatch(query)
+        tracker.start(query, "query_task")
+        tracker.transition(query, "complete")
+    finally:
+        global_hooks.clear()
+    assert events == [
+        "created",
+        "wait",
+        ("created", "dispatched"),
+        ("dispatched", "running"),
+        ("running", "complete"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_validator_emits_results_explores_and_run_done(validator):
+    model = validator.project.models[0]
+    explore = model.explores[0]
+    events = []
+
+    async def run(mode, fail_fast, deadline):
+        explore.error = SqlError(path=explore.name, message="Batch error", sql=None)
+        validator._publish(model.name, explore.name, explore)
+        for dimension in explore.dimensions:
+            dimension.queried = True
+            validator._publish(model.name, explore.name, dimension)
+
+    validator._run = run
+    global_hooks.register(
+        "on_query_result", lambda result: events.append(("result", result.path))
+    )
+    global_hooks.register("on_explore_done", lambda *args: events.append(args))
+    global_hooks.register("on_run_done", lambda v: events.append(("done", v)))
+    try:
+        await validator.run("hybrid")
+    finally:
+        global_hooks.clear()
+    assert events == [
+        ("result", "test_explore"),
+        ("result", "test_view.dimension_one"),
+        ("result", "test_view.dimension_two"),
+        ("test_model", "test_explore", "error"),
+        ("done", validator),
+    ]
@@ -0,0 +1,124 @@
+from unittest.mock import Mock
+import pytest
+from spectacles.incremental import (
+    snapshot_explore,
+    compare_snapshots,
+    snapshot_branch,
+    load_snapshots,
+    save_snapshots,
+    fingerprint_data_test,
+    load_passed_tests,
+    save_passed_tests,
+)
+
+
+def explore_json(dimensions, joins=None, sql_table_name="schema.table"):
+    return {
+        "sql_table_name": sql_table_name,
+        "fields": {
+            "dimensions": [{"name": name, "sql": sql} for name, sql in dimensions]
+        },
+        "joins": joins or [],
+    }
+
+
+@pytest.fixture
+def base():
+    return snapshot_explore(
+        explore_json(
+            [("view.dimension_one", "${TABLE}.one"), ("view.dimension_two", "2")],
+            joins=[{"name": "other_view", "sql_on": "a = b"}],
+        )
+    )
+
+
+def test_unchanged_explore_has_no_reasons(base):
+    assert compare_snapshots(base, base) == []
+
+
+def test_new_explore_is_changed(base):
+    assert compare_snapshots(None, base) == ["new explore"]
+
+
+def test_changed_and_removed_dimensions_are_reasons(base):
+    head = snapshot_explore(
+        explore_json(
+            [("view.dimension_one", "${TABLE}.uno"), ("view.dimension_three", "3")],
+            joins=[{"name": "other_view", "sql_on": "a = b"}],
+        )
+    )
+    assert compare_snapshots(base, head) == [
+        "2 new or changed dimensions",
+        "1 removed dimension",
+    ]
+
+
+def test_changed_joins_are_a_reason(base):
+    head = snapshot_explore(
+        explore_json(
+            [("view.dimension_one", "${TABLE}.one"), ("view.dimension_two", "2")],
+            joins=[{"name": "other_view", "sql_on": "a = c"}],
+        )
+    )
+    assert compare_snapshots(base, head) == ["changed joins"]
+
+
+def test_snapshot_branch_skips_unselected_and_other_projects():
+    client = Mock()
+    client.get_lookml_models.return_value = [
+        {
+            "name": "model_one",
+            "project_name": "test_project",
+            "explores": [{"name": "explore_one"}, {"name": "explore_two"}],
+        },
+        {
+            "name": "model_two",
+            "project_name": "other_project",
+            "explores": [{"name": "explore_one"}],
+        },
+    ]
+    client.get_lookml_explore.return_value = explore_json([])
+    snapshots = snapshot_branch(
+        client, "test_project", {"model_one": {"explore_two", "explore_new"}}
+    )
+    assert list(snapshots) == ["model_one/explore_two"]
+
+
+def test_cached_snapshots_only_apply_to_the_same_selectors(tmp_path, base):
+    path = tmp_path / "cache" / "test_project-abc123.json"
+    assert load_snapshots(path, ["*/*"]) is None
+    save_snapshots(path, ["*/*"], {"model/explore": base})
+    assert load_snapshots(path, ["*/*"]) == {"model/explore": base}
+    assert load_snapshots(path, ["model/*"]) is None
+
+
+def test_data_test_fingerprint_changes_with_any_input():
+    test = {"name": "test", "model_name": "model", "expression": "${x} > 0"}
+    explore = explore_json([("view.dimension_one", "${TABLE}.one")])
+    fingerprint = fingerprint_data_test(test, explore, "abc123")
+    assert fingerprint == fingerprint_data_test(dict(test), explore, "abc123")
+    assert fingerprint != fingerprint_data_test(test, explore, "def456")
+    assert fingerprint != fingerprint_data_test(
+        {**test, "expression": "1"}, explore, "abc123"
+    )
+    changed = {**explore, "sql_table_name": "schema.other"}
+    assert fingerprint != fingerprint_data_test(test, changed, "abc123")
+
+
+def test_data_test_fingerprint_changes_when_only_a_measure_changes():
+    test = {"name": "test", "model_name": "model", "expression": "${x} > 0"}
+    explore = explore_json([("view.dimension_one", "${TABLE}.one")])
+    before = {**explore, "fields": {**explore["fields"], "measures": []}}
+    measure = {"name": "view.total", "sql": "${TABLE}.amount", "type": "sum"}
+    after = {**explore, "fields": {**explore["fields"], "measures": [measure]}}
+    assert snapshot_explore(before) == snapshot_explore(after)
+    assert fingerprint_data_test(test, before, "abc123") != fingerprint_data_test(
+        test, after, "abc123"
+    )
+
+
+def test_passed_tests_round_trip(tmp_path):
+    path = tmp_path / "cache" / "project-data-tests.json"
+    assert load_passed_tests(path) == {}
+    save_passed_tests(path, {"model/test": "abc"})
+    assert load_passed_tests(path) == {"model/test": "abc"}
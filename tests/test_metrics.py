@@ -0,0 +1,112 @@
+import asyncio
+import urllib.request
+import pytest
+from spectacles.lookml import Explore
+from spectacles.queries import QueryTracker
+from spectacles.client import record_retry, record_response
+from spectacles.metrics import (
+    Registry,
+    metrics as global_metrics,
+    QUERIES,
+    QUERY_DURATION,
+    QUERY_SLOTS_IN_USE,
+    API_RETRIES,
+    API_RESPONSES,
+    POLLS,
+)
+
+
+@pytest.fixture
+def registry():
+    registry = Registry()
+    registry.start()
+    return registry
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry()
+    counter = registry.counter("spectacles_things_total", "Things.")
+    counter.inc()
+    assert counter.values == {}
+
+
+def test_render_counters_and_gauges_with_labels(registry):
+    counter = registry.counter("spectacles_things_total", "Things.", ["kind"])
+    gauge = registry.gauge("spectacles_level", "Level.")
+    counter.inc(kind="b")
+    counter.inc(2, kind='a"')
+    gauge.set(3)
+    assert registry.render() == (
+        "# HELP spectacles_things_total Things.\n"
+        "# TYPE spectacles_things_total counter\n"
+        'spectacles_things_total{kind="a\\""} 2\n'
+        'spectacles_things_total{kind="b"} 1\n'
+        "# HELP spectacles_level Level.\n"
+        "# TYPE spectacles_level gauge\n"
+        "spectacles_level 3\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram("spectacles_seconds", "Seconds.", ["explore"])
+    histogram.buckets = (1, 10)
+    histogram.observe(0.5, explore="e")
+    histogram.observe(5, explore="e")
+    histogram.observe(50, explore="e")
+    assert registry.render().splitlines()[2:] == [
+        'spectacles_seconds_bucket{explore="e",le="1"} 1',
+        'spectacles_seconds_bucket{explore="e",le="10"} 2',
+        'spectacles_seconds_bucket{explore="e",le="+Inf"} 3',
+        'spectacles_seconds_sum{explore="e"} 55.5',
+        'spectacles_seconds_count{explore="e"} 3',
+    ]
+
+
+def test_write_replaces_the_file(registry, tmp_path):
+    registry.counter("spectacles_things_total", "Things.").inc()
+    path = tmp_path / "spectacles.prom"
+    path.write_text("stale")
+    registry.write(str(path))
+    assert path.read_text() == registry.render()
+    assert [file.name for file in tmp_path.iterdir()] == ["spectacles.prom"]
+
+
+def test_serve_exposes_metrics_over_http(registry):
+    registry.counter("spectacles_things_total", "Things.").inc()
+    registry.serve(0)
+    try:
+        port = registry._server.server_address[1]
+        with urllib.request.urlopen(f"http://localhost:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+    finally:
+        registry.stop()
+    assert "spectacles_things_total 1" in body
+
+
+@pytest.mark.asyncio
+async def test_query_tracker_records_query_metrics():
+    global_metrics.start()
+    try:
+        tracker = QueryTracker(asyncio.BoundedSemaphore(1))
+        query = tracker.create(Explore("explore", []), "model", "explore", [])
+        await tracker.dispatch(query)
+        assert QUERY_SLOTS_IN_USE.values == {(): 1}
+        tracker.start(query, "query_task")
+        tracker.transition(query, "complete")
+        record_retry({"target": tracker.create, "tries": 1, "wait": 0.5})
+        record_response(
+            "GET", "https://test.looker.com/api/3.1/query_tasks/multi_results", 200
+        )
+    finally:
+        global_metrics.stop()
+    assert QUERIES.values == {
+        ("created",): 1,
+        ("dispatched",): 1,
+        ("running",): 1,
+        ("complete",): 1,
+    }
+    assert QUERY_SLOTS_IN_USE.values == {(): 0}
+    assert QUERY_DURATION.counts[("model", "explore")][-1] == 1
+    assert API_RETRIES.values == {("create",): 1}
+    assert API_RESPONSES.values == {("200",): 1}
+    assert POLLS.values == {(): 1}
@@ -0,0 +1,148 @@
+import os
+import signal
+from urllib.parse import urlsplit
+import pytest
+from spectacles.work_queue import WorkQueue
+from spectacles.exceptions import SpectaclesException
+from spectacles.client import LookerClient
+from spectacles.validators import SqlValidator
+from spectacles.runner import Runner
+from spectacles.hooks import hooks
+from benchmarks.mock_looker import MockLooker, MockLookerServer, PROJECT
+from benchmarks.run import compare
+
+OPTIONS = dict(
+    explores=2, dimensions=5, latency=0, runtime=0.01, error_rate=0.2, seed=1
+)
+
+
+@pytest.mark.asyncio
+async def test_validator_finds_the_broken_dimensions_of_the_mock_looker():
+    broken = MockLooker(**OPTIONS).broken
+    with MockLookerServer(throttle_rate=0.2, **OPTIONS) as server:
+        client = LookerClient(
+            server.base_url, "client_id", "client_secret", port=server.port
+        )
+        validator = SqlValidator(client, PROJECT, concurrency=4)
+        validator.build_project(["*/*"])
+        errors = await validator.run("hybrid")
+    assert len(broken) == 2
+    assert sorted(error.path for error in errors) == sorted(broken)
+    assert all(error.line_number for error in errors)
+
+
+def test_compare_reports_regressions_beyond_the_tolerances():
+    before = {"dimensions": 100, "mode": "batch", "api_calls": 100}
+    baseline = [{**before, "seconds": 10, "peak_rss_mib": 50}]
+    cases = [{**before, "seconds": 13, "peak_rss_mib": 51}]
+    assert compare(cases, baseline, tolerance=0.25) == [
+        "batch mode at 100 dimensions: seconds went from 10.00 to 13.00"
+    ]
+    assert compare(cases, baseline, tolerance=0.5) == []
+    cases[0]["api_calls"] = 110
+    assert compare(cases, baseline, tolerance=0.5) == [
+        "batch mode at 100 dimensions: api_calls went from 100 to 110"
+    ]
+    assert compare(cases, baseline, tolerance=0.5, calls_tolerance=0.1) == []
+
+
+def test_runner_validates_several_instances_end_to_end():
+    broken = MockLooker(**OPTIONS).broken
+    with MockLookerServer(**OPTIONS) as first, MockLookerServer(**OPTIONS) as second:
+        instances = [
+            {
+                "name": name,
+                "base_url": server.base_url,
+                "port": server.port,
+                "client_id": "client_id",
+                "client_secret": "client_secret",
+            }
+            for name, server in (("first", first), ("second", second))
+        ]
+        results = Runner.validate_sql_instances(
+            instances, PROJECT, "dev-branch", ["*/*"], "hybrid", concurrency=4
+        )
+    assert list(results) == ["first", "second"]
+    for result in results.values():
+        assert sorted(error["path"] for error in result["errors"]) == sorted(broken)
+
+
+def test_interrupting_several_instances_cancels_their_running_queries():
+    options = {**OPTIONS, "runtime": 60}
+    started = set()
+    cancelled = []
+
+    @hooks.register("on_request")
+    def interrupt(method, url, status):
+        url = urlsplit(url)
+        if len(started) < 2 and method == "POST" and url.path.endswith("query_tasks"):
+            # Once both instances are running queries
+            started.add(url.port)
+            if len(started) == 2:
+                os.kill(os.getpid(), signal.SIGINT)
+        elif method == "DELETE":
+            cancelled.append(url.port)
+
+    try:
+        with MockLookerServer(**options) as first, MockLookerServer(
+            **options
+        ) as second:
+            instances = [
+                {
+                    "name": name,
+                    "base_url": server.base_url,
+                    "port": server.port,
+                    "client_id": "client_id",
+                    "client_secret": "client_secret",
+                }
+                for name, server in (("first", first), ("second", second))
+            ]
+            with pytest.raises(SpectaclesException):
+                Runner.validate_sql_instances(
+                    instances, PROJECT, "dev-branch", ["*/*"], "batch", concurrency=4
+                )
+    finally:
+        hooks.clear()
+    assert set(cancelled) == {first.port, second.port}
+
+
+@pytest.mark.parametrize("mode", ["batch", "single"])
+def test_worker_tests_every_item_in_the_queue(mode, tmp_path):
+    broken = MockLooker(**OPTIONS).broken
+    work_queue = WorkQueue(str(tmp_path / "work.db"))
+    with MockLookerServer(**OPTIONS) as server:
+        client = LookerClient(
+            server.base_url, "client_id", "client_secret", port=server.port
+        )
+        coordinator = SqlValidator(client, PROJECT)
+        coordinator.build_project(["*/*"])
+        work_queue.fill(PROJECT, "dev", mode, coordinator.get_work_items(mode))
+        # Fewer slots than items, so items are claimed as others finish
+        worker = SqlValidator(client, PROJECT, concurrency=3)
+        completed = worker.work(work_queue, "worker", "dev", poll_interval=0.01)
+    results = work_queue.results()
+    work_queue.close()
+    assert completed == len(results) == (2 if mode == "batch" else 10)
+    errored = [
+        dimension["name"]
+        for item, result in results
+        if result["status"] == "error"
+        for dimension in item["dimensions"]
+    ]
+    assert set(broken) <= set(errored)
+    assert len(errored) == (5 if mode == "batch" else 2)
+
+
+def test_coordinator_gives_up_when_no_workers_show_up(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / "work.db"))
+    with MockLookerServer(**OPTIONS) as server:
+        client = LookerClient(
+            server.base_url, "client_id", "client_secret", port=server.port
+        )
+        coordinator = SqlValidator(client, PROJECT)
+        coordinator.build_project(["*/*"])
+        with pytest.raises(SpectaclesException):
+            coordinator.coordinate(
+                work_queue, "dev", "batch", poll_interval=0.01, stall_timeout=0.05
+            )
+    work_queue.close()
@@ -0,0 +1,66 @@
+import time
+import asyncio
+import pstats
+import tracemalloc
+from unittest.mock import patch
+import pytest
+from spectacles.profiling import (
+    Profiler,
+    _where,
+    PROFILE_FILENAME,
+    TASKS_FILENAME,
+    MEMORY_FILENAME,
+)
+
+
+async def wait_a_bit():
+    await asyncio.sleep(0.05)
+
+
+def test_profiler_writes_profiles_to_the_directory(tmp_path):
+    default_loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    profiler = Profiler(str(tmp_path), interval=0.001)
+    profiler.start()
+    try:
+        loop.run_until_complete(asyncio.gather(wait_a_bit(), wait_a_bit()))
+        data = [str(number) for number in range(10000)]
+    finally:
+        profiler.stop()
+        loop.close()
+        asyncio.set_event_loop(default_loop)
+
+    assert data
+    assert not tracemalloc.is_tracing()
+    assert profiler.samples > 0
+    assert any("wait_a_bit" in name for name in profiler.tasks)
+    stats = pstats.Stats(str(tmp_path / PROFILE_FILENAME))
+    assert any(function == "wait_a_bit" for _, _, function in stats.stats)
+    assert "wait_a_bit" in (tmp_path / TASKS_FILENAME).read_text()
+    snapshot = tracemalloc.Snapshot.load(str(tmp_path / MEMORY_FILENAME))
+    assert snapshot.statistics("lineno")
+    profiler.print_summary()
+
+
+def test_profiler_samples_a_bounded_number_of_tasks(tmp_path):
+    default_loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    profiler = Profiler(str(tmp_path), max_tasks=10)
+    profiler._loop = loop
+    tasks = [loop.create_task(wait_a_bit()) for _ in range(100)]
+    try:
+        profiler._last_sample = time.monotonic() - 1
+        with patch("spectacles.profiling._where", wraps=_where) as where:
+            profiler._sample()
+        loop.run_until_complete(asyncio.gather(*tasks))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(default_loop)
+
+    assert where.call_count == 10
+    # The sampled tasks stand in for all 100, each for the second since the last
+    (name, seconds), = profiler._task_timings()
+    assert "wait_a_bit" in name
+    assert seconds == pytest.approx(100, rel=0.01)
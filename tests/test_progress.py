@@ -0,0 +1,44 @@
+import io
+import asyncio
+from spectacles.lookml import Explore
+from spectacles.queries import QueryTracker
+from spectacles.progress import StatusLine
+
+
+class FakeTerminal(io.StringIO):
+    def isatty(self):
+        return True
+
+
+def make_tracker():
+    tracker = QueryTracker(asyncio.BoundedSemaphore(2))
+    explore = Explore("explore", [])
+    for _ in range(4):
+        tracker.create(explore, "model", "explore", ["view.dimension"])
+    return tracker
+
+
+def test_status_line_is_disabled_when_not_a_terminal():
+    stream = io.StringIO()
+    status_line = StatusLine(make_tracker(), stream=stream)
+    assert not status_line.enabled
+    status_line.draw()
+    assert stream.getvalue() == ""
+
+
+def test_status_line_shows_counts_and_clears_itself():
+    stream = FakeTerminal()
+    tracker = make_tracker()
+    tracker.counts["created"] -= 3
+    tracker.counts["running"] += 1
+    tracker.counts["complete"] += 2
+    status_line = StatusLine(tracker, stream=stream)
+    status_line.started -= 2
+    status_line.done = 2
+    status_line.draw()
+    assert stream.getvalue() == (
+        "\r\033[K1 running, 1 queued, 2 done | 1.0 queries/s | ETA 00:00:02"
+    )
+    status_line.clear()
+    assert stream.getvalue().endswith("\r\033[K")
+    assert not status_line.drawn
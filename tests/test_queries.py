@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from spectacles.lookml import Explore
+from spectacles.queries import QueryTracker
+from spectacles.exceptions import SpectaclesException
+
+
+@pytest.fixture
+def tracker():
+    return QueryTracker(asyncio.BoundedSemaphore(1))
+
+
+@pytest.fixture
+def query(tracker):
+    return tracker.create(Explore("test_explore"), "test_model", "test_explore", [])
+
+
+def test_create_counts_query_as_created(tracker, query):
+    assert query.state == "created"
+    assert tracker.counts["created"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_and_complete_releases_slot(tracker, query):
+    await tracker.dispatch(query)
+    assert tracker.query_slots.locked()
+    tracker.start(query, "query_task_a")
+    assert tracker.get("query_task_a") is query
+    assert tracker.holding_slots() == 1
+    tracker.transition(query, "complete")
+    assert not tracker.query_slots.locked()
+    assert tracker.holding_slots() == 0
+    assert tracker.counts["complete"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_query_keeps_slot_when_restarted(tracker, query):
+    await tracker.dispatch(query)
+    tracker.start(query, "query_task_a")
+    tracker.transition(query, "expired")
+    assert tracker.query_slots.locked()
+    tracker.start(query, "query_task_b")
+    assert query.state == "running"
+    assert tracker.holding() == [query]
+
+
+def test_invalid_transition_raises(tracker, query):
+    with pytest.raises(SpectaclesException):
+        tracker.transition(query, "complete")
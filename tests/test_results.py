@@ -0,0 +1,109 @@
+import pytest
+from spectacles.results import (
+    write_results,
+    load_results,
+    load_timings,
+    load_failures,
+    compare_results,
+    merge_results,
+)
+from spectacles.exceptions import SpectaclesException
+
+
+def make_results(shard, explore, status="success", errors=None):
+    return {
+        "project": "test_project",
+        "shard": shard,
+        "explores": [
+            {
+                "model": "test_model",
+                "explore": explore,
+                "status": status,
+                "duration": 1.5,
+            }
+        ],
+        "errors": errors or [],
+    }
+
+
+def test_write_and_load_results(tmp_path):
+    path = str(tmp_path / "results.json")
+    results = make_results("1/2", "test_explore_one")
+    write_results(
+        path, "test_project", results["explores"], results["errors"], shard="1/2"
+    )
+    assert load_results(path) == results
+    assert load_timings(path) == {"test_model/test_explore_one": 1.5}
+
+
+def test_load_results_missing_file_raises(tmp_path):
+    with pytest.raises(SpectaclesException):
+        load_results(str(tmp_path / "missing.json"))
+
+
+def test_merge_results_combines_shards():
+    error = {"path": "test_explore_two", "message": "An error."}
+    merged = merge_results(
+        [
+            make_results("2/2", "test_explore_two", "error", [error]),
+            make_results("1/2", "test_explore_one"),
+        ]
+    )
+    assert [explore["explore"] for explore in merged["explores"]] == [
+        "test_explore_one",
+        "test_explore_two",
+    ]
+    assert merged["errors"] == [error]
+    assert merged["shard"] is None
+
+
+def test_merge_results_missing_shard_raises():
+    with pytest.raises(SpectaclesException, match="Missing shards: 2"):
+        merge_results(
+            [make_results("1/3", "test_explore_one"), make_results("3/3", "other")]
+        )
+
+
+def test_load_failures_keeps_errored_explores_and_dimensions(tmp_path):
+    path = str(tmp_path / "results.json")
+    explores = [
+        {
+            "model": "test_model",
+            "explore": "test_explore_one",
+            "status": "error",
+            "duration": 1.5,
+            "errored_dimensions": ["test_view.dimension_one"],
+        },
+        {
+            "model": "test_model",
+            "explore": "test_explore_two",
+            "status": "success",
+            "duration": 1.5,
+            "errored_dimensions": [],
+        },
+    ]
+    write_results(path, "test_project", explores, [])
+    assert load_failures(path) == {
+        "test_model/test_explore_one": ["test_view.dimension_one"]
+    }
+
+
+def test_compare_results_lines_up_statuses():
+    rows = compare_results(
+        {
+            "staging": make_results(None, "test_explore_one", "error"),
+            "production": make_results(None, "test_explore_two"),
+        }
+    )
+    assert rows == [
+        {
+            "model": "test_model",
+            "explore": "test_explore_one",
+            "statuses": {"staging": "error", "production": "missing"},
+        },
+        {
+            "model": "test_model",
+            "explore": "test_explore_two",
+            "statuses": {"staging": "missing", "production": "success"},
+        },
+    ]
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from spectacles.slot_pool import SlotPool, SharedQuerySlots
+
+
+def test_slots_are_shared_between_pools_in_the_same_directory(tmp_path):
+    first = SlotPool(str(tmp_path), size=2)
+    second = SlotPool(str(tmp_path), size=2)
+    assert first.try_acquire()
+    assert second.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+
+
+def test_later_pools_keep_the_recorded_size(tmp_path):
+    SlotPool(str(tmp_path), size=1)
+    assert SlotPool(str(tmp_path), size=5).size == 1
+
+
+def test_release_without_acquire_raises(tmp_path):
+    with pytest.raises(ValueError):
+        SlotPool(str(tmp_path), size=1).release()
+
+
+@pytest.mark.asyncio
+async def test_shared_slots_wait_for_the_pool(tmp_path):
+    other = SlotPool(str(tmp_path), size=1)
+    assert other.try_acquire()
+    slots = SharedQuerySlots(
+        asyncio.BoundedSemaphore(2), SlotPool(str(tmp_path), 1, poll_interval=0.01)
+    )
+    acquire = asyncio.ensure_future(slots.acquire())
+    await asyncio.sleep(0.05)
+    assert not acquire.done()
+    other.release()
+    await asyncio.wait_for(acquire, timeout=1)
+    assert len(slots.pool.held) == 1
+    slots.release()
+    assert slots.pool.held == []
+    assert not slots.local_slots.locked()
@@ -1,11 +1,18 @@
 from pathlib import Path
+import io
 import json
+import asyncio
 from unittest.mock import patch, Mock
 import pytest
 import asynctest
+import aiohttp
 from spectacles.lookml import Project, Model, Explore, Dimension
 from spectacles.client import LookerClient
 from spectacles.validators import SqlValidator
+from spectacles.checkpoint import Checkpoint
+from spectacles.writers import NdjsonWriter
+from spectacles.work_queue import WorkQueue
+from spectacles.exceptions import SqlError, QueryTimeoutError, SpectaclesException
 
 TEST_BASE_URL = "https://test.looker.com"
 TEST_CLIENT_ID = "test_client_id"
@@ -26,6 +33,17 @@ def client(monkeypatch):
     return LookerClient(TEST_BASE_URL, TEST_CLIENT_ID, TEST_CLIENT_SECRET)
 
 
+async def start_query(validator, query_task_id, lookml_object):
+    """Helper to register a running query task for a LookML object."""
+    query = validator.queries.create(
+        lookml_object, "test_model", "test_explore", [lookml_object.name]
+    )
+    await validator.queries.dispatch(query)
+    validator.queries.start(query, query_task_id)
+    await validator.running_query_tasks.put(query_task_id)
+    return query
+
+
 @pytest.fixture
 def validator(client):
     return SqlValidator(client=client, project="test_project")
@@ -75,10 +93,9 @@ def test_build_project(mock_get_models, mock_get_dimensions, project, validator)
 @pytest.mark.asyncio
 @asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
 async def test_get_query_results_task_running(
-    mock_get_query_task_multi_results, validator
+    mock_get_query_task_multi_results, validator, project
 ):
-    await validator.query_slots.acquire()
-    await validator.running_query_tasks.put("query_task_a")
+    await start_query(validator, "query_task_a", project.models[0].explores[0])
     mock_response = {"status": "running"}
     mock_get_query_task_multi_results.return_value = {"query_task_a": mock_response}
     errors = validator._get_query_results(["query_task_a"])
@@ -90,10 +107,8 @@ async def test_get_query_results_task_running(
 async def test_get_query_results_task_complete(
     mock_get_query_task_multi_results, validator, project
 ):
-    await validator.query_slots.acquire()
-    await validator.running_query_tasks.put("query_task_a")
     lookml_object = project.models[0].explores[0]
-    validator.query_tasks = {"query_task_a": lookml_object}
+    await start_query(validator, "query_task_a", lookml_object)
     mock_response = {"status": "complete"}
     mock_get_query_task_multi_results.return_value = {"query_task_a": mock_response}
     errors = validator._get_query_results(["query_task_a"])
@@ -165,3 +180,515 @@ def test_extract_error_details_error_loc_wo_line(validator):
     extracted = validator._extract_error_details(query_result)
     assert extracted["message"] == message
     assert extracted["sql"] == sql
+
+
+@pytest.mark.parametrize(
+    "message,expected",
+    [
+        ('relation "analytics.orders" does not exist', "missing_relation"),
+        (
+            "SQL compilation error: Object 'DB.ANALYTICS.ORDERS' does not exist "
+            "or not authorized.",
+            "missing_relation",
+        ),
+        (
+            "Not found: Table my-project:analytics.orders was not found "
+            "in location US",
+            "missing_relation",
+        ),
+        ("Invalid object name 'analytics.orders'.", "missing_relation"),
+        ('schema "analytics" does not exist', "missing_schema"),
+        ('column "orders.amount" does not exist', None),
+        ("SQL compilation error: invalid identifier 'AMOUNT'", None),
+    ],
+)
+def test_classify_root_cause(message, expected, validator):
+    assert validator._classify_root_cause(message) == expected
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.create_query")
+async def test_query_dimension_skipped_after_view_error(
+    mock_create_query, validator, project
+):
+    model = project.models[0]
+    explore = model.explores[0]
+    dimension = explore.dimensions[1]
+    validator.root_causes["test_view"] = SqlError(
+        path="test_view.dimension_one",
+        message='relation "analytics.test_view" does not exist',
+        sql="SELECT 1",
+    )
+    query_task_id = await validator._query_dimension(Mock(), model, explore, dimension)
+    assert query_task_id is None
+    mock_create_query.assert_not_called()
+    assert dimension.errored
+    assert validator.skipped_dimensions["test_view"] == [dimension]
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
+async def test_get_query_results_clusters_view_errors(
+    mock_get_query_task_multi_results, validator, project
+):
+    dimensions = project.models[0].explores[0].dimensions
+    for query_task_id, dimension in zip(("query_task_a", "query_task_b"), dimensions):
+        await start_query(validator, query_task_id, dimension)
+    mock_response = {
+        "status": "error",
+        "data": {
+            "errors": [{"message": 'relation "analytics.test_view" does not exist'}],
+            "sql": "SELECT test_view.one FROM analytics.test_view AS test_view",
+        },
+    }
+    mock_get_query_task_multi_results.return_value = {
+        "query_task_a": mock_response,
+        "query_task_b": mock_response,
+    }
+    errors = await validator._get_query_results(Mock())
+    assert len(errors) == 1
+    assert validator.root_causes["test_view"] is errors[0]
+    assert dimensions[1].error is errors[0]
+    validator._annotate_root_causes()
+    assert "1 other dimension in view 'test_view' was skipped" in errors[0].message
+
+
+@pytest.mark.asyncio
+async def test_report_holds_back_root_causes_until_the_skipped_count_is_known(
+    validator, project
+):
+    validator.project = project
+    model = project.models[0]
+    explore = model.explores[0]
+    first, second = explore.dimensions
+    root_cause = SqlError(
+        path=first.name,
+        message='relation "analytics.test_view" does not exist',
+        sql="SELECT test_view.one FROM analytics.test_view AS test_view",
+    )
+
+    async def run(mode, fail_fast, deadline):
+        for dimension in explore.dimensions:
+            dimension.queried = True
+            dimension.error = root_cause
+        validator.root_causes["test_view"] = root_cause
+        validator._publish(model.name, explore.name, first)
+        validator.skipped_dimensions["test_view"].append(second)
+        validator._publish(model.name, explore.name, second)
+        # Let the results be reported before the run ends
+        await asyncio.sleep(0.01)
+        validator._annotate_root_causes()
+
+    validator._run = run
+    file = io.StringIO()
+    with patch("spectacles.printer.print_sql_error") as mock_print_sql_error:
+        errors = await validator._report("single", False, None, NdjsonWriter(file))
+    assert errors == [root_cause]
+    note = "(1 other dimension in view 'test_view' was skipped"
+    mock_print_sql_error.assert_called_once()
+    assert note in mock_print_sql_error.call_args[0][0]["message"]
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert [record["path"] for record in records] == [first.name, second.name]
+    assert all(note in record["message"] for record in records)
+
+
+@pytest.mark.parametrize(
+    "message,sql,expected",
+    [
+        (
+            'relation "analytics.orders" does not exist',
+            'SELECT 1 FROM "analytics"."orders" AS "test_view"',
+            True,
+        ),
+        (
+            "Not found: Table my-project:analytics.orders was not found",
+            "SELECT 1 FROM `my-project.analytics.orders` AS test_view",
+            True,
+        ),
+        (
+            'schema "analytics" does not exist',
+            "SELECT 1 FROM base AS base LEFT JOIN analytics.orders AS test_view",
+            True,
+        ),
+        # The missing table is only used in one dimension's subquery
+        (
+            'relation "analytics.rates" does not exist',
+            "SELECT (SELECT rate FROM analytics.rates) FROM analytics.orders "
+            "AS test_view",
+            False,
+        ),
+        # The missing table belongs to another view
+        (
+            'relation "analytics.orders" does not exist',
+            "SELECT 1 FROM analytics.orders AS orders "
+            "JOIN analytics.users AS test_view",
+            False,
+        ),
+        # A derived table's relation can't be told from the SQL
+        (
+            'relation "analytics.orders" does not exist',
+            "WITH test_view AS (SELECT * FROM analytics.orders) SELECT 1",
+            False,
+        ),
+        ('column "test_view.amount" does not exist', "SELECT 1", False),
+    ],
+)
+def test_is_root_cause_only_for_the_views_own_relation(
+    message, sql, expected, validator
+):
+    assert validator._is_root_cause("test_view", message, sql) is expected
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
+async def test_get_query_results_reports_unrelated_missing_tables_per_dimension(
+    mock_get_query_task_multi_results, validator, project
+):
+    dimensions = project.models[0].explores[0].dimensions
+    for query_task_id, dimension in zip(("query_task_a", "query_task_b"), dimensions):
+        await start_query(validator, query_task_id, dimension)
+    mock_response = {
+        "status": "error",
+        "data": {
+            "errors": [{"message": 'relation "analytics.rates" does not exist'}],
+            "sql": "SELECT (SELECT 1 FROM analytics.rates) "
+            "FROM analytics.test_view AS test_view",
+        },
+    }
+    mock_get_query_task_multi_results.return_value = {
+        "query_task_a": mock_response,
+        "query_task_b": mock_response,
+    }
+    errors = await validator._get_query_results(Mock())
+    assert len(errors) == 2
+    assert not validator.root_causes
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.create_query")
+@asynctest.patch("spectacles.client.LookerClient.cancel_query_task")
+async def test_halt_cancels_running_queries_and_stops_dispatching(
+    mock_cancel_query_task, mock_create_query, validator, project
+):
+    explore = project.models[0].explores[0]
+    query = await start_query(validator, "query_task_a", explore)
+    session = Mock()
+    await validator._halt(session, "Stopping.")
+    mock_cancel_query_task.assert_called_once_with(session, "query_task_a")
+    assert validator.running_query_tasks.empty()
+    assert not validator.query_slots.locked()
+    assert query.state == "cancelled"
+    query = validator.queries.create(
+        explore, "test_model", "test_explore", ["test_view.dimension_one"]
+    )
+    query_task_id = await validator._run_query(session, query)
+    assert query_task_id is None
+    assert query.state == "skipped"
+    mock_create_query.assert_not_called()
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
+@asynctest.patch("spectacles.client.LookerClient.cancel_query_task")
+async def test_check_for_results_halts_after_deadline(
+    mock_cancel_query_task, mock_get_query_task_multi_results, validator, project
+):
+    await start_query(validator, "query_task_a", project.models[0].explores[0])
+    errors = await validator._check_for_results(Mock(), [], deadline=0)
+    assert not errors
+    assert validator.halted
+    mock_cancel_query_task.assert_called_once()
+    mock_get_query_task_multi_results.assert_not_called()
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
+@asynctest.patch("spectacles.client.LookerClient.cancel_query_task")
+async def test_get_query_results_cancels_timed_out_query(
+    mock_cancel_query_task, mock_get_query_task_multi_results, validator, project
+):
+    validator.query_timeout = 5
+    explore = project.models[0].explores[0]
+    query = await start_query(validator, "query_task_a", explore)
+    query.started = asyncio.get_event_loop().time() - 10
+    mock_get_query_task_multi_results.return_value = {
+        "query_task_a": {"status": "running"}
+    }
+    session = Mock()
+    errors = await validator._get_query_results(session)
+    mock_cancel_query_task.assert_called_once_with(session, "query_task_a")
+    assert len(errors) == 1
+    assert isinstance(errors[0], QueryTimeoutError)
+    assert explore.error is errors[0]
+    assert validator.running_query_tasks.empty()
+    assert not validator.query_slots.locked()
+    assert query.state == "timeout"
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.get_query_task_multi_results")
+@asynctest.patch("spectacles.client.LookerClient.create_query_task")
+async def test_get_query_results_resubmits_expired_query(
+    mock_create_query_task, mock_get_query_task_multi_results, validator, project
+):
+    query = await start_query(validator, "query_task_a", project.models[0].explores[0])
+    query.query_id = 1234
+    mock_get_query_task_multi_results.return_value = {
+        "query_task_a": {"status": "expired"}
+    }
+    mock_create_query_task.return_value = "query_task_b"
+    errors = await validator._get_query_results(Mock())
+    assert not errors
+    assert query.state == "running"
+    assert query.query_task_id == "query_task_b"
+    assert await validator.running_query_tasks.get() == "query_task_b"
+    assert validator.queries.holding_slots() == 1
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.create_query")
+@asynctest.patch("spectacles.client.LookerClient.create_query_task")
+async def test_run_query_releases_slot_if_query_task_fails(
+    mock_create_query_task, mock_create_query, validator, project
+):
+    mock_create_query.return_value = 1234
+    mock_create_query_task.side_effect = aiohttp.ClientError
+    explore = project.models[0].explores[0]
+    query = validator.queries.create(explore, "test_model", "test_explore", ["a"])
+    with pytest.raises(aiohttp.ClientError):
+        await validator._run_query(Mock(), query)
+    assert query.state == "error"
+    assert validator.queries.holding_slots() == 0
+    assert not validator.query_slots.locked()
+
+
+def test_select_shard_balances_by_dimension_count(validator, project):
+    project.models[1].explores[0].dimensions = (
+        project.models[1].explores[0].dimensions[:1]
+    )
+    project.models[1].explores.append(
+        Explore("test_explore_three", project.models[0].explores[0].dimensions[:1])
+    )
+    validator.project = project
+    validator.select_shard(2, 2)
+    assert [model.name for model in validator.project.models] == ["test_model.two"]
+    assert [explore.name for explore in validator.project.models[0].explores] == [
+        "test_explore_two",
+        "test_explore_three",
+    ]
+
+
+def test_select_shard_balances_by_timings(validator, project):
+    validator.project = project
+    timings = {
+        "test_model_one/test_explore_one": 1,
+        "test_model.two/test_explore_two": 9,
+    }
+    validator.select_shard(1, 2, timings)
+    assert [model.name for model in validator.project.models] == ["test_model.two"]
+
+
+def test_select_shard_with_invalid_index_raises(validator, project):
+    validator.project = project
+    with pytest.raises(SpectaclesException):
+        validator.select_shard(3, 2)
+
+
+def test_worker_refuses_a_queue_for_another_branch(validator, project, tmp_path):
+    validator.project = project
+    work_queue = WorkQueue(str(tmp_path / "work.db"))
+    work_queue.fill(project.name, "main", "batch", validator.get_work_items("batch"))
+    try:
+        with pytest.raises(SpectaclesException, match="branch 'main'"):
+            validator.work(work_queue, "worker", "dev")
+        assert work_queue.counts()["pending"] == 2
+    finally:
+        work_queue.close()
+
+
+def test_work_items_round_trip(validator, project):
+    validator.project = project
+    items = validator.get_work_items("single")
+    assert len(items) == 4
+    assert items[0]["dimensions"][0]["name"] == "test_view.dimension_one"
+    validator.load_work_items(validator.get_work_items("batch"))
+    assert validator.project == project
+
+
+def test_resume_restores_finished_and_reattaches_running(client, project, tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    entries = [
+        {"project": "test_project"},
+        {
+            "model": "test_model_one",
+            "explore": "test_explore_one",
+            "object": "test_explore_one",
+            "state": "error",
+            "query_id": 1,
+            "query_task_id": "query_task_a",
+            "error": vars(SqlError("test_explore_one", "Oops", "SELECT")),
+        },
+        {
+            "model": "test_model.two",
+            "explore": "test_explore_two",
+            "object": "test_explore_two",
+            "state": "running",
+            "query_id": 2,
+            "query_task_id": "query_task_b",
+            "error": None,
+        },
+        {
+            "model": "test_model.two",
+            "explore": "test_explore_gone",
+            "object": "test_explore_gone",
+            "state": "running",
+            "query_id": 3,
+            "query_task_id": "query_task_c",
+            "error": None,
+        },
+    ]
+    with open(path, "w") as file:
+        file.write("\n".join(json.dumps(entry) for entry in entries) + "\n")
+
+    validator = SqlValidator(
+        client, "test_project", checkpoint=Checkpoint(path, "test_project", True)
+    )
+    validator.project = project
+    validator.resume()
+    assert validator.resumed == {
+        ("test_model_one", "test_explore_one", "test_explore_one"),
+        ("test_model.two", "test_explore_two", "test_explore_two"),
+    }
+    assert [task_id for _, task_id in validator._reattaching] == ["query_task_b"]
+    assert validator._orphaned_task_ids == ["query_task_c"]
+    errors = validator._apply_restored_results()
+    assert [error.message for error in errors] == ["Oops"]
+    assert project.models[0].explores[0].errored
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.create_query")
+async def test_resume_restores_dimensions_skipped_for_a_root_cause(
+    mock_create_query, client, project, tmp_path
+):
+    path = str(tmp_path / "checkpoint.jsonl")
+    validator = SqlValidator(
+        client, "test_project", checkpoint=Checkpoint(path, "test_project")
+    )
+    validator.project = project
+    model = project.models[0]
+    explore = model.explores[0]
+    root_cause = SqlError(
+        path="test_view.dimension_one",
+        message='relation "analytics.test_view" does not exist',
+        sql="SELECT test_view.one FROM analytics.test_view AS test_view",
+    )
+    validator.root_causes["test_view"] = root_cause
+    await validator._query_dimension(Mock(), model, explore, explore.dimensions[1])
+    validator.checkpoint.close()
+    with open(path, "a") as file:
+        entry = {
+            "model": model.name,
+            "explore": explore.name,
+            "object": "test_view.dimension_one",
+            "state": "error",
+            "query_id": 1,
+            "query_task_id": "query_task_a",
+            "error": vars(root_cause),
+        }
+        file.write(json.dumps(entry) + "\n")
+
+    validator = SqlValidator(
+        client, "test_project", checkpoint=Checkpoint(path, "test_project", True)
+    )
+    validator.project = project
+    validator.resume()
+    assert validator.resumed == {
+        (model.name, explore.name, "test_view.dimension_one"),
+        (model.name, explore.name, "test_view.dimension_two"),
+    }
+    assert validator.skipped_dimensions["test_view"] == [explore.dimensions[1]]
+    errors = validator._apply_restored_results()
+    assert [error.path for error in errors] == ["test_view.dimension_one"]
+    assert explore.dimensions[1].error is errors[0]
+
+
+def test_select_dimensions_keeps_failed_dimensions(validator, project):
+    validator.project = project
+    validator.select_dimensions(
+        {
+            "test_model_one/test_explore_one": ["test_view.dimension_two"],
+            "test_model.two/test_explore_two": ["test_view.renamed"],
+        }
+    )
+    explore_one, explore_two = (m.explores[0] for m in project.models)
+    assert [d.name for d in explore_one.dimensions] == ["test_view.dimension_two"]
+    assert len(explore_two.dimensions) == 2
+
+
+def test_select_changed_keeps_changed_explores(validator, project):
+    validator.project = project
+    validator.client = Mock()
+    validator.client.get_lookml_explore.return_value = {
+        "sql_table_name": "schema.table",
+        "fields": {"dimensions": [{"name": "test_view.dimension_one", "sql": "1"}]},
+        "joins": [],
+    }
+    unchanged = {
+        "sql_table_name": "schema.table",
+        "dimensions": {"test_view.dimension_one": "1"},
+        "joins": [],
+    }
+    validator.select_changed({"test_model_one/test_explore_one": unchanged})
+    assert [model.name for model in project.models] == ["test_model.two"]
+
+
+@pytest.mark.asyncio
+@asynctest.patch("spectacles.client.LookerClient.create_query")
+@asynctest.patch("spectacles.client.LookerClient.get_query_sql")
+@asynctest.patch("spectacles.client.LookerClient.create_query_task")
+async def test_run_query_reuses_result_of_identical_sql(
+    mock_create_query_task, mock_get_query_sql, mock_create_query, client, project
+):
+    mock_create_query.return_value = 1234
+    mock_get_query_sql.return_value = "SELECT 1"
+    details = {"message": "Oops", "sql": "SELECT 1", "line_number": 1}
+    validator = SqlValidator(client, "test_project", sql_results={"SELECT 1": details})
+    explore = project.models[0].explores[0]
+    query = validator.queries.create(explore, "test_model", "test_explore", ["a"])
+    assert await validator._run_query(Mock(), query) is None
+    mock_create_query_task.assert_not_called()
+    assert query.state == "reused"
+    assert explore.error.message == "Oops"
+    assert validator._reused_errors == [explore.error]
+
+
+@pytest.mark.asyncio
+async def test_iter_results_yields_results_as_they_are_published(validator, project):
+    validator.project = project
+    model = project.models[0]
+    explore = model.explores[0]
+    dimension_one, dimension_two = explore.dimensions
+
+    async def run(mode, fail_fast, deadline):
+        explore.error = SqlError(path=explore.name, message="Batch error", sql=None)
+        validator._publish(model.name, explore.name, explore)
+        await asyncio.sleep(0)
+        view_error = SqlError(path=dimension_one.name, message="Missing", sql=None)
+        for dimension in (dimension_one, dimension_two):
+            dimension.error = view_error
+            validator._publish(model.name, explore.name, dimension)
+
+    validator._run = run
+    results = [result async for result in validator.iter_results("hybrid")]
+    assert [(r.kind, r.path, r.status) for r in results] == [
+        ("explore", "test_explore_one", "error"),
+        ("dimension", "test_view.dimension_one", "error"),
+        ("dimension", "test_view.dimension_two", "error"),
+    ]
+    assert results[1].url == dimension_one.url
+    assert validator._results is None
+
+    # The batch error is superseded and the shared view-level error counted once
+    errors = await validator.run("hybrid")
+    assert [error.message for error in errors] == ["Missing"]
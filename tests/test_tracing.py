@@ -0,0 +1,78 @@
+import json
+import asyncio
+import pytest
+from spectacles.lookml import Explore
+from spectacles.queries import QueryTracker
+from spectacles.tracing import Tracer, tracer as global_tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.start()
+    return tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span("create_query", "lane"):
+        pass
+    tracer.begin("execute", "lane")
+    tracer.end("execute", "lane")
+    tracer.mark("first_seen", "lane")
+    assert tracer.events == []
+
+
+def test_spans_are_grouped_into_named_lanes(tracer, tmp_path):
+    with tracer.span("get_lookml_models", "metadata"):
+        pass
+    tracer.begin("execute", "query")
+    tracer.mark("first_seen", "query", once=True)
+    tracer.mark("first_seen", "query", once=True)
+    tracer.end("execute", "query", state="complete")
+    tracer.end("execute", "query")  # Not open anymore, so ignored
+
+    names = [(event["name"], event["ph"], event["tid"]) for event in tracer.events]
+    assert names == [
+        ("thread_name", "M", 1),
+        ("get_lookml_models", "X", 1),
+        ("thread_name", "M", 2),
+        ("execute", "B", 2),
+        ("first_seen", "i", 2),
+        ("execute", "E", 2),
+    ]
+    assert tracer.events[0]["args"] == {"name": "metadata"}
+    assert tracer.events[1]["dur"] >= 0
+
+
+def test_write_closes_spans_left_open(tracer, tmp_path):
+    tracer.begin("execute", "query")
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [(event["name"], event["ph"]) for event in events[1:]] == [
+        ("execute", "B"),
+        ("execute", "E"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_tracker_traces_slot_wait_and_execution():
+    global_tracer.start()
+    try:
+        tracker = QueryTracker(asyncio.BoundedSemaphore(1))
+        query = tracker.create(Explore("explore", []), "model", "explore", [])
+        await tracker.dispatch(query)
+        tracker.start(query, "query_task")
+        tracker.transition(query, "complete")
+    finally:
+        global_tracer.stop()
+    assert [
+        (event["name"], event["ph"], event.get("args"))
+        for event in global_tracer.events
+    ] == [
+        ("thread_name", "M", {"name": "model/explore/explore"}),
+        ("wait_for_slot", "X", None),
+        ("execute", "B", {"query_task_id": "query_task"}),
+        ("execute", "E", {"state": "complete"}),
+    ]
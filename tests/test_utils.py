@@ -75,3 +75,14 @@ class TestLogDurationDecorator(unittest.TestCase):
             decorated_func = utils.log_duration(func)
             decorated_func()
         self.assertIn("INFO:spectacles:\nCompleted validation in", cm.output[0])
+
+
+def test_partition_balances_weights():
+    weights = {"a": 5, "b": 4, "c": 3, "d": 3, "e": 1}
+    assert utils.partition(weights, 2) == [["a", "d"], ["b", "c", "e"]]
+
+
+def test_partition_is_deterministic_with_ties():
+    weights = {key: 1 for key in "dcba"}
+    assert utils.partition(weights, 2) == [["a", "c"], ["b", "d"]]
+    assert utils.partition(weights, 5)[4] == []
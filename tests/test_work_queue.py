@@ -0,0 +1,68 @@
+from unittest.mock import patch
+import pytest
+from spectacles.work_queue import WorkQueue
+
+ITEMS = [
+    {"model": "test_model", "explore": "test_explore_one", "dimensions": []},
+    {"model": "test_model", "explore": "test_explore_two", "dimensions": []},
+]
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / "work.db"), lease=60, max_attempts=2)
+    yield work_queue
+    work_queue.close()
+
+
+def test_unfilled_queue_has_no_meta_and_is_not_finished(work_queue):
+    assert work_queue.get_meta() is None
+    assert not work_queue.is_finished()
+
+
+def test_claim_and_complete(work_queue):
+    work_queue.fill("test_project", "dev", "batch", ITEMS)
+    assert work_queue.get_meta() == {
+        "project": "test_project",
+        "branch": "dev",
+        "mode": "batch",
+    }
+    claimed = work_queue.claim("worker_a", limit=1)
+    assert [item for _, item in claimed] == ITEMS[:1]
+    assert [item for _, item in work_queue.claim("worker_b", limit=5)] == ITEMS[1:]
+    assert work_queue.claim("worker_c", limit=5) == []
+
+    item_id = claimed[0][0]
+    assert work_queue.complete(item_id, "worker_a", {"status": "success"})
+    assert work_queue.counts()["done"] == 1
+    assert not work_queue.is_finished()
+
+
+def test_expired_lease_is_claimed_again_then_abandoned(work_queue):
+    work_queue.fill("test_project", "dev", "batch", ITEMS[:1])
+    with patch("spectacles.work_queue.time.time", return_value=1000):
+        (item_id, _), = work_queue.claim("worker_a", limit=1)
+    with patch("spectacles.work_queue.time.time", return_value=2000):
+        assert [i for i, _ in work_queue.claim("worker_b", limit=1)] == [item_id]
+        # The first worker lost its lease, so its result is discarded
+        assert not work_queue.complete(item_id, "worker_a", {"status": "success"})
+    with patch("spectacles.work_queue.time.time", return_value=3000):
+        assert work_queue.claim("worker_c", limit=1) == []
+        assert work_queue.counts()["abandoned"] == 1
+        assert work_queue.is_finished()
+    assert work_queue.results() == [(ITEMS[0], None)]
+
+
+def test_extended_lease_is_not_claimed_again(work_queue):
+    work_queue.fill("test_project", "dev", "batch", ITEMS[:1])
+    with patch("spectacles.work_queue.time.time", return_value=1000):
+        (item_id, _), = work_queue.claim("worker_a", limit=1)
+        assert work_queue.latest_lease() == 1060
+    with patch("spectacles.work_queue.time.time", return_value=1050):
+        assert work_queue.extend_lease("worker_a", [item_id]) == 1
+        assert work_queue.extend_lease("worker_b", [item_id]) == 0
+        assert work_queue.latest_lease() == 1110
+    with patch("spectacles.work_queue.time.time", return_value=1100):
+        assert work_queue.claim("worker_b", limit=1) == []
+        assert work_queue.complete(item_id, "worker_a", {"status": "success"})
+    assert work_queue.latest_lease() is None
@@ -0,0 +1,106 @@
+import io
+import json
+from xml.dom import minidom
+import pytest
+from spectacles.lookml import Explore, Dimension
+from spectacles.queries import QueryResult
+from spectacles.exceptions import SqlError, SpectaclesException
+from spectacles.writers import (
+    NdjsonWriter,
+    JsonWriter,
+    JUnitWriter,
+    open_writer,
+    sql_record,
+    data_test_record,
+)
+
+
+class KeptOpen(io.StringIO):
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def records():
+    dimension = Dimension("view.dimension", "string", "${TABLE}.x", "https://x/view")
+    dimension.error = SqlError(
+        path=dimension.name, message="Column <x> & more", sql=None, line_number=3
+    )
+    explore = Explore("explore", [dimension])
+    return [
+        sql_record(QueryResult("model", "explore", explore, 1.23456)),
+        sql_record(QueryResult("model", "explore", dimension)),
+        data_test_record(
+            {
+                "model_name": "model",
+                "test_name": "test",
+                "success": False,
+                "errors": [{"message": "Failed.", "line_number": 7}],
+            },
+            2,
+            "https://x/test",
+        ),
+    ]
+
+
+def test_sql_and_data_test_records(records):
+    assert records[0]["status"] == "success"
+    assert records[0]["duration"] == 1.235
+    assert records[1] == {
+        "type": "sql",
+        "model": "model",
+        "explore": "explore",
+        "path": "view.dimension",
+        "kind": "dimension",
+        "status": "error",
+        "duration": None,
+        "message": "Column <x> & more",
+        "line_number": 3,
+        "url": "https://x/view",
+    }
+    assert records[2]["path"] == "model/test"
+    assert records[2]["line_number"] == 7
+
+
+def test_ndjson_writer_flushes_one_line_per_record(records):
+    file = KeptOpen()
+    writer = NdjsonWriter(file)
+    writer.write(records[0])
+    assert json.loads(file.getvalue()) == records[0]
+    for record in records[1:]:
+        writer.write(record)
+    writer.close()
+    assert [json.loads(line) for line in file.getvalue().splitlines()] == records
+
+
+def test_json_writer_writes_an_array(records):
+    file = KeptOpen()
+    writer = JsonWriter(file)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    assert json.loads(file.getvalue()) == records
+
+
+def test_junit_writer_writes_failures(records):
+    file = KeptOpen()
+    writer = JUnitWriter(file)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    document = minidom.parseString(file.getvalue())
+    testcases = document.getElementsByTagName("testcase")
+    assert [case.getAttribute("name") for case in testcases] == [
+        "explore",
+        "view.dimension",
+        "model/test",
+    ]
+    assert testcases[0].getAttribute("classname") == "model.explore"
+    failures = document.getElementsByTagName("failure")
+    assert failures[0].getAttribute("message") == "Column <x> & more"
+    assert "LookML: https://x/view" in failures[0].firstChild.data
+
+
+def test_open_writer_rejects_unknown_formats():
+    with pytest.raises(SpectaclesException):
+        open_writer("csv")